@@ -8,6 +8,7 @@ from fastapi.staticfiles import StaticFiles
 import os
 
 from .routes import fixes
+from ..infrastructure.cpu_pool import cpu_pool
 
 def create_app() -> FastAPI:
     """Create FastAPI application"""
@@ -32,6 +33,10 @@ def create_app() -> FastAPI:
     # Include routers
     app.include_router(fixes.router)
     
+    @app.on_event("shutdown")
+    async def shutdown_cpu_pool():
+        cpu_pool.shutdown()
+    
     # Servir fix-injector.js como arquivo estático
     # Em produção, servir via CDN ou servidor web
     if os.path.exists("frontend/public/fix-injector.js"):
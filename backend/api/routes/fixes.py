@@ -2,20 +2,26 @@
 Fix Routes
 """
 
+import asyncio
 import os
-from typing import List, Optional
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
 from ...domain.fix_engine import FixEngine
 from ...domain.diff_generator import DiffGenerator
+from ...domain.fix_cost import FixCostAnalyzer
 from ...infrastructure.forge_logs_client import ForgeLogsClient
 from ...infrastructure.storage.fix_repository import FixRepository
 from ...infrastructure.ai.fix_generator import FixGenerator
 from ...infrastructure.ai.llm_service import MockLLMService
 from ...infrastructure.ai.html_analyzer import HTMLAnalyzer
+from ...infrastructure.ai.model_router import ModelRouter, ModelTier
+from ...infrastructure.ai.telemetry import llm_telemetry
+from ...infrastructure.source.backup_store import get_backup_store
 from ...infrastructure.source.patch_applier import PatchApplier
-from ...infrastructure.source.file_locator import FileLocator
+from ...infrastructure.source.file_safety import content_hash
 from ...config.project_config import project_manager
 
 router = APIRouter(prefix="/api/fixes", tags=["fixes"])
@@ -35,7 +41,46 @@ try:
     openai_key = os.getenv('OPENAI_API_KEY')
     if openai_key:
         from ...infrastructure.ai.llm_service import OpenAILLMService
-        llm_service = OpenAILLMService(api_key=openai_key)
+        from ...infrastructure.ai.rate_limiter import LLMRateLimiter
+        # Limitador compartilhado por todas as chamadas ao LLM
+        llm_rate_limiter = LLMRateLimiter(
+            requests_per_minute=int(os.getenv('LLM_REQUESTS_PER_MINUTE', '500')),
+            tokens_per_minute=int(os.getenv('LLM_TOKENS_PER_MINUTE', '90000')),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+        )
+        llm_service = OpenAILLMService(
+            api_key=openai_key,
+            model=os.getenv('OPENAI_MODEL', 'gpt-4'),
+            rate_limiter=llm_rate_limiter
+        )
+        # Modelo rápido primeiro; escalonar para o principal quando necessário
+        escalate_issue_types = [
+            issue_type.strip()
+            for issue_type in os.getenv('LLM_ESCALATE_ISSUE_TYPES', '').split(',')
+            if issue_type.strip()
+        ]
+        model_router = ModelRouter(
+            tiers=[
+                ModelTier('fast', OpenAILLMService(
+                    api_key=openai_key,
+                    model=os.getenv('OPENAI_FAST_MODEL', 'gpt-4o-mini'),
+                    rate_limiter=llm_rate_limiter
+                )),
+                ModelTier('strong', llm_service),
+            ],
+            confidence_threshold=float(os.getenv('LLM_CONFIDENCE_THRESHOLD', '0.6')),
+            escalate_issue_types=escalate_issue_types
+        )
+        html_analyzer = HTMLAnalyzer()
+        fix_generator = FixGenerator(llm_service, html_analyzer, model_router=model_router)
+    elif os.getenv('LLM_SIMULATOR'):
+        # LLM local simulado (latência, streaming e falhas) para testes de carga
+        from ...infrastructure.ai.llm_simulator import SimulatedLLMService
+        llm_service = SimulatedLLMService(
+            seed=int(os.getenv('LLM_SIMULATOR_SEED', '0')),
+            rate_limit_probability=float(os.getenv('LLM_SIMULATOR_429_RATE', '0')),
+            malformed_probability=float(os.getenv('LLM_SIMULATOR_MALFORMED_RATE', '0'))
+        )
         html_analyzer = HTMLAnalyzer()
         fix_generator = FixGenerator(llm_service, html_analyzer)
     else:
@@ -50,35 +95,81 @@ except Exception as e:
     html_analyzer = HTMLAnalyzer()
     fix_generator = FixGenerator(llm_service, html_analyzer)
 
+# Orçamento de custo das correções (abrangência do seletor × impacto das propriedades)
+fix_cost_analyzer = FixCostAnalyzer(
+    budget=float(os.getenv('FIX_COST_BUDGET', '100')),
+    mode=os.getenv('FIX_COST_MODE', 'flag')
+)
+
 # Motor de correção
 fix_engine = FixEngine(
     forge_logs_client=forge_logs_client,
     fix_generator=fix_generator,
-    fix_repository=fix_repository
+    fix_repository=fix_repository,
+    cost_analyzer=fix_cost_analyzer
 )
 
 # Gerador de diff
 diff_generator = DiffGenerator()
 
-# Aplicador de patches (lazy initialization)
-_patch_applier = None
-_file_locator = None
+# Aplicadores de patches e localizadores por projeto (lazy initialization,
+# reaproveitados entre requisições junto com o índice de seletores)
+_patch_appliers = {}
+_file_locators = {}
 
 def get_patch_applier(project_id: str = "forgetest-studio"):
     """Obtém PatchApplier para projeto."""
-    global _patch_applier
-    project_config = project_manager.get_project(project_id)
-    if project_config:
-        _patch_applier = PatchApplier(project_config)
-    return _patch_applier
+    if project_id not in _patch_appliers:
+        project_config = project_manager.get_project(project_id)
+        if not project_config:
+            return None
+        _patch_appliers[project_id] = PatchApplier(project_config)
+    return _patch_appliers[project_id]
+
+# Status em que a correção continua aplicada no fonte (backups fixados)
+APPLIED_STATUSES = ('applied', 'validated')
+
+async def release_fix_backups(fix_id: str, status: str):
+    """
+    Libera para a retenção os backups de uma correção que deixou de estar
+    aplicada, qualquer que seja a rota que mudou o status (rollback só de
+    status ou no fonte). A correção não guarda o projeto: a liberação vale
+    para o store de todos os projetos que já têm um.
+    """
+    if status in APPLIED_STATUSES:
+        return
+    
+    def unpin():
+        for project_config in project_manager.projects.values():
+            if (project_config.backup_dir / "store" / "manifest.db").exists():
+                get_backup_store(project_config).unpin_fixes([fix_id])
+    
+    await asyncio.to_thread(unpin)
+
+fix_repository.add_status_callback(release_fix_backups)
 
 def get_file_locator(project_id: str = "forgetest-studio"):
     """Obtém FileLocator para projeto."""
-    global _file_locator
-    project_config = project_manager.get_project(project_id)
-    if project_config:
-        _file_locator = FileLocator(project_config)
-    return _file_locator
+    if project_id not in _file_locators:
+        patch_applier = get_patch_applier(project_id)
+        if not patch_applier:
+            return None
+        _file_locators[project_id] = patch_applier.file_locator
+    return _file_locators[project_id]
+
+
+def check_fix_cost(fix: dict) -> dict:
+    """Custo da correção; no modo 'reject', bloqueia correções acima do orçamento."""
+    cost = fix_cost_analyzer.score(fix)
+    if cost['over_budget'] and fix_cost_analyzer.mode == 'reject':
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Fix cost {cost['cost']} exceeds budget {cost['budget']}"
+                f" (selector '{cost['selector']}')"
+            )
+        )
+    return cost
 
 
 class FixResponse(BaseModel):
@@ -90,6 +181,20 @@ class FixResponse(BaseModel):
     changes: List[dict]
     priority: int
     status: str = 'pending'
+    cost: Optional[dict] = None
+
+
+class BatchApplyRequest(BaseModel):
+    """Batch apply request"""
+    fix_ids: List[str]
+    create_backup: bool = True
+    # Hash de cada arquivo visto no preview ({caminho relativo: content_hash})
+    expected_hashes: Dict[str, str] = {}
+
+
+class BatchRollbackRequest(BaseModel):
+    """Batch rollback request"""
+    fix_ids: List[str]
 
 
 @router.get("/generate", response_model=List[FixResponse])
@@ -125,7 +230,8 @@ async def generate_fixes(
                 target_selector=fix.get('target_selector'),
                 changes=fix.get('changes', []),
                 priority=fix.get('priority', 0),
-                status=fix.get('status', 'pending')
+                status=fix.get('status', 'pending'),
+                cost=fix.get('cost')
             )
             for i, fix in enumerate(saved_fixes)
         ]
@@ -164,6 +270,22 @@ async def disable_rule(rule_id: str):
     return {'message': f'Rule {rule_id} disabled'}
 
 
+@router.get("/telemetry/llm")
+async def get_llm_telemetry():
+    """Métricas das chamadas ao LLM por modelo e tipo de problema"""
+    telemetry = llm_telemetry.snapshot()
+    
+    rate_limiter = getattr(llm_service, 'rate_limiter', None)
+    if rate_limiter:
+        telemetry['rate_limiter'] = rate_limiter.stats()
+    
+    model_router = getattr(fix_generator, 'model_router', None)
+    if model_router:
+        telemetry['model_tiers'] = model_router.stats()
+    
+    return telemetry
+
+
 @router.get("", response_model=List[FixResponse])
 async def list_fixes(
     status: Optional[str] = None,
@@ -186,7 +308,8 @@ async def list_fixes(
                 target_selector=fix.get('target_selector'),
                 changes=fix.get('changes', []),
                 priority=fix.get('priority', 0),
-                status=fix.get('status', 'pending')
+                status=fix.get('status', 'pending'),
+                cost=fix_cost_analyzer.score(fix)
             )
             for fix in fixes
         ]
@@ -194,6 +317,177 @@ async def list_fixes(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/apply-source/batch")
+async def apply_fixes_to_source(
+    request: BatchApplyRequest,
+    project_id: str = "forgetest-studio"
+):
+    """
+    Aplica várias correções nos arquivos fonte (uma leitura, um backup e uma
+    escrita por arquivo)
+    """
+    try:
+        patch_applier = get_patch_applier(project_id)
+        if not patch_applier:
+            raise HTTPException(status_code=500, detail="Project not configured")
+        
+        # Ids repetidos contam uma vez (a correção não é aplicada duas vezes)
+        fix_ids = list(dict.fromkeys(request.fix_ids))
+        
+        # Correções inexistentes ou acima do orçamento (modo 'reject') ficam fora do lote
+        results = {}
+        fixes = []
+        stored = await asyncio.gather(*[fix_repository.get_fix(fix_id) for fix_id in fix_ids])
+        for fix_id, fix in zip(fix_ids, stored):
+            if not fix:
+                results[fix_id] = {
+                    "fix_id": fix_id, "success": False, "errors": ["Fix not found"]
+                }
+                continue
+            cost = fix_cost_analyzer.score(fix)
+            if cost['over_budget'] and fix_cost_analyzer.mode == 'reject':
+                results[fix_id] = {
+                    "fix_id": fix_id,
+                    "success": False,
+                    "errors": [
+                        f"Fix cost {cost['cost']} exceeds budget {cost['budget']}"
+                        f" (selector '{cost['selector']}')"
+                    ]
+                }
+                continue
+            fixes.append(fix)
+        
+        file_infos = await asyncio.gather(*[
+            patch_applier.file_locator.locate_file_for_fix_async(fix) for fix in fixes
+        ])
+        # Lock de arquivo e I/O bloqueantes: fora do event loop
+        batch = await asyncio.to_thread(
+            patch_applier.apply_fixes,
+            fixes,
+            create_backup=request.create_backup,
+            file_infos=list(file_infos),
+            expected_hashes=request.expected_hashes
+        )
+        
+        for fix, result in zip(fixes, batch["results"]):
+            results[fix["id"]] = result
+            if result["success"]:
+                # Atualizar fix com informações de source (o status vai junto:
+                # save_fix regrava a linha inteira)
+                fix["status"] = 'applied'
+                fix["target_file"] = result["file_path"]
+                fix["backup_path"] = result["backup_path"]
+                await fix_repository.save_fix(fix)
+                await fix_repository.save_fix_patch(
+                    fix["id"], result["file_path"], result.pop("reverse_patch")
+                )
+        
+        ordered = [results[fix_id] for fix_id in fix_ids]
+        return {
+            "success": all(result["success"] for result in ordered),
+            "results": ordered,
+            "files": batch["files"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rollback-source/batch")
+async def rollback_fixes_source(
+    request: BatchRollbackRequest,
+    project_id: str = "forgetest-studio"
+):
+    """
+    Reverte várias correções pelos patches reversos (uma leitura e uma
+    escrita por arquivo)
+    """
+    try:
+        patch_applier = get_patch_applier(project_id)
+        if not patch_applier:
+            raise HTTPException(status_code=500, detail="Project not configured")
+        
+        fix_ids = list(dict.fromkeys(request.fix_ids))
+        patches = await fix_repository.get_fix_patches(fix_ids)
+        batch = await asyncio.to_thread(patch_applier.revert_fixes, patches)
+        
+        # Uma correção é revertida quando todos os seus patches foram desfeitos
+        results = {
+            fix_id: {
+                "fix_id": fix_id,
+                "success": False,
+                "file_path": None,
+                "errors": ["No reverse patch recorded for fix"]
+            }
+            for fix_id in fix_ids
+        }
+        items_by_fix: Dict[str, List[Dict]] = {}
+        reverted = []
+        for patch, item in zip(patches, batch["results"]):
+            items_by_fix.setdefault(patch["fix_id"], []).append(item)
+            if item["success"]:
+                reverted.append(patch["id"])
+        for fix_id, items in items_by_fix.items():
+            results[fix_id] = {
+                "fix_id": fix_id,
+                "success": all(item["success"] for item in items),
+                "file_path": items[-1]["file_path"],
+                "errors": [error for item in items for error in item["errors"]]
+            }
+        
+        await fix_repository.mark_fix_patches_reverted(reverted)
+        for fix_id in fix_ids:
+            if results[fix_id]["success"]:
+                await fix_repository.update_fix_status(fix_id, 'rolled_back')
+        
+        ordered = [results[fix_id] for fix_id in fix_ids]
+        return {
+            "success": all(result["success"] for result in ordered),
+            "results": ordered,
+            "files": batch["files"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/backups")
+async def list_backups(
+    project_id: str = "forgetest-studio",
+    file_path: Optional[str] = None,
+    fix_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    """Lista backups (paginado; filtros por arquivo, correção e intervalo de criação)"""
+    try:
+        patch_applier = get_patch_applier(project_id)
+        if not patch_applier:
+            raise HTTPException(status_code=500, detail="Project not configured")
+        
+        # Consulta SQLite bloqueante: fora do event loop
+        return await asyncio.to_thread(
+            patch_applier.list_backups,
+            file_path=file_path,
+            fix_id=fix_id,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{fix_id}", response_model=FixResponse)
 async def get_fix(fix_id: str):
     """Obtém uma correção por ID"""
@@ -209,7 +503,8 @@ async def get_fix(fix_id: str):
             target_selector=fix.get('target_selector'),
             changes=fix.get('changes', []),
             priority=fix.get('priority', 0),
-            status=fix.get('status', 'pending')
+            status=fix.get('status', 'pending'),
+            cost=fix_cost_analyzer.score(fix)
         )
     except HTTPException:
         raise
@@ -221,8 +516,13 @@ async def get_fix(fix_id: str):
 async def apply_fix(fix_id: str):
     """Marca correção como aplicada"""
     try:
+        fix = await fix_repository.get_fix(fix_id)
+        if fix:
+            check_fix_cost(fix)
         await fix_repository.update_fix_status(fix_id, 'applied')
         return {'message': f'Fix {fix_id} marked as applied'}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -250,7 +550,7 @@ async def preview_fix(fix_id: str, project_id: str = "forgetest-studio"):
             raise HTTPException(status_code=500, detail="Project not configured")
         
         # Localizar arquivo
-        file_info = file_locator.locate_file_for_fix(fix)
+        file_info = await file_locator.locate_file_for_fix_async(fix)
         if not file_info:
             raise HTTPException(status_code=404, detail="File not found for selector")
         
@@ -293,6 +593,8 @@ async def preview_fix(fix_id: str, project_id: str = "forgetest-studio"):
         return {
             "fix_id": fix_id,
             "file_path": file_info["relative_path"],
+            # Enviar de volta em apply-source (expected_hash) para detectar mudanças no arquivo
+            "content_hash": content_hash(original_content),
             "diff": diff_result["diff"],
             "formatted_diff": diff_generator.format_diff_for_display(diff_result["diff"]),
             "changes_summary": diff_result["changes_summary"],
@@ -313,29 +615,47 @@ async def preview_fix(fix_id: str, project_id: str = "forgetest-studio"):
 async def apply_fix_to_source(
     fix_id: str,
     create_backup: bool = True,
-    project_id: str = "forgetest-studio"
+    project_id: str = "forgetest-studio",
+    expected_hash: Optional[str] = None
 ):
-    """Aplica correção nos arquivos fonte"""
+    """
+    Aplica correção nos arquivos fonte (expected_hash: content_hash do
+    preview; 409 se o arquivo mudou)
+    """
     try:
         fix = await fix_repository.get_fix(fix_id)
         if not fix:
             raise HTTPException(status_code=404, detail="Fix not found")
         
+        check_fix_cost(fix)
+        
         patch_applier = get_patch_applier(project_id)
         if not patch_applier:
             raise HTTPException(status_code=500, detail="Project not configured")
         
         # Aplicar correção
-        result = patch_applier.apply_fix(fix, create_backup=create_backup)
+        file_info = await patch_applier.file_locator.locate_file_for_fix_async(fix)
+        result = await asyncio.to_thread(
+            patch_applier.apply_fix,
+            fix,
+            create_backup=create_backup,
+            file_info=file_info,
+            expected_hash=expected_hash
+        )
+        
+        if result.get("conflict"):
+            raise HTTPException(status_code=409, detail=result["errors"][0])
         
         if result["success"]:
-            # Atualizar status no banco
-            await fix_repository.update_fix_status(fix_id, 'applied')
-            
-            # Atualizar fix com informações de source
+            # Atualizar fix com informações de source (o status vai junto:
+            # save_fix regrava a linha inteira)
+            fix["status"] = 'applied'
             fix["target_file"] = result["file_path"]
             fix["backup_path"] = result.get("backup_path")
             await fix_repository.save_fix(fix)
+            await fix_repository.save_fix_patch(
+                fix_id, result["file_path"], result["reverse_patch"]
+            )
         
         return {
             "success": result["success"],
@@ -343,6 +663,7 @@ async def apply_fix_to_source(
             "file_path": result.get("file_path"),
             "backup_path": result.get("backup_path"),
             "changes_applied": result.get("changes_applied", []),
+            "content_hash": result.get("content_hash"),
             "errors": result.get("errors", [])
         }
     
@@ -355,10 +676,20 @@ async def apply_fix_to_source(
 @router.post("/{fix_id}/rollback-source")
 async def rollback_fix_source(
     fix_id: str,
-    backup_path: str,
+    backup_path: Optional[str] = None,
     project_id: str = "forgetest-studio"
 ):
-    """Reverte correção usando backup"""
+    """
+    Reverte correção pelo patch reverso registrado (ou restaurando backup_path, se informado)
+    
+    O backup de uma correção aplicada é mantido pela retenção até ela ser
+    revertida; depois disso pode ser removido pela coleta de lixo.
+    
+    Respostas de erro:
+        400: correção sem patch reverso registrado e sem backup_path
+        404: correção inexistente, ou backup_path não encontrado (removido
+            pela retenção ou referência inválida)
+    """
     try:
         fix = await fix_repository.get_fix(fix_id)
         if not fix:
@@ -368,9 +699,31 @@ async def rollback_fix_source(
         if not patch_applier:
             raise HTTPException(status_code=500, detail="Project not configured")
         
-        # Reverter correção
-        result = patch_applier.rollback_fix(fix, backup_path)
+        patches = await fix_repository.get_fix_patches([fix_id])
+        if backup_path:
+            # Arquivo inteiro: descarta também mudanças posteriores ao backup
+            result = await asyncio.to_thread(patch_applier.rollback_fix, fix, backup_path)
+            if result.get("backup_missing"):
+                raise HTTPException(status_code=404, detail=f"Backup not found: {backup_path}")
+            # Só os patches do arquivo restaurado; os de outros arquivos continuam aplicados
+            reverted = [
+                patch for patch in patches
+                if result["success"] and patch["file_path"] == result["file_path"]
+            ]
+        elif patches:
+            batch = await asyncio.to_thread(patch_applier.revert_fixes, patches)
+            reverted = [patch for patch, item in zip(patches, batch["results"]) if item["success"]]
+            result = {
+                "success": batch["success"],
+                "file_path": batch["results"][-1]["file_path"],
+                "errors": [error for item in batch["results"] for error in item["errors"]]
+            }
+        else:
+            raise HTTPException(
+                status_code=400, detail="No reverse patch recorded for fix; pass backup_path"
+            )
         
+        await fix_repository.mark_fix_patches_reverted([patch["id"] for patch in reverted])
         if result["success"]:
             # Atualizar status no banco
             await fix_repository.update_fix_status(fix_id, 'rolled_back')
@@ -386,21 +739,3 @@ async def rollback_fix_source(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/backups")
-async def list_backups(project_id: str = "forgetest-studio"):
-    """Lista backups disponíveis"""
-    try:
-        patch_applier = get_patch_applier(project_id)
-        if not patch_applier:
-            raise HTTPException(status_code=500, detail="Project not configured")
-        
-        backups = patch_applier.list_backups()
-        return {"backups": backups}
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
@@ -0,0 +1,247 @@
+"""
+Fix Cost Analyzer - Domain Layer
+
+Estima o custo de aplicar uma correção no navegador: quantos elementos o
+seletor tende a casar (abrangência) vezes o impacto das propriedades
+alteradas (layout, pintura ou composição).
+"""
+
+import logging
+import re
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Abrangência relativa do seletor composto mais à direita (o navegador casa
+# seletores da direita para a esquerda)
+UNIVERSAL_BREADTH = 100.0
+TAG_BREADTH = 25.0
+ATTRIBUTE_BREADTH = 10.0
+CLASS_BREADTH = 4.0
+ID_BREADTH = 1.0
+
+# Propriedades que forçam recálculo de layout
+LAYOUT_PROPERTIES = frozenset([
+    'display', 'position', 'top', 'right', 'bottom', 'left', 'float', 'clear',
+    'width', 'height', 'min-width', 'min-height', 'max-width', 'max-height',
+    'padding', 'padding-top', 'padding-right', 'padding-bottom', 'padding-left',
+    'margin', 'margin-top', 'margin-right', 'margin-bottom', 'margin-left',
+    'border', 'border-width', 'box-sizing', 'overflow', 'overflow-x', 'overflow-y',
+    'font-size', 'font-family', 'font-weight', 'line-height', 'letter-spacing',
+    'white-space', 'word-break', 'word-wrap', 'overflow-wrap', 'text-align',
+    'flex', 'flex-wrap', 'flex-direction', 'flex-basis', 'flex-shrink', 'flex-grow',
+    'grid-template-columns', 'grid-template-rows', 'gap',
+])
+
+# Propriedades que só exigem repintura
+PAINT_PROPERTIES = frozenset([
+    'color', 'background', 'background-color', 'border-color', 'outline',
+    'outline-offset', 'outline-color', 'box-shadow', 'text-decoration',
+    'text-shadow', 'visibility', 'cursor',
+])
+
+# Propriedades tratadas na composição
+COMPOSITE_PROPERTIES = frozenset(['opacity', 'transform', 'will-change'])
+
+LAYOUT_IMPACT = 3.0
+STACKING_IMPACT = 2.0
+UNKNOWN_IMPACT = 2.0
+PAINT_IMPACT = 1.0
+COMPOSITE_IMPACT = 0.5
+
+_COMBINATOR = re.compile(r'\s*[>+~]\s*|\s+')
+_ID = re.compile(r'#[-\w]+')
+_CLASS = re.compile(r'\.[-\w]+')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_PSEUDO = re.compile(r'::?[-\w]+(\([^)]*\))?')
+_TAG = re.compile(r'^[a-zA-Z][-\w]*')
+
+
+def _split_top_level(text: str, separator_pattern: re.Pattern) -> List[str]:
+    """Divide o seletor ignorando separadores dentro de [], () e aspas."""
+    parts, depth, quote, start = [], 0, None, 0
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if quote:
+            if char == '\\':
+                position += 1
+            elif char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '[(':
+            depth += 1
+        elif char in '])':
+            depth -= 1
+        elif depth == 0:
+            match = separator_pattern.match(text, position)
+            if match and match.end() > position:
+                parts.append(text[start:position])
+                start = position = match.end()
+                continue
+        position += 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def compound_breadth(compound: str) -> float:
+    """Abrangência de um seletor composto (ex: "button.primary[type]")."""
+    if _ID.search(_ATTRIBUTE.sub('', compound)):
+        return ID_BREADTH
+    
+    stripped = _ATTRIBUTE.sub('', compound)
+    classes = len(_CLASS.findall(_PSEUDO.sub('', stripped)))
+    attributes = len(_ATTRIBUTE.findall(compound))
+    pseudos = _PSEUDO.findall(stripped)
+    has_tag = bool(_TAG.match(stripped))
+    
+    if classes:
+        breadth = CLASS_BREADTH
+    elif attributes:
+        breadth = ATTRIBUTE_BREADTH
+    elif has_tag:
+        breadth = TAG_BREADTH
+    else:
+        breadth = UNIVERSAL_BREADTH
+    
+    # Cada qualificador adicional estreita o conjunto casado
+    qualifiers = classes + attributes + len(pseudos) + (1 if has_tag and (classes or attributes) else 0) - 1
+    return breadth / (2 ** max(qualifiers, 0))
+
+
+def selector_breadth(selector: str) -> float:
+    """
+    Abrangência estimada de um seletor (soma das partes da lista).
+    
+    O composto mais à direita define a base; ancestrais estreitam o
+    conjunto na proporção da própria abrangência.
+    """
+    total = 0.0
+    for complex_selector in _split_top_level(selector, re.compile(r',')):
+        compounds = _split_top_level(complex_selector, _COMBINATOR)
+        if not compounds:
+            continue
+        breadth = compound_breadth(compounds[-1])
+        for ancestor in compounds[:-1]:
+            breadth *= max(compound_breadth(ancestor) / UNIVERSAL_BREADTH, 0.1)
+        total += breadth
+    return total
+
+
+def is_universal_selector(selector: str) -> bool:
+    """Alguma parte da lista tem o composto mais à direita universal (ex: "*", ".a > *")."""
+    for complex_selector in _split_top_level(selector, re.compile(r',')):
+        compounds = _split_top_level(complex_selector, _COMBINATOR)
+        if compounds and compound_breadth(compounds[-1]) >= UNIVERSAL_BREADTH:
+            return True
+    return False
+
+
+def property_impact(property_name: str) -> float:
+    """Impacto de alterar uma propriedade (layout > empilhamento > pintura > composição)."""
+    name = property_name.strip().lower()
+    if name in LAYOUT_PROPERTIES:
+        return LAYOUT_IMPACT
+    if name == 'z-index':
+        return STACKING_IMPACT
+    if name in PAINT_PROPERTIES:
+        return PAINT_IMPACT
+    if name in COMPOSITE_PROPERTIES:
+        return COMPOSITE_IMPACT
+    return UNKNOWN_IMPACT
+
+
+def _is_concrete_selector(selector: Any) -> bool:
+    return isinstance(selector, str) and bool(selector.strip()) and not any(char in selector for char in '{};')
+
+
+class FixCostAnalyzer:
+    """
+    Pontua correções por abrangência do seletor × impacto das propriedades.
+    
+    Antes de salvar ou aplicar, seletores universais (ex: "*") são trocados
+    pelo elemento concreto do problema quando ele é mais restrito. Correções que
+    continuam acima do orçamento são marcadas (mode='flag') ou descartadas
+    (mode='reject').
+    """
+    
+    MODES = ('flag', 'reject')
+    
+    def __init__(self, budget: float = 100.0, mode: str = 'flag'):
+        """
+        Args:
+            budget: Custo máximo aceito por correção
+            mode: 'flag' (marca a correção) ou 'reject' (descarta)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Modo inválido: {mode} (use {', '.join(self.MODES)})")
+        self.budget = budget
+        self.mode = mode
+    
+    def score(self, fix: Dict[str, Any]) -> Dict[str, Any]:
+        """Custo da correção e os fatores que o compõem."""
+        selector = fix.get('target_selector') or fix.get('target_element') or ''
+        breadth = selector_breadth(selector)
+        impact = sum(
+            property_impact(str(change.get('property') or ''))
+            for change in fix.get('changes') or []
+            if isinstance(change, dict)
+        )
+        cost = round(breadth * impact, 2)
+        return {
+            'selector': selector,
+            'breadth': round(breadth, 2),
+            'impact': impact,
+            'cost': cost,
+            'budget': self.budget,
+            'over_budget': cost > self.budget,
+        }
+    
+    def rewrite(self, fix: Dict[str, Any], issue: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Troca um seletor universal (composto mais à direita "*") pelo elemento
+        concreto do problema, se ele for mais restrito. Seletores de classe,
+        tag etc. existem na folha de estilo e são mantidos.
+        
+        Returns:
+            A própria correção (com 'rewritten_from' quando alterada)
+        """
+        selector = fix.get('target_selector') or fix.get('target_element') or ''
+        if not is_universal_selector(selector):
+            return fix
+        
+        candidates = [(issue or {}).get('element'), fix.get('target_element')]
+        concrete = next(
+            (candidate for candidate in candidates if _is_concrete_selector(candidate) and candidate != selector),
+            None
+        )
+        
+        if concrete and selector_breadth(concrete) < selector_breadth(selector):
+            fix['rewritten_from'] = selector
+            fix['target_element'] = concrete
+            fix['target_selector'] = concrete
+            logger.debug(f"Seletor '{selector}' reescrito para '{concrete}'")
+        
+        return fix
+    
+    def review(self, fix: Dict[str, Any], issue: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reescreve, pontua e aplica o orçamento a uma correção.
+        
+        Returns:
+            A correção com 'cost' preenchido, ou None se rejeitada
+        """
+        self.rewrite(fix, issue)
+        fix['cost'] = self.score(fix)
+        
+        if fix['cost']['over_budget']:
+            if self.mode == 'reject':
+                logger.warning(
+                    f"Correção rejeitada: custo {fix['cost']['cost']} acima do orçamento "
+                    f"{self.budget} (seletor '{fix['cost']['selector']}')"
+                )
+                return None
+            logger.info(f"Correção acima do orçamento de custo: {fix['cost']['cost']} > {self.budget}")
+        
+        return fix
@@ -4,9 +4,12 @@ Fix Engine
 
 from typing import List, Dict, Any, Optional
 from .fix_rule import FixRule, FIX_RULES
+from .fix_cost import FixCostAnalyzer
 from ..infrastructure.forge_logs_client import ForgeLogsClient
 from ..infrastructure.ai.fix_generator import FixGenerator
 from ..infrastructure.storage.fix_repository import FixRepository
+from ..infrastructure.ai.telemetry import llm_telemetry
+from ..infrastructure.ai.element_snapshot import compact_issue
 
 
 class FixEngine:
@@ -16,12 +19,18 @@ class FixEngine:
         self,
         forge_logs_client: ForgeLogsClient,
         fix_generator: Optional[FixGenerator] = None,
-        fix_repository: Optional[FixRepository] = None
+        fix_repository: Optional[FixRepository] = None,
+        cost_analyzer: Optional[FixCostAnalyzer] = None
     ):
         self.forge_logs_client = forge_logs_client
         self.rules = FIX_RULES
         self.fix_generator = fix_generator
         self.fix_repository = fix_repository
+        self.cost_analyzer = cost_analyzer or FixCostAnalyzer()
+        
+        # Correções similares vêm do índice mantido pelo repositório
+        if fix_generator and fix_repository and fix_generator.fix_index is None:
+            fix_generator.fix_index = fix_repository.fix_index
     
     async def analyze_and_generate_fixes(
         self,
@@ -39,14 +48,13 @@ class FixEngine:
         
         fixes = []
         
-        # Obter histórico de correções se disponível
-        fix_history = []
-        if self.fix_repository:
+        # Carregar índice de correções similares (apenas na primeira chamada)
+        if use_ai and self.fix_repository:
             try:
-                fix_history = await self.fix_repository.list_fixes(limit=50)
+                await self.fix_repository.load_fix_index()
             except Exception as e:
                 import logging
-                logging.getLogger(__name__).warning(f"Erro ao obter histórico: {e}")
+                logging.getLogger(__name__).warning(f"Erro ao carregar histórico: {e}")
         
         # Para cada problema, tentar aplicar regras ou IA
         for issue in ui_issues:
@@ -61,11 +69,11 @@ class FixEngine:
             # Tentar usar IA primeiro se disponível e habilitado
             if use_ai and self.fix_generator:
                 try:
+                    # Ignorado pelo gerador quando o problema traz snapshot do elemento
                     html_context = issue_data.get('html') or issue_data.get('element_html')
                     fix = await self.fix_generator.generate_fix(
                         issue=issue_data,
-                        html_context=html_context,
-                        fix_history=fix_history
+                        html_context=html_context
                     )
                     if fix:
                         fix['generated_by'] = 'ai'
@@ -83,11 +91,17 @@ class FixEngine:
                         fix = rule.generate_fix(issue_data)
                         if fix:
                             fix['generated_by'] = 'rule'
+                            if use_ai and self.fix_generator:
+                                llm_telemetry.record_fallback(issue_type)
                         break
             
+            # Restringir seletores amplos e aplicar o orçamento de custo
+            if fix:
+                fix = self.cost_analyzer.review(fix, issue_data)
+            
             if fix:
                 fix['log_entry_id'] = issue.get('id')
-                fix['issue'] = issue_data
+                fix['issue'] = compact_issue(issue_data)
                 fix['issue_type'] = issue_type
                 if 'priority' not in fix:
                     fix['priority'] = 5  # Prioridade padrão
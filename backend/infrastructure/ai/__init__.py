@@ -3,12 +3,22 @@ AI Infrastructure
 """
 
 from .llm_service import LLMService, OpenAILLMService, MockLLMService
+from .llm_simulator import SimulatedLLMService
 from .html_analyzer import HTMLAnalyzer
+from .element_snapshot import parse_element_snapshot, ELEMENT_SNAPSHOT_VERSION
+from .rate_limiter import LLMRateLimiter
+from .model_router import ModelRouter, ModelTier
 
 __all__ = [
     'LLMService',
     'OpenAILLMService',
     'MockLLMService',
+    'SimulatedLLMService',
     'HTMLAnalyzer',
+    'parse_element_snapshot',
+    'ELEMENT_SNAPSHOT_VERSION',
+    'LLMRateLimiter',
+    'ModelRouter',
+    'ModelTier',
 ]
 
@@ -0,0 +1,184 @@
+"""
+Element Snapshot - Infrastructure Layer
+
+Formato compacto e versionado com o estado de um elemento capturado no
+navegador, enviado nos problemas de UI no lugar do HTML bruto.
+"""
+
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_SNAPSHOT_VERSION = 1
+
+# Campo do problema (issue) que carrega o snapshot
+SNAPSHOT_ISSUE_KEY = 'element_snapshot'
+
+# Campos de HTML bruto dispensáveis quando há snapshot
+RAW_HTML_ISSUE_KEYS = ('html', 'element_html')
+
+# Atributos mantidos no snapshot
+SNAPSHOT_ATTRIBUTES = (
+    'id', 'class', 'name', 'type', 'role', 'aria-label', 'placeholder',
+    'value', 'href', 'for', 'style', 'data-testid'
+)
+
+# Subconjunto do estilo computado relevante para as correções
+SNAPSHOT_STYLE_PROPERTIES = (
+    'display', 'position', 'width', 'height', 'min-width', 'min-height',
+    'padding', 'margin', 'font-size', 'line-height', 'color', 'background-color',
+    'overflow', 'overflow-x', 'overflow-y', 'visibility', 'opacity', 'z-index'
+)
+
+MAX_ANCESTORS = 8
+MAX_TEXT_PREVIEW = 80
+MAX_ATTRIBUTE_LENGTH = 256
+
+
+def text_digest(text: str) -> Dict[str, Any]:
+    """Resumo do texto do elemento: tamanho, hash e início."""
+    text = ' '.join(text.split())
+    return {
+        "length": len(text),
+        "hash": hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest(),
+        "preview": text[:MAX_TEXT_PREVIEW]
+    }
+
+
+def _attributes(raw: Any) -> Dict[str, str]:
+    if not isinstance(raw, dict):
+        return {}
+    attributes = {}
+    for name in SNAPSHOT_ATTRIBUTES:
+        value = raw.get(name)
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+        if value is not None:
+            attributes[name] = str(value)[:MAX_ATTRIBUTE_LENGTH]
+    return attributes
+
+
+def _ancestor(raw: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(raw, dict) or not isinstance(raw.get('tag'), str):
+        return None
+    ancestor = {"tag": raw['tag'].lower()}
+    # Aceita também a forma normalizada (atributos no próprio ancestral)
+    attributes = _attributes(raw.get('attrs') or raw)
+    for name in ('id', 'class', 'role'):
+        if name in attributes:
+            ancestor[name] = attributes[name]
+    return ancestor
+
+
+def parse_element_snapshot(data: Any) -> Dict[str, Any]:
+    """
+    Valida e normaliza um snapshot de elemento.
+    
+    Formato (versão 1):
+        {
+            "v": 1,
+            "tag": "button",
+            "attrs": {"id": "...", "class": "btn primary", ...},
+            "text": {"length": int, "hash": str, "preview": str} ou texto bruto,
+            "box": {"x": float, "y": float, "width": float, "height": float},
+            "style": {"font-size": "12px", ...},
+            "ancestors": [{"tag": "form", "attrs": {...}}, ...],  # pai primeiro
+            "siblings": int
+        }
+    
+    Atributos e estilos fora dos subconjuntos conhecidos são descartados.
+    
+    Raises:
+        ValueError: Se o snapshot for inválido ou de versão não suportada
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Snapshot de elemento deve ser um objeto")
+    
+    version = data.get('v', ELEMENT_SNAPSHOT_VERSION)
+    if version != ELEMENT_SNAPSHOT_VERSION:
+        raise ValueError(f"Versão de snapshot não suportada: {version}")
+    
+    tag = data.get('tag')
+    if not isinstance(tag, str) or not tag:
+        raise ValueError("Snapshot de elemento sem tag")
+    
+    text = data.get('text')
+    if isinstance(text, str):
+        text = text_digest(text)
+    elif not isinstance(text, dict):
+        text = text_digest('')
+    elif not isinstance(text.get('length', 0), int):
+        raise ValueError("Tamanho de texto inválido no snapshot")
+    else:
+        text = {
+            "length": text.get('length') or 0,
+            "hash": str(text.get('hash') or ''),
+            "preview": str(text.get('preview') or '')[:MAX_TEXT_PREVIEW]
+        }
+    
+    snapshot = {
+        "v": ELEMENT_SNAPSHOT_VERSION,
+        "tag": tag.lower(),
+        "attrs": _attributes(data.get('attrs') or {}),
+        "text": text,
+    }
+    
+    box = data.get('box')
+    if isinstance(box, dict):
+        try:
+            snapshot["box"] = {key: float(box.get(key) or 0) for key in ('x', 'y', 'width', 'height')}
+        except (TypeError, ValueError):
+            raise ValueError("Bounding box inválida no snapshot")
+    
+    style = data.get('style')
+    if isinstance(style, dict):
+        snapshot["style"] = {
+            name: str(style[name]) for name in SNAPSHOT_STYLE_PROPERTIES if style.get(name) is not None
+        }
+    
+    raw_ancestors = data.get('ancestors')
+    if not isinstance(raw_ancestors, list):
+        raw_ancestors = []
+    ancestors: List[Dict[str, Any]] = []
+    for raw_ancestor in raw_ancestors[:MAX_ANCESTORS]:
+        ancestor = _ancestor(raw_ancestor)
+        if ancestor:
+            ancestors.append(ancestor)
+    snapshot["ancestors"] = ancestors
+    
+    siblings = data.get('siblings')
+    if isinstance(siblings, int) and not isinstance(siblings, bool) and siblings >= 0:
+        snapshot["siblings"] = siblings
+    
+    return snapshot
+
+
+def element_snapshot_from_issue(issue: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Snapshot normalizado do problema (None se ausente ou inválido)."""
+    data = issue.get(SNAPSHOT_ISSUE_KEY)
+    if data is None:
+        return None
+    
+    try:
+        return parse_element_snapshot(data)
+    except ValueError as e:
+        logger.warning(f"Snapshot de elemento ignorado: {e}")
+        return None
+
+
+def compact_issue(issue: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Problema pronto para ser copiado nas correções e armazenado.
+    
+    Com snapshot válido, o HTML bruto é descartado e o snapshot é
+    substituído pela versão normalizada; sem snapshot, nada muda.
+    """
+    snapshot = element_snapshot_from_issue(issue)
+    if snapshot is None:
+        return issue
+    
+    compacted = {key: value for key, value in issue.items() if key not in RAW_HTML_ISSUE_KEYS}
+    compacted[SNAPSHOT_ISSUE_KEY] = snapshot
+    return compacted
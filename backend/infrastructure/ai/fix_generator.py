@@ -6,12 +6,21 @@ Gera correções inteligentes usando IA baseadas em contexto.
 
 import logging
 import json
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Callable
 from .llm_service import LLMService
+from .fix_stream_parser import IncrementalFixParser, FixStreamAborted
+from .model_router import ModelRouter
+from .telemetry import llm_telemetry
 from .html_analyzer import HTMLAnalyzer
+from .element_snapshot import element_snapshot_from_issue
+from ..storage.fix_index import SimilarFixIndex
 
 logger = logging.getLogger(__name__)
 
+# Elementos problemáticos listados no prompt como alvos de seletor
+_MAX_PROMPT_PROBLEMS = 10
+
 
 class FixGenerator:
     """
@@ -21,39 +30,59 @@ class FixGenerator:
     baseadas em contexto HTML e histórico.
     """
     
-    def __init__(self, llm_service: LLMService, html_analyzer: HTMLAnalyzer):
+    def __init__(
+        self,
+        llm_service: LLMService,
+        html_analyzer: HTMLAnalyzer,
+        fix_index: Optional[SimilarFixIndex] = None,
+        model_router: Optional[ModelRouter] = None
+    ):
         self.llm_service = llm_service
         self.html_analyzer = html_analyzer
+        self.fix_index = fix_index
+        self.model_router = model_router
     
     async def generate_fix(
         self,
         issue: Dict[str, Any],
         html_context: Optional[str] = None,
-        fix_history: Optional[List[Dict[str, Any]]] = None
+        fix_history: Optional[List[Dict[str, Any]]] = None,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Gera uma correção para um problema de UI usando IA.
         
         Args:
-            issue: Dados do problema detectado
-            html_context: HTML do elemento ou página
-            fix_history: Histórico de correções similares
+            issue: Dados do problema detectado (com snapshot do elemento
+                em "element_snapshot", quando enviado pelo cliente)
+            html_context: HTML do elemento ou página (opcional; ignorado
+                quando o problema tem snapshot)
+            fix_history: Histórico de correções (usado apenas sem fix_index)
+            on_change: Callback chamado com cada change validada assim que
+                ela chega no stream (exibição progressiva)
         
         Returns:
             Dicionário com correção gerada ou None
         """
         try:
             # Preparar contexto para a IA
-            context = self._prepare_context(issue, html_context, fix_history)
+            context = await self._prepare_context(issue, html_context, fix_history)
             
             # Gerar prompt para a IA
             prompt = self._generate_prompt(issue, context)
             
-            # Obter resposta da IA
-            ai_response = await self.llm_service.generate(prompt, context)
-            
-            # Parsear resposta da IA
-            fix = self._parse_ai_response(ai_response, issue)
+            # Obter e parsear resposta da IA (com roteamento entre modelos, se configurado)
+            if self.model_router:
+                fix = await self.model_router.run(
+                    issue.get('type'),
+                    lambda llm_service: self._generate_with(
+                        llm_service, prompt, context, issue, on_change
+                    )
+                )
+            else:
+                fix = await self._generate_with(
+                    self.llm_service, prompt, context, issue, on_change
+                )
             
             if fix:
                 logger.info(f"Correção gerada pela IA para problema: {issue.get('type')}")
@@ -66,7 +95,87 @@ class FixGenerator:
             logger.error(f"Erro ao gerar correção com IA: {e}", exc_info=True)
             return None
     
-    def _prepare_context(
+    async def _generate_with(
+        self,
+        llm_service: LLMService,
+        prompt: str,
+        context: Dict[str, Any],
+        issue: Dict[str, Any],
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Gera e valida a correção usando um LLMService específico."""
+        model = getattr(llm_service, 'model', None) or type(llm_service).__name__
+        record = llm_telemetry.start_call(model, issue.get('type'))
+        started = time.monotonic()
+        parser = IncrementalFixParser()
+        
+        try:
+            # Streaming, abortando cedo se a resposta não puder ser válida
+            try:
+                ai_response = await self._generate_streaming(
+                    llm_service, prompt, context, issue, on_change, parser, started
+                )
+            except FixStreamAborted as e:
+                logger.warning(f"Resposta da IA abortada para {issue.get('type')}: {e}")
+                record.aborted = True
+                record.parse_success = False
+                return None
+            
+            fix = self._parse_ai_response(ai_response, issue)
+            record.parse_success = fix is not None
+            return fix
+        except Exception as e:
+            record.error = type(e).__name__
+            record.rate_limited = record.rate_limited or getattr(e, 'status_code', None) == 429
+            raise
+        finally:
+            record.latency = time.monotonic() - started
+            # Estimativa (~4 caracteres por token) quando o provedor não informa uso
+            if record.prompt_tokens is None:
+                record.prompt_tokens = (len(prompt) + len(json.dumps(context, default=str))) // 4
+            if record.completion_tokens is None:
+                record.completion_tokens = len(parser.text) // 4
+            llm_telemetry.finish_call(record)
+    
+    async def _generate_streaming(
+        self,
+        llm_service: LLMService,
+        prompt: str,
+        context: Dict[str, Any],
+        issue: Dict[str, Any],
+        on_change: Optional[Callable[[Dict[str, Any]], None]],
+        parser: IncrementalFixParser,
+        started: float
+    ) -> str:
+        """Consome a resposta em streaming com parser incremental."""
+        record = llm_telemetry.current_record()
+        stream = llm_service.generate_streaming(
+            prompt,
+            context,
+            priority=self._get_priority(issue)
+        )
+        
+        try:
+            async for chunk in stream:
+                if record and record.time_to_first_token is None:
+                    record.time_to_first_token = (
+                        time.monotonic() - started - (record.queue_wait or 0.0)
+                    )
+                for change in parser.feed(chunk):
+                    if on_change:
+                        on_change(change)
+        finally:
+            # Fecha o stream do provedor também quando abortado
+            await stream.aclose()
+        
+        return parser.finish()
+    
+    def _get_priority(self, issue: Dict[str, Any]) -> int:
+        """Prioridade da chamada ao LLM (maior = atendida primeiro)."""
+        severity_priority = {'critical': 10, 'high': 8, 'medium': 5, 'low': 2}
+        return severity_priority.get(issue.get('severity', 'medium'), 5)
+    
+    async def _prepare_context(
         self,
         issue: Dict[str, Any],
         html_context: Optional[str],
@@ -81,20 +190,28 @@ class FixGenerator:
             "issue_details": issue.get('details', {})
         }
         
-        # Adicionar contexto HTML se disponível
-        if html_context:
-            analyzed_html = self.html_analyzer.analyze_html(html_context)
+        # Snapshot do elemento dispensa o parse do HTML; senão, usar o HTML
+        # se disponível (e o contexto do elemento, se tiver seletor)
+        snapshot = element_snapshot_from_issue(issue)
+        if snapshot:
+            analyzed_html, element_context = self.html_analyzer.analyze_snapshot(snapshot)
             context["html_analysis"] = analyzed_html
-            
-            # Se tiver seletor, obter contexto específico do elemento
-            element_selector = issue.get('element')
-            if element_selector:
-                element_context = self.html_analyzer.get_element_context(html_context, element_selector)
-                if element_context:
-                    context["element_context"] = element_context
+            context["element_context"] = element_context
+        elif html_context:
+            analyzed_html, element_context = await self.html_analyzer.analyze_async(
+                html_context,
+                issue.get('element')
+            )
+            context["html_analysis"] = analyzed_html
+            if element_context:
+                context["element_context"] = element_context
         
         # Adicionar histórico de correções similares
-        if fix_history:
+        if self.fix_index is not None:
+            similar_fixes = self.fix_index.search(issue, k=5)
+            if similar_fixes:
+                context["similar_fixes"] = similar_fixes
+        elif fix_history:
             similar_fixes = [
                 fix for fix in fix_history
                 if fix.get('issue_type') == issue.get('type')
@@ -121,7 +238,17 @@ CONTEXTO:
 """
         
         if context.get('html_analysis'):
-            prompt += f"- Análise HTML: {len(context['html_analysis'].get('elements', []))} elementos interativos encontrados\n"
+            html_analysis = context['html_analysis']
+            elements_count = len(html_analysis.get('elements', []))
+            prompt += f"- Análise HTML: {elements_count} elementos interativos encontrados\n"
+            problems = html_analysis.get('problematic_elements', [])[:_MAX_PROMPT_PROBLEMS]
+            if problems:
+                prompt += (
+                    "- Seletores dos elementos problemáticos (use em target_selector "
+                    "quando o elemento afetado for um deles):\n"
+                )
+                for problem in problems:
+                    prompt += f"  - {problem['type']} <{problem['tag']}>: {problem['selector']}\n"
         
         if context.get('element_context'):
             prompt += f"- Contexto do elemento: {json.dumps(context['element_context'], indent=2)}\n"
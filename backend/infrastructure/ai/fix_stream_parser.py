@@ -0,0 +1,212 @@
+"""
+Fix Stream Parser - Infrastructure Layer
+
+Parser JSON incremental para respostas de correção do LLM em streaming.
+"""
+
+import json
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FixStreamAborted(ValueError):
+    """Resposta em streaming não pode resultar em uma correção válida."""
+
+
+class IncrementalFixParser:
+    """
+    Consome a resposta do LLM pedaço a pedaço.
+    
+    Emite cada item de "changes" assim que o objeto correspondente termina e
+    levanta FixStreamAborted assim que a resposta se mostra inválida
+    (prefixo que não é um objeto JSON, "type" diferente de "css", etc.).
+    """
+    
+    def __init__(self):
+        self.text = ''
+        self._position = 0
+        self._started = False
+        self._in_fence_header = False
+        self._fence_checked = False
+        
+        # Estrutura JSON
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._closed = False
+        
+        # Chaves do objeto raiz
+        self._expecting_key = False
+        self._awaiting_value = False
+        self._key: Optional[str] = None
+        self._value_key: Optional[str] = None
+        
+        # Itens de "changes"
+        self._changes_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.changes: List[Dict[str, Any]] = []
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Processa um novo pedaço da resposta.
+        
+        Returns:
+            Changes validadas que ficaram completas neste pedaço
+        """
+        self.text += chunk
+        completed = []
+        text = self.text
+        
+        while self._position < len(text):
+            char = text[self._position]
+            index = self._position
+            self._position += 1
+            
+            if not self._started:
+                if not self._consume_prefix(char, index):
+                    return completed
+                continue
+            
+            if self._closed:
+                continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string_end(index)
+                continue
+            
+            if char in ' \t\r\n':
+                continue
+            
+            depth = len(self._stack)
+            
+            if self._awaiting_value and depth == 1:
+                self._awaiting_value = False
+                self._value_key = self._key
+                self._check_value_start(char)
+            
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in '{[':
+                self._stack.append(char)
+                if char == '{' and self._changes_depth is not None and depth == self._changes_depth:
+                    self._item_start = index
+                elif char == '[' and depth == 1 and self._value_key == 'changes':
+                    self._changes_depth = len(self._stack)
+            elif char in '}]':
+                expected = '{' if char == '}' else '['
+                if not self._stack or self._stack[-1] != expected:
+                    raise FixStreamAborted(f"JSON malformado na posição {index}")
+                self._stack.pop()
+                change = self._on_container_end(char, index)
+                if change:
+                    completed.append(change)
+                if not self._stack:
+                    self._closed = True
+            elif char == ':' and depth == 1:
+                self._awaiting_value = True
+                self._expecting_key = False
+            elif char == ',' and depth == 1:
+                self._expecting_key = True
+                self._value_key = None
+            elif depth == 1 and self._expecting_key:
+                raise FixStreamAborted(f"Chave inválida na posição {index}")
+        
+        return completed
+    
+    def finish(self) -> str:
+        """Valida o fim do stream e retorna o texto completo."""
+        if not self._started:
+            raise FixStreamAborted("Resposta vazia")
+        if not self._closed:
+            raise FixStreamAborted("Resposta JSON incompleta")
+        return self.text
+    
+    def _consume_prefix(self, char: str, index: int) -> bool:
+        """Trata espaços e cercas de markdown antes do objeto JSON."""
+        if self._in_fence_header:
+            if char == '\n':
+                self._in_fence_header = False
+            return True
+        
+        if char in ' \t\r\n':
+            return True
+        
+        if char == '`' and not self._fence_checked:
+            # Aguardar os três acentos da cerca ```json
+            fence = self.text[index:index + 3]
+            if len(fence) < 3:
+                self._position = index
+                return False
+            if fence != '```':
+                raise FixStreamAborted("Prefixo inválido na resposta")
+            self._fence_checked = True
+            self._in_fence_header = True
+            self._position = index + 3
+            return True
+        
+        if char != '{':
+            raise FixStreamAborted(f"Resposta não é um objeto JSON (começa com {char!r})")
+        
+        self._started = True
+        self._stack.append('{')
+        self._expecting_key = True
+        return True
+    
+    def _check_value_start(self, char: str):
+        """Aborta cedo em valores de tipo incompatível com uma correção."""
+        if self._value_key == 'type' and char != '"':
+            raise FixStreamAborted("Campo 'type' não é uma string")
+        if self._value_key == 'changes' and char != '[':
+            raise FixStreamAborted("Campo 'changes' não é uma lista")
+    
+    def _on_string_end(self, index: int):
+        """Processa strings do objeto raiz (chaves e valores de 'type')."""
+        if len(self._stack) != 1:
+            return
+        
+        value = json.loads(self.text[self._string_start:index + 1])
+        
+        if self._expecting_key:
+            self._key = value
+            self._expecting_key = False
+        elif self._value_key == 'type' and value != 'css':
+            raise FixStreamAborted(f"Tipo de correção não suportado: {value}")
+    
+    def _on_container_end(self, char: str, index: int) -> Optional[Dict[str, Any]]:
+        """Emite um item de 'changes' quando seu objeto termina."""
+        if self._changes_depth is None:
+            return None
+        
+        if char == ']' and len(self._stack) == self._changes_depth - 1:
+            self._changes_depth = None
+            return None
+        
+        if char == '}' and self._item_start is not None and len(self._stack) == self._changes_depth:
+            raw_item = self.text[self._item_start:index + 1]
+            self._item_start = None
+            try:
+                item = json.loads(raw_item)
+            except json.JSONDecodeError:
+                raise FixStreamAborted("Item de 'changes' malformado")
+            
+            if isinstance(item, dict) and item.get('property') and item.get('value'):
+                change = {
+                    'property': item['property'],
+                    'value': item['value'],
+                    'reason': item.get('reason', 'Correção gerada por IA')
+                }
+                self.changes.append(change)
+                return change
+            logger.debug(f"Change inválida ignorada no stream: {raw_item[:100]}")
+        
+        return None
@@ -4,161 +4,452 @@ HTML Analyzer - Infrastructure Layer
 Analisa HTML para extrair contexto de elementos e problemas de UI.
 """
 
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-from bs4 import BeautifulSoup
+import os
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from .html_backends import HTMLParserBackend, get_html_backend
+from .selector_synthesizer import DocumentSelectorIndex, SelectorSynthesizer
+from ..cpu_pool import cpu_pool, CPUTaskTimeout
 
 logger = logging.getLogger(__name__)
 
+_BUTTON_TAGS = frozenset(['button', 'a', 'input'])
+_BUTTON_TYPES = frozenset(['submit', 'button', 'reset', None])
+_SUBMIT_TYPES = frozenset(['submit', 'button'])
+_INPUT_TAGS = frozenset(['input', 'textarea', 'select'])
+_CLICKABLE_TAGS = frozenset(['button', 'a'])
+
+
+def _copy_result(value: Any) -> Any:
+    """Cópia de um resultado de análise (dicts e listas), isolando-o do cache."""
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    return value
+
+
+class _CachedDocument:
+    """Documento parseado e resultados de análise derivados dele."""
+    
+    def __init__(self, root: Optional[Any], size: int):
+        self.root = root
+        self.size = size
+        self.analysis: Optional[Dict[str, Any]] = None
+        self.element_contexts: Dict[str, Optional[Dict[str, Any]]] = {}
+
 
 class HTMLAnalyzer:
     """
     Analisa HTML e extrai informações relevantes para correções de UI/UX.
+    
+    Documentos parseados ficam em um cache LRU indexado pelo hash do conteúdo
+    (limitado pelo total de bytes dos documentos), compartilhado entre
+    analyze_html e get_element_context. Os métodos públicos retornam cópias
+    dos resultados guardados: modificá-las não altera o cache.
+    
+    O parse usa um backend plugável (lxml quando instalado, senão
+    BeautifulSoup/html.parser); os campos extraídos são os mesmos em ambos.
+    Documentos acima de stream_threshold_bytes são analisados em streaming,
+    sem montar a árvore (ver StreamingHTMLAnalyzer).
+    
+    Os seletores dos elementos problemáticos são os mais curtos que casam
+    apenas com o elemento (ver SelectorSynthesizer); no backend bs4 não há
+    caminhos estruturais e o seletor pode casar com mais de um elemento. No
+    modo streaming continuam sendo o seletor simples de _generate_selector.
+    O FixGenerator os repassa no prompt como alvos de target_selector.
     """
     
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        backend: Optional[HTMLParserBackend] = None,
+        stream_threshold_bytes: Optional[int] = None
+    ):
+        # Import local: o módulo de streaming reutiliza as regras deste módulo
+        from .html_stream_analyzer import StreamingHTMLAnalyzer
+        
+        self.backend = backend or get_html_backend()
+        self.stream_analyzer = StreamingHTMLAnalyzer()
+        if stream_threshold_bytes is None:
+            stream_threshold_bytes = int(os.getenv("HTML_STREAM_THRESHOLD_BYTES", str(2 * 1024 * 1024)))
+        self.stream_threshold_bytes = stream_threshold_bytes
+        self.cache_max_bytes = cache_max_bytes
+        self._documents: "OrderedDict[str, _CachedDocument]" = OrderedDict()
+        self._cached_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def _get_document(self, html_content: str) -> _CachedDocument:
+        """Obtém a entrada do documento no cache (criando-a se necessário)."""
+        encoded = html_content.encode('utf-8', errors='surrogatepass')
+        key = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+        
+        document = self._documents.get(key)
+        if document is not None:
+            self._documents.move_to_end(key)
+            self.cache_hits += 1
+            return document
+        
+        self.cache_misses += 1
+        document = _CachedDocument(None, len(encoded))
+        
+        # Documentos maiores que o cache inteiro não são armazenados
+        if document.size <= self.cache_max_bytes:
+            self._documents[key] = document
+            self._cached_bytes += document.size
+            while self._cached_bytes > self.cache_max_bytes:
+                _, evicted = self._documents.popitem(last=False)
+                self._cached_bytes -= evicted.size
+        
+        return document
+    
+    def _get_root(self, document: _CachedDocument, html_content: str) -> Any:
+        """Árvore parseada do documento (parse sob demanda)."""
+        if document.root is None:
+            document.root = self.backend.parse(html_content)
+        return document.root
+    
+    def _use_streaming(self, document: _CachedDocument) -> bool:
+        return document.size > self.stream_threshold_bytes and document.root is None
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache de documentos."""
+        return {
+            "backend": self.backend.name,
+            "documents": len(self._documents),
+            "bytes": self._cached_bytes,
+            "max_bytes": self.cache_max_bytes,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses
+        }
+    
+    async def analyze_async(
+        self,
+        html_content: str,
+        selector: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Análise e contexto do elemento sem bloquear o event loop.
+        
+        Documentos grandes ainda não analisados são processados no pool de
+        processos (um único parse para análise e contexto); o resultado é
+        guardado no cache local.
+        
+        Returns:
+            Tupla (análise, contexto do elemento ou None)
+        """
+        if not html_content:
+            return {"elements": []}, None
+        
+        document = self._get_document(html_content)
+        pending_context = bool(selector) and selector not in document.element_contexts
+        
+        if document.analysis is not None and not pending_context:
+            context = document.element_contexts.get(selector) if selector else None
+            return _copy_result(document.analysis), _copy_result(context)
+        
+        if document.root is None and document.size >= cpu_pool.sync_threshold_bytes:
+            try:
+                analysis, context = await cpu_pool.run(
+                    analyze_html_task,
+                    html_content,
+                    selector,
+                    self.backend.name,
+                    self.stream_threshold_bytes,
+                    size=document.size
+                )
+            except CPUTaskTimeout:
+                return {"elements": [], "problematic_elements": []}, None
+            except Exception as e:
+                logger.error(f"Erro ao analisar HTML no pool de processos: {e}", exc_info=True)
+                return {"elements": [], "problematic_elements": []}, None
+            
+            if document.analysis is None:
+                document.analysis = analysis
+            if selector:
+                document.element_contexts[selector] = context
+            return _copy_result(document.analysis), _copy_result(context)
+        
+        analysis = self._cached_analysis(html_content)
+        context = self._cached_element_context(html_content, selector) if selector else None
+        return _copy_result(analysis), _copy_result(context)
     
     def analyze_html(self, html_content: str) -> Dict[str, Any]:
         """
         Analisa o conteúdo HTML e retorna uma estrutura de dados com elementos interativos.
+        
+        O resultado é uma cópia e pode ser modificado sem afetar o cache.
         """
+        return _copy_result(self._cached_analysis(html_content))
+    
+    def _cached_analysis(self, html_content: str) -> Dict[str, Any]:
+        """Análise guardada no cache do documento (não deve ser modificada)."""
         if not html_content:
             return {"elements": []}
         
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            elements = []
+            document = self._get_document(html_content)
+            if document.analysis is not None:
+                return document.analysis
             
-            # Extrair botões
-            for button in soup.find_all(['button', 'a', 'input'], type=['submit', 'button', 'reset', None]):
-                element_info = self._extract_element_info(button, "button")
-                if element_info:
-                    elements.append(element_info)
+            if self._use_streaming(document):
+                document.analysis = self.stream_analyzer.analyze(html_content)
+                return document.analysis
             
-            # Extrair campos de input
-            for input_field in soup.find_all(['input', 'textarea', 'select']):
-                element_info = self._extract_element_info(input_field, "input")
-                if element_info:
-                    elements.append(element_info)
-            
-            # Extrair links
-            for link in soup.find_all('a', href=True):
-                element_info = self._extract_element_info(link, "link")
-                if element_info:
-                    elements.append(element_info)
-            
-            # Extrair elementos com problemas potenciais
-            problematic_elements = self._find_problematic_elements(soup)
+            elements, problematic_elements = self._walk_document(self._get_root(document, html_content))
             
             logger.debug(f"HTML analisado. Encontrados {len(elements)} elementos interativos e {len(problematic_elements)} elementos problemáticos.")
             
-            return {
+            document.analysis = {
                 "elements": elements,
                 "problematic_elements": problematic_elements
             }
+            return document.analysis
         except Exception as e:
             logger.error(f"Erro ao analisar HTML: {e}", exc_info=True)
             return {"elements": [], "problematic_elements": []}
     
-    def _extract_element_info(self, tag, element_type: str) -> Optional[Dict[str, Any]]:
+    def _extract_element_info(self, tag, element_type: str) -> Dict[str, Any]:
         """Extrai informações de um elemento HTML."""
+        backend = self.backend
+        name = backend.tag_name(tag)
         info = {
             "type": element_type,
-            "tag": tag.name,
-            "text": tag.get_text(strip=True),
-            "id": tag.get('id'),
-            "name": tag.get('name'),
-            "class": tag.get('class'),
-            "placeholder": tag.get('placeholder'),
-            "aria_label": tag.get('aria-label'),
-            "role": tag.get('role'),
-            "value": tag.get('value'),
-            "href": tag.get('href') if tag.name == 'a' else None,
+            "tag": name,
+            "text": backend.get_text(tag),
+            "id": backend.get_attr(tag, 'id'),
+            "name": backend.get_attr(tag, 'name'),
+            "class": backend.get_attr(tag, 'class'),
+            "placeholder": backend.get_attr(tag, 'placeholder'),
+            "aria_label": backend.get_attr(tag, 'aria-label'),
+            "role": backend.get_attr(tag, 'role'),
+            "value": backend.get_attr(tag, 'value'),
+            "href": backend.get_attr(tag, 'href') if name == 'a' else None,
         }
         
         # Remover None values e listas vazias
         return {k: v for k, v in info.items() if v is not None and v != []}
     
-    def _find_problematic_elements(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
-        """Encontra elementos com problemas potenciais de UI/UX."""
-        problematic = []
-        
-        # Elementos sem texto mas clicáveis
-        for element in soup.find_all(['button', 'a']):
-            text = element.get_text(strip=True)
-            aria_label = element.get('aria-label')
-            if not text and not aria_label:
-                problematic.append({
-                    "type": "missing_label",
-                    "element": str(element),
-                    "tag": element.name,
-                    "selector": self._generate_selector(element)
-                })
-        
-        # Botões muito pequenos (detectado via estilo inline ou classe)
-        for button in soup.find_all(['button', 'a', 'input'], type=['submit', 'button']):
-            style = button.get('style', '')
-            if 'width' in style or 'height' in style:
-                # Verificar se tem dimensões pequenas (análise básica)
+    def _walk_document(self, root: Any):
+        """
+        Percorre a árvore uma única vez classificando cada elemento.
+        
+        A saída mantém a ordem da extração por categoria: botões, inputs e
+        links (um <a> pode aparecer como botão e como link), seguidos dos
+        problemas de rótulo ausente, alvo de toque pequeno e overflow.
+        """
+        buttons, inputs, links = [], [], []
+        missing_labels, small_targets, overflows = [], [], []
+        problem_nodes = []
+        selector_index = DocumentSelectorIndex(self.backend)
+        
+        backend = self.backend
+        for element in backend.iter_elements(root):
+            selector_index.add(element)
+            name = backend.tag_name(element)
+            element_type = backend.get_attr(element, 'type')
+            info = None
+            
+            # Extrair botões
+            if name in _BUTTON_TAGS and element_type in _BUTTON_TYPES:
+                info = self._extract_element_info(element, "button")
+                buttons.append(info)
+            
+            # Extrair campos de input
+            if name in _INPUT_TAGS:
+                inputs.append(self._relabel(info, element, "input"))
+            
+            # Extrair links
+            if name == 'a' and backend.get_attr(element, 'href') is not None:
+                links.append(self._relabel(info, element, "link"))
+            
+            # Elementos sem texto mas clicáveis
+            if name in _CLICKABLE_TAGS:
+                text = info["text"] if info else backend.get_text(element)
+                if not text and not backend.get_attr(element, 'aria-label'):
+                    missing_labels.append(self._problem("missing_label", element, problem_nodes))
+            
+            # Botões muito pequenos (detectado via estilo inline)
+            style = backend.get_attr(element, 'style')
+            if name in _BUTTON_TAGS and element_type in _SUBMIT_TYPES and style:
                 if 'width: 20px' in style or 'height: 20px' in style:
-                    problematic.append({
-                        "type": "small_touch_target",
-                        "element": str(button),
-                        "tag": button.name,
-                        "selector": self._generate_selector(button)
-                    })
-        
-        # Elementos com overflow potencial
-        for element in soup.find_all(attrs={'style': lambda x: x and 'overflow' in x}):
-            problematic.append({
-                "type": "overflow_issue",
-                "element": str(element),
-                "tag": element.name,
-                "selector": self._generate_selector(element)
-            })
-        
-        return problematic
+                    small_targets.append(self._problem("small_touch_target", element, problem_nodes))
+            
+            # Elementos com overflow potencial
+            if style and 'overflow' in style:
+                overflows.append(self._problem("overflow_issue", element, problem_nodes))
+        
+        # Seletores únicos dependem do índice completo do documento
+        synthesizer = SelectorSynthesizer(selector_index)
+        for problem, element in problem_nodes:
+            problem["selector"] = synthesizer.selector_for(element) or self._generate_selector(element)
+        
+        return buttons + inputs + links, missing_labels + small_targets + overflows
+    
+    def _relabel(self, info: Optional[Dict[str, Any]], element, element_type: str) -> Dict[str, Any]:
+        """Reaproveita as informações já extraídas do elemento com outro tipo."""
+        if info is None:
+            return self._extract_element_info(element, element_type)
+        return {**info, "type": element_type}
+    
+    def _problem(self, problem_type: str, element, problem_nodes: List[Tuple[Dict[str, Any], Any]]) -> Dict[str, Any]:
+        """Registra o problema; o seletor é preenchido ao final da passagem."""
+        problem = {
+            "type": problem_type,
+            "element": self.backend.to_html(element),
+            "tag": self.backend.tag_name(element),
+            "selector": None
+        }
+        problem_nodes.append((problem, element))
+        return problem
     
     def _generate_selector(self, element) -> str:
-        """Gera seletor CSS básico para um elemento."""
+        """Gera seletor CSS básico para um elemento (não necessariamente único)."""
         selector_parts = []
         
-        if element.get('id'):
-            return f"#{element.get('id')}"
+        element_id = self.backend.get_attr(element, 'id')
+        if element_id:
+            return f"#{element_id}"
         
-        if element.get('class'):
-            classes = element.get('class')
+        classes = self.backend.get_attr(element, 'class')
+        if classes:
             if isinstance(classes, list):
                 classes = ' '.join(classes)
             return f".{classes.split()[0]}"
         
-        return element.name
+        return self.backend.tag_name(element)
+    
+    def analyze_snapshot(self, snapshot: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Análise e contexto do elemento a partir de um snapshot, sem parse de HTML.
+        
+        Args:
+            snapshot: Snapshot normalizado (ver element_snapshot.parse_element_snapshot)
+        
+        Returns:
+            Tupla (análise, contexto do elemento) nos mesmos formatos de
+            analyze_async; a análise cobre apenas o elemento capturado.
+        """
+        tag = snapshot["tag"]
+        attributes = snapshot.get("attrs", {})
+        element_type = attributes.get('type')
+        info = self._snapshot_element_info(tag, attributes, snapshot["text"]["preview"], "unknown")
+        
+        elements = []
+        if tag in _BUTTON_TAGS and element_type in _BUTTON_TYPES:
+            elements.append({**info, "type": "button"})
+        if tag in _INPUT_TAGS:
+            elements.append({**info, "type": "input"})
+        if tag == 'a' and 'href' in attributes:
+            elements.append({**info, "type": "link"})
+        
+        ancestors = snapshot.get("ancestors", [])
+        parent = ancestors[0] if ancestors else None
+        
+        context = {
+            "element": info,
+            "parent": self._snapshot_element_info(parent["tag"], parent, "", "parent") if parent else None,
+            "siblings_count": snapshot.get("siblings", 0),
+            "ancestors": [self._describe_ancestor(ancestor) for ancestor in ancestors],
+        }
+        if "box" in snapshot:
+            context["bounding_box"] = snapshot["box"]
+        if snapshot.get("style"):
+            context["computed_style"] = snapshot["style"]
+        
+        return {"elements": elements, "problematic_elements": []}, context
+    
+    def _snapshot_element_info(
+        self,
+        tag: str,
+        attributes: Dict[str, str],
+        text: str,
+        element_type: str
+    ) -> Dict[str, Any]:
+        """Mesmos campos de _extract_element_info, a partir dos atributos do snapshot."""
+        info = {
+            "type": element_type,
+            "tag": tag,
+            "text": text,
+            "id": attributes.get('id'),
+            "name": attributes.get('name'),
+            "class": attributes['class'].split() if attributes.get('class') else None,
+            "placeholder": attributes.get('placeholder'),
+            "aria_label": attributes.get('aria-label'),
+            "role": attributes.get('role'),
+            "value": attributes.get('value'),
+            "href": attributes.get('href') if tag == 'a' else None,
+        }
+        return {k: v for k, v in info.items() if v is not None and v != []}
+    
+    def _describe_ancestor(self, ancestor: Dict[str, str]) -> str:
+        """Ancestral no formato tag#id.classe."""
+        description = ancestor["tag"]
+        if ancestor.get('id'):
+            description += f"#{ancestor['id']}"
+        if ancestor.get('class'):
+            description += ''.join(f".{class_name}" for class_name in ancestor['class'].split())
+        return description
     
     def get_element_context(self, html_content: str, selector: str) -> Optional[Dict[str, Any]]:
         """
         Obtém contexto de um elemento específico pelo seletor.
+        
+        O resultado é uma cópia e pode ser modificado sem afetar o cache.
         """
+        return _copy_result(self._cached_element_context(html_content, selector))
+    
+    def _cached_element_context(self, html_content: str, selector: str) -> Optional[Dict[str, Any]]:
+        """Contexto guardado no cache do documento (não deve ser modificado)."""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            element = soup.select_one(selector)
+            document = self._get_document(html_content)
+            if selector in document.element_contexts:
+                return document.element_contexts[selector]
+            
+            if self._use_streaming(document) and self.stream_analyzer.supports_selector(selector):
+                context = self.stream_analyzer.element_context(html_content, selector)
+                document.element_contexts[selector] = context
+                return context
             
-            if not element:
+            backend = self.backend
+            element = backend.select_one(self._get_root(document, html_content), selector)
+            
+            if element is None:
+                document.element_contexts[selector] = None
                 return None
             
             # Obter elemento pai e irmãos
-            parent = element.parent if element.parent else None
-            siblings = list(element.find_previous_siblings()) + list(element.find_next_siblings())
+            parent = backend.parent(element)
             
             context = {
                 "element": self._extract_element_info(element, "unknown"),
-                "parent": self._extract_element_info(parent, "parent") if parent else None,
-                "siblings_count": len(siblings),
-                "html_snippet": str(element)[:500]  # Primeiros 500 chars
+                "parent": self._extract_element_info(parent, "parent") if parent is not None else None,
+                "siblings_count": backend.siblings_count(element),
+                "html_snippet": backend.to_html(element)[:500]  # Primeiros 500 chars
             }
             
+            document.element_contexts[selector] = context
             return context
         except Exception as e:
             logger.error(f"Erro ao obter contexto do elemento: {e}", exc_info=True)
             return None
 
+
+def analyze_html_task(
+    html_content: str,
+    selector: Optional[str],
+    backend_name: str,
+    stream_threshold_bytes: int
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Tarefa do pool de processos: análise e contexto do elemento com um único parse."""
+    analyzer = HTMLAnalyzer(
+        cache_max_bytes=4 * len(html_content),
+        backend=get_html_backend(backend_name),
+        stream_threshold_bytes=stream_threshold_bytes
+    )
+    analysis = analyzer._cached_analysis(html_content)
+    context = analyzer._cached_element_context(html_content, selector) if selector else None
+    return analysis, context
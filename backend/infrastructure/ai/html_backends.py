@@ -0,0 +1,265 @@
+"""
+HTML Parser Backends - Infrastructure Layer
+
+Backends de parse HTML usados pelo HTMLAnalyzer: BeautifulSoup com html.parser
+(sempre disponível) e lxml (em C, opcional).
+"""
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.etree as etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from cssselect import HTMLTranslator, SelectorError
+    CSSSELECT_AVAILABLE = True
+except ImportError:
+    CSSSELECT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Conteúdo ignorado pelo texto dos elementos (mesmo critério do get_text do bs4)
+_NON_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+
+class HTMLParserBackend(ABC):
+    """
+    Interface de um backend de parse HTML.
+    
+    Os nós são os objetos nativos do backend; todo acesso a eles passa pelos
+    métodos do backend, evitando um objeto adaptador por elemento.
+    """
+    
+    name: str = ""
+    
+    # A árvore fecha tags implicitamente como os navegadores, então caminhos
+    # (pai > filho, :nth-of-type) valem no DOM real
+    structural_selectors: bool = False
+    
+    @abstractmethod
+    def parse(self, html_content: str) -> Any:
+        """Parseia o documento."""
+        pass
+    
+    @abstractmethod
+    def iter_elements(self, document: Any) -> Iterable[Any]:
+        """Elementos do documento em ordem de documento."""
+        pass
+    
+    @abstractmethod
+    def select_one(self, document: Any, selector: str) -> Optional[Any]:
+        """Primeiro elemento que casa com o seletor CSS."""
+        pass
+    
+    @abstractmethod
+    def tag_name(self, node: Any) -> str:
+        pass
+    
+    @abstractmethod
+    def get_attr(self, node: Any, name: str) -> Any:
+        """Valor do atributo ('class' como lista de classes)."""
+        pass
+    
+    @abstractmethod
+    def attributes(self, node: Any) -> Dict[str, Any]:
+        """Todos os atributos do elemento ('class' como lista de classes)."""
+        pass
+    
+    @abstractmethod
+    def get_text(self, node: Any) -> str:
+        """Texto do elemento com cada trecho sem espaços nas pontas."""
+        pass
+    
+    @abstractmethod
+    def to_html(self, node: Any) -> str:
+        """Markup do elemento."""
+        pass
+    
+    @abstractmethod
+    def parent(self, node: Any) -> Optional[Any]:
+        pass
+    
+    @abstractmethod
+    def siblings_count(self, node: Any) -> int:
+        """Número de elementos irmãos."""
+        pass
+
+
+class BS4Backend(HTMLParserBackend):
+    """
+    BeautifulSoup com html.parser (Python puro).
+    
+    Diferenças conhecidas em relação ao lxml (as duas árvores não seguem o
+    algoritmo de parse do HTML5 e divergem em markup malformado):
+    
+    - O html.parser não cria html/head/body implícitos: em fragmentos, o pai
+      dos elementos de topo é '[document]' (no lxml, 'body' ou 'head').
+    - O html.parser não fecha tags implicitamente: '<li>a<li>b' aninha o
+      segundo li no primeiro (o lxml os torna irmãos), alterando pai,
+      siblings_count e o texto do elemento externo.
+    - O libxml2 mantém no head o conteúdo que segue elementos de head em
+      documentos sem body ('<script></script><button>' deixa o button no
+      head); o html.parser preserva a posição original.
+    
+    Tags, atributos e a lista de elementos e problemas são os mesmos nos dois
+    backends; pai, irmãos e texto de elementos com filhos malformados não.
+    """
+    
+    name = "bs4"
+    
+    def parse(self, html_content: str) -> BeautifulSoup:
+        return BeautifulSoup(html_content, 'html.parser')
+    
+    def iter_elements(self, document: BeautifulSoup) -> Iterable[Any]:
+        return document.find_all(True)
+    
+    def select_one(self, document: BeautifulSoup, selector: str) -> Optional[Any]:
+        return document.select_one(selector)
+    
+    def tag_name(self, node) -> str:
+        return node.name
+    
+    def get_attr(self, node, name: str) -> Any:
+        return node.get(name)
+    
+    def attributes(self, node) -> Dict[str, Any]:
+        return node.attrs
+    
+    def get_text(self, node) -> str:
+        return node.get_text(strip=True)
+    
+    def to_html(self, node) -> str:
+        return str(node)
+    
+    def parent(self, node) -> Optional[Any]:
+        return node.parent
+    
+    def siblings_count(self, node) -> int:
+        return len(node.find_previous_siblings()) + len(node.find_next_siblings())
+
+
+class LXMLBackend(HTMLParserBackend):
+    """
+    lxml (libxml2) com seletores via cssselect.
+    
+    Os seletores compilados (XPath) ficam em um cache LRU limitado a
+    max_selectors entradas.
+    """
+    
+    name = "lxml"
+    structural_selectors = True
+    
+    def __init__(self, max_selectors: int = 1024):
+        if not LXML_AVAILABLE or not CSSSELECT_AVAILABLE:
+            raise ImportError("Backend lxml requer os pacotes 'lxml' e 'cssselect'")
+        self._translator = HTMLTranslator()
+        self.max_selectors = max_selectors
+        self._xpaths: "OrderedDict[str, Any]" = OrderedDict()
+    
+    def parse(self, html_content: str) -> Any:
+        try:
+            return lxml.html.document_fromstring(html_content)
+        except ValueError:
+            # Strings com declaração de encoding precisam ser passadas como bytes
+            return lxml.html.document_fromstring(html_content.encode('utf-8'))
+        except etree.ParserError:
+            # Documento sem nenhum elemento
+            return lxml.html.Element('html')
+    
+    def iter_elements(self, document) -> Iterable[Any]:
+        return (node for node in document.iter() if isinstance(node.tag, str))
+    
+    def select_one(self, document, selector: str) -> Optional[Any]:
+        xpath = self._xpaths.get(selector)
+        if xpath is not None:
+            self._xpaths.move_to_end(selector)
+        else:
+            try:
+                xpath = etree.XPath(self._translator.css_to_xpath(selector))
+            except SelectorError as e:
+                raise ValueError(f"Seletor CSS inválido: {selector}") from e
+            self._xpaths[selector] = xpath
+            while len(self._xpaths) > self.max_selectors:
+                self._xpaths.popitem(last=False)
+        
+        matches = xpath(document)
+        return matches[0] if matches else None
+    
+    def tag_name(self, node) -> str:
+        return node.tag
+    
+    def get_attr(self, node, name: str) -> Any:
+        value = node.get(name)
+        if name == 'class' and value is not None:
+            return value.split()
+        return value
+    
+    def attributes(self, node) -> Dict[str, Any]:
+        attributes = dict(node.attrib)
+        if 'class' in attributes:
+            attributes['class'] = attributes['class'].split()
+        return attributes
+    
+    def get_text(self, node) -> str:
+        parts: List[str] = []
+        self._collect_text(node, parts)
+        return ''.join(stripped for stripped in (part.strip() for part in parts) if stripped)
+    
+    def _collect_text(self, node, parts: List[str]):
+        # Como no bs4, script/style só são ignorados como descendentes
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            # Comentários e instruções de processamento não têm tag string
+            if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+                self._collect_text(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+    
+    def to_html(self, node) -> str:
+        markup = lxml.html.tostring(node, encoding='unicode', with_tail=False)
+        # Com encoding='unicode' o resultado é sempre str
+        return markup if isinstance(markup, str) else markup.decode('utf-8')
+    
+    def parent(self, node) -> Optional[Any]:
+        return node.getparent()
+    
+    def siblings_count(self, node) -> int:
+        parent = node.getparent()
+        if parent is None:
+            return 0
+        return sum(1 for child in parent if isinstance(child.tag, str)) - 1
+
+
+def get_html_backend(name: Optional[str] = None) -> HTMLParserBackend:
+    """
+    Obtém o backend de parse HTML.
+    
+    Args:
+        name: 'bs4', 'lxml' ou 'auto' (padrão: variável HTML_PARSER_BACKEND ou
+            'auto', que usa lxml quando instalado)
+    """
+    name = (name or os.getenv("HTML_PARSER_BACKEND") or "auto").lower()
+    
+    if name == "bs4":
+        return BS4Backend()
+    
+    if name == "lxml":
+        return LXMLBackend()
+    
+    if name != "auto":
+        logger.warning(f"Backend HTML desconhecido '{name}', usando detecção automática")
+    
+    if LXML_AVAILABLE and CSSSELECT_AVAILABLE:
+        return LXMLBackend()
+    return BS4Backend()
@@ -0,0 +1,485 @@
+"""
+HTML Stream Analyzer - Infrastructure Layer
+
+Análise de HTML orientada a eventos (html.parser.HTMLParser.feed), sem montar
+a árvore do documento, para snapshots de página muito grandes.
+"""
+
+import html
+import logging
+import re
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional, Iterable, Union
+
+from .html_analyzer import (
+    _BUTTON_TAGS,
+    _BUTTON_TYPES,
+    _SUBMIT_TYPES,
+    _INPUT_TAGS,
+    _CLICKABLE_TAGS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Elementos sem conteúdo (fechados na própria tag de abertura)
+_VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+# Conteúdo ignorado pelo texto dos elementos (mesmo critério do get_text do bs4)
+_NON_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+
+# Seletores compostos simples: tag, #id e .classes (sem combinadores)
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:#([\w-]+))?((?:\.[\w-]+)*)$')
+
+
+def _element_info(tag: str, attrs: Dict[str, str], element_type: str, text: str) -> Dict[str, Any]:
+    """Mesmos campos de HTMLAnalyzer._extract_element_info."""
+    classes = attrs.get('class')
+    info = {
+        "type": element_type,
+        "tag": tag,
+        "text": text,
+        "id": attrs.get('id'),
+        "name": attrs.get('name'),
+        "class": classes.split() if classes is not None else None,
+        "placeholder": attrs.get('placeholder'),
+        "aria_label": attrs.get('aria-label'),
+        "role": attrs.get('role'),
+        "value": attrs.get('value'),
+        "href": attrs.get('href') if tag == 'a' else None,
+    }
+    return {k: v for k, v in info.items() if v is not None and v != []}
+
+
+def _simple_selector(tag: str, attrs: Dict[str, str]) -> str:
+    """Mesmo seletor de HTMLAnalyzer._generate_selector (id, primeira classe ou tag)."""
+    if attrs.get('id'):
+        return f"#{attrs['id']}"
+    classes = (attrs.get('class') or '').split()
+    if classes:
+        return f".{classes[0]}"
+    return tag
+
+
+class _OpenElement:
+    """Elemento aberto na pilha de ancestrais."""
+    
+    __slots__ = (
+        'tag', 'attrs', 'children', 'text_parts', 'text_budget', 'markup_parts',
+        'markup_budget', 'infos', 'problems', 'label_slot',
+    )
+    
+    def __init__(self, tag: str, attrs: Dict[str, str]):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = 0
+        self.text_parts: Optional[List[str]] = None
+        self.text_budget = 0
+        self.markup_parts: Optional[List[str]] = None
+        self.markup_budget = 0
+        self.infos: List[Dict[str, Any]] = []
+        self.problems: List[Dict[str, Any]] = []
+        self.label_slot: Optional[int] = None
+    
+    def text(self) -> str:
+        return ''.join(self.text_parts) if self.text_parts else ''
+    
+    def markup(self) -> str:
+        return ''.join(self.markup_parts) if self.markup_parts else ''
+
+
+class _StreamParser(HTMLParser):
+    """
+    Mantém a pilha de ancestrais (limitada) e distribui texto e markup para os
+    elementos abertos que os estão capturando. Subclasses decidem o que
+    capturar em on_open e consomem o resultado em on_close.
+    """
+    
+    def __init__(self, max_depth: int, max_text_chars: int, max_markup_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_depth = max_depth
+        self.max_text_chars = max_text_chars
+        self.max_markup_chars = max_markup_chars
+        self.done = False
+        
+        self._root = _OpenElement('[document]', {})
+        self._stack: List[_OpenElement] = [self._root]
+        self._overflow = 0
+        # Elementos além de max_depth (ignorados, com os problemas que teriam)
+        self.skipped_elements = 0
+        self._non_text_depth = 0
+        self._text_capturing: List[_OpenElement] = []
+        self._markup_capturing: List[_OpenElement] = []
+        
+        # Nó de texto em andamento (pode chegar em vários pedaços do feed)
+        self._pending_text: List[str] = []
+        self._pending_size = 0
+    
+    # Captura
+    
+    def capture_text(self, entry: _OpenElement):
+        entry.text_parts = []
+        entry.text_budget = self.max_text_chars
+        self._text_capturing.append(entry)
+    
+    def capture_markup(self, entry: _OpenElement, limit: Optional[int] = None):
+        entry.markup_parts = []
+        entry.markup_budget = limit or self.max_markup_chars
+        self._markup_capturing.append(entry)
+    
+    def _append_markup(self, markup: str):
+        for entry in self._markup_capturing:
+            if entry.markup_parts is not None and entry.markup_budget > 0:
+                piece = markup[:entry.markup_budget]
+                entry.markup_parts.append(piece)
+                entry.markup_budget -= len(piece)
+    
+    def _flush_text(self):
+        """Distribui o nó de texto concluído (sem espaços nas pontas) aos capturadores."""
+        if not self._pending_text:
+            return
+        
+        text = ''.join(self._pending_text)
+        truncated = self._pending_size > self.max_text_chars
+        self._pending_text = []
+        self._pending_size = 0
+        
+        # Trechos truncados só perdem o final, que seria cortado de qualquer forma
+        text = text.lstrip() if truncated else text.strip()
+        if not text:
+            return
+        
+        for entry in self._text_capturing:
+            if entry.text_parts is not None and entry.text_budget > 0:
+                piece = text[:entry.text_budget]
+                entry.text_parts.append(piece)
+                entry.text_budget -= len(piece)
+    
+    # Eventos do HTMLParser
+    
+    def handle_starttag(self, tag: str, attrs):
+        self._flush_text()
+        start_tag = self.get_starttag_text() or f"<{tag}>"
+        
+        if len(self._stack) > self.max_depth:
+            # Descendentes além da profundidade máxima não são acompanhados
+            self.skipped_elements += 1
+            if tag not in _VOID_TAGS:
+                self._overflow += 1
+            self._append_markup(start_tag)
+            return
+        
+        entry = _OpenElement(
+            tag, {name: value if value is not None else '' for name, value in attrs}
+        )
+        self._stack[-1].children += 1
+        self.on_open(entry, self._stack[-1])
+        self._append_markup(start_tag)
+        
+        if tag in _VOID_TAGS:
+            self._close(entry)
+            return
+        
+        self._stack.append(entry)
+        if tag in _NON_TEXT_TAGS:
+            self._non_text_depth += 1
+    
+    def handle_endtag(self, tag: str):
+        self._flush_text()
+        
+        if self._overflow:
+            self._overflow -= 1
+            self._append_markup(f"</{tag}>")
+            return
+        
+        # Fecha até o ancestral correspondente; tags de fechamento soltas são ignoradas
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index].tag == tag:
+                self._append_markup(f"</{tag}>")
+                while len(self._stack) > index:
+                    self._pop()
+                return
+    
+    def handle_data(self, data: str):
+        if self._markup_capturing:
+            self._append_markup(data if self._non_text_depth else html.escape(data, quote=False))
+        
+        if self._non_text_depth or not self._text_capturing:
+            return
+        
+        if self._pending_size <= self.max_text_chars:
+            self._pending_text.append(data)
+            self._pending_size += len(data)
+    
+    def handle_comment(self, data: str):
+        self._flush_text()
+        if self._markup_capturing:
+            self._append_markup(f"<!--{data}-->")
+    
+    def close(self):
+        super().close()
+        self._flush_text()
+        while len(self._stack) > 1:
+            self._pop()
+        self.on_document_end()
+    
+    def _pop(self):
+        entry = self._stack.pop()
+        if entry.tag in _NON_TEXT_TAGS:
+            self._non_text_depth -= 1
+        self._close(entry)
+    
+    def _close(self, entry: _OpenElement):
+        if entry.text_parts is not None:
+            self._text_capturing.remove(entry)
+        if entry.markup_parts is not None:
+            self._markup_capturing.remove(entry)
+        self.on_close(entry)
+    
+    # Ganchos
+    
+    def on_open(self, entry: _OpenElement, parent: _OpenElement):
+        pass
+    
+    def on_close(self, entry: _OpenElement):
+        pass
+    
+    def on_document_end(self):
+        pass
+
+
+class _AnalysisParser(_StreamParser):
+    """Coleta elementos interativos e problemas (mesmas regras de HTMLAnalyzer)."""
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.buttons: List[Dict[str, Any]] = []
+        self.inputs: List[Dict[str, Any]] = []
+        self.links: List[Dict[str, Any]] = []
+        self.missing_labels: List[Optional[Dict[str, Any]]] = []
+        self.small_targets: List[Dict[str, Any]] = []
+        self.overflows: List[Dict[str, Any]] = []
+    
+    def on_open(self, entry: _OpenElement, parent: _OpenElement):
+        name = entry.tag
+        attrs = entry.attrs
+        element_type = attrs.get('type')
+        
+        # Campos de texto são preenchidos no fechamento; as listas mantêm a ordem de abertura
+        if name in _BUTTON_TAGS and element_type in _BUTTON_TYPES:
+            entry.infos.append(_element_info(name, attrs, "button", ''))
+            self.buttons.append(entry.infos[-1])
+        
+        if name in _INPUT_TAGS:
+            entry.infos.append(_element_info(name, attrs, "input", ''))
+            self.inputs.append(entry.infos[-1])
+        
+        if name == 'a' and 'href' in attrs:
+            entry.infos.append(_element_info(name, attrs, "link", ''))
+            self.links.append(entry.infos[-1])
+        
+        if name in _CLICKABLE_TAGS:
+            entry.label_slot = len(self.missing_labels)
+            self.missing_labels.append(None)
+        
+        style = attrs.get('style')
+        if name in _BUTTON_TAGS and element_type in _SUBMIT_TYPES and style:
+            if 'width: 20px' in style or 'height: 20px' in style:
+                entry.problems.append(self._problem("small_touch_target", entry))
+                self.small_targets.append(entry.problems[-1])
+        
+        if style and 'overflow' in style:
+            entry.problems.append(self._problem("overflow_issue", entry))
+            self.overflows.append(entry.problems[-1])
+        
+        if entry.infos or entry.label_slot is not None:
+            self.capture_text(entry)
+        if entry.problems or entry.label_slot is not None:
+            self.capture_markup(entry)
+    
+    def on_close(self, entry: _OpenElement):
+        if entry.text_parts is None and entry.markup_parts is None:
+            return
+        
+        text = entry.text()
+        markup = entry.markup()
+        
+        for info in entry.infos:
+            info["text"] = text
+        for problem in entry.problems:
+            problem["element"] = markup
+        
+        if entry.label_slot is not None and not text and not entry.attrs.get('aria-label'):
+            problem = self._problem("missing_label", entry)
+            problem["element"] = markup
+            self.missing_labels[entry.label_slot] = problem
+    
+    def _problem(self, problem_type: str, entry: _OpenElement) -> Dict[str, Any]:
+        return {
+            "type": problem_type,
+            "element": '',
+            "tag": entry.tag,
+            "selector": _simple_selector(entry.tag, entry.attrs)
+        }
+    
+    def result(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "elements": self.buttons + self.inputs + self.links,
+            "problematic_elements": (
+                [problem for problem in self.missing_labels if problem]
+                + self.small_targets
+                + self.overflows
+            )
+        }
+        if self.skipped_elements:
+            result["skipped_elements"] = self.skipped_elements
+        return result
+
+
+class _ContextParser(_StreamParser):
+    """Localiza o primeiro elemento que casa com um seletor simples e seu contexto."""
+    
+    def __init__(self, selector: str, *args):
+        super().__init__(*args)
+        match = _SIMPLE_SELECTOR.match(selector)
+        if match is None:
+            raise ValueError(f"Seletor não suportado na análise em streaming: {selector}")
+        tag, element_id, classes = match.groups()
+        self._tag = tag.lower() if tag else None
+        self._id = element_id
+        self._classes = set(classes.split('.')[1:]) if classes else set()
+        
+        self.element: Optional[_OpenElement] = None
+        self.parent: Optional[_OpenElement] = None
+        self._element_closed = False
+        self.capture_text(self._root)
+    
+    def on_open(self, entry: _OpenElement, parent: _OpenElement):
+        # Texto de todos os ancestrais abertos (o pai só é conhecido ao encontrar o elemento)
+        if self.element is None:
+            self.capture_text(entry)
+        
+        if self.element is None and self._matches(entry):
+            self.element = entry
+            self.parent = parent
+            self.capture_markup(entry, limit=500)
+    
+    def on_close(self, entry: _OpenElement):
+        if entry is self.element:
+            self._element_closed = True
+        elif entry is self.parent and self._element_closed:
+            self.done = True
+    
+    def on_document_end(self):
+        self.done = True
+    
+    def _matches(self, entry: _OpenElement) -> bool:
+        if self._tag and entry.tag != self._tag:
+            return False
+        if self._id and entry.attrs.get('id') != self._id:
+            return False
+        if self._classes and not self._classes.issubset((entry.attrs.get('class') or '').split()):
+            return False
+        return True
+    
+    def result(self) -> Optional[Dict[str, Any]]:
+        element = self.element
+        parent = self.parent
+        if element is None or parent is None:
+            return None
+        
+        return {
+            "element": _element_info(element.tag, element.attrs, "unknown", element.text()),
+            "parent": _element_info(parent.tag, parent.attrs, "parent", parent.text()),
+            "siblings_count": parent.children - 1,
+            "html_snippet": element.markup()[:500]
+        }
+
+
+class StreamingHTMLAnalyzer:
+    """
+    Analisa HTML em uma passagem, consumindo o documento em pedaços.
+    
+    Produz os mesmos campos de HTMLAnalyzer.analyze_html/get_element_context
+    guardando apenas a pilha de ancestrais (até max_depth níveis) e os
+    trechos de texto/markup dos elementos em análise (limitados por
+    max_text_chars e max_markup_chars). Diferenças em relação à árvore
+    completa: textos e markup longos são truncados e o markup é reconstruído
+    a partir das tags originais.
+    
+    Elementos aninhados além de max_depth são ignorados, com os problemas
+    que teriam; a análise informa quantos em "skipped_elements" (ausente
+    quando nenhum foi ignorado).
+    """
+    
+    def __init__(
+        self,
+        max_depth: int = 256,
+        max_text_chars: int = 2000,
+        max_markup_chars: int = 2000,
+        chunk_size: int = 64 * 1024
+    ):
+        self.max_depth = max_depth
+        self.max_text_chars = max_text_chars
+        self.max_markup_chars = max_markup_chars
+        self.chunk_size = chunk_size
+    
+    def analyze(self, html_content: Union[str, Iterable[str]]) -> Dict[str, Any]:
+        """Elementos interativos e elementos problemáticos do documento."""
+        parser = _AnalysisParser(self.max_depth, self.max_text_chars, self.max_markup_chars)
+        self._run(parser, html_content)
+        result = parser.result()
+        if parser.skipped_elements:
+            logger.warning(
+                f"Análise em streaming ignorou {parser.skipped_elements} elementos aninhados "
+                f"além de {self.max_depth} níveis"
+            )
+        logger.debug(
+            f"HTML analisado em streaming. Encontrados {len(result['elements'])} elementos "
+            f"interativos e {len(result['problematic_elements'])} elementos problemáticos."
+        )
+        return result
+    
+    def element_context(
+        self,
+        html_content: Union[str, Iterable[str]],
+        selector: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Contexto do primeiro elemento que casa com o seletor.
+        
+        Raises:
+            ValueError: Se o seletor não for um seletor simples (ver supports_selector)
+        """
+        if not self.supports_selector(selector):
+            raise ValueError(f"Seletor não suportado na análise em streaming: {selector}")
+        
+        parser = _ContextParser(
+            selector.strip(), self.max_depth, self.max_text_chars, self.max_markup_chars
+        )
+        self._run(parser, html_content)
+        return parser.result()
+    
+    @staticmethod
+    def supports_selector(selector: str) -> bool:
+        """Seletores compostos simples (tag, #id, .classe) são suportados."""
+        selector = selector.strip()
+        return bool(selector) and _SIMPLE_SELECTOR.match(selector) is not None
+    
+    def _run(self, parser: _StreamParser, html_content: Union[str, Iterable[str]]):
+        """Alimenta o parser pedaço a pedaço, parando assim que ele concluir."""
+        if isinstance(html_content, str):
+            chunks = (
+                html_content[start:start + self.chunk_size]
+                for start in range(0, len(html_content), self.chunk_size)
+            )
+        else:
+            chunks = html_content
+        
+        for chunk in chunks:
+            parser.feed(chunk)
+            if parser.done:
+                return
+        parser.close()
@@ -4,10 +4,16 @@ LLM Service - Infrastructure Layer
 Serviço para integração com LLM (OpenAI, Anthropic, etc.).
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import random
+import time
+from typing import AsyncGenerator, Optional, Dict, Any
 from abc import ABC, abstractmethod
 
+from .rate_limiter import LLMRateLimiter, is_rate_limit_error, get_retry_after
+from .telemetry import current_llm_call
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,90 +21,246 @@ class LLMService(ABC):
     """Interface para serviços de LLM."""
     
     @abstractmethod
-    async def generate(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+    async def generate(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> str:
         """Gera resposta do LLM."""
         pass
     
     @abstractmethod
-    async def generate_streaming(self, prompt: str, context: Optional[Dict[str, Any]] = None):
-        """Gera resposta do LLM em streaming."""
-        pass
+    def generate_streaming(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> AsyncGenerator[str, None]:
+        """Gera resposta do LLM em streaming (implementado como gerador assíncrono)."""
+        raise NotImplementedError
 
 
 class OpenAILLMService(LLMService):
     """Implementação usando OpenAI API."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4",
+        rate_limiter: Optional[LLMRateLimiter] = None,
+        max_retries: int = 3,
+        max_tokens: int = 2000
+    ):
         """
         Inicializa serviço OpenAI.
         
         Args:
             api_key: Chave da API OpenAI (ou usar variável de ambiente)
             model: Modelo a usar (gpt-4, gpt-3.5-turbo, etc.)
+            rate_limiter: Limitador compartilhado de taxa/concorrência (opcional)
+            max_retries: Tentativas extras após respostas 429
+            max_tokens: Limite de tokens da resposta
         """
         self.api_key = api_key
         self.model = model
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
         self._client = None
     
     def _get_client(self):
-        """Obtém cliente OpenAI (lazy loading)."""
+        """Obtém cliente OpenAI assíncrono (lazy loading)."""
         if self._client is None:
             try:
                 import openai
-                self._client = openai.OpenAI(api_key=self.api_key)
+                # Retries de 429 são feitos aqui, coordenados com o rate limiter
+                self._client = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
             except ImportError:
                 raise ImportError("openai package não instalado. Instale com: pip install openai")
         return self._client
     
-    async def generate(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+    def _build_messages(self, prompt: str, context: Optional[Dict[str, Any]]) -> list:
+        """Monta mensagens do chat."""
+        messages = [{"role": "user", "content": prompt}]
+        
+        if context:
+            # Adicionar contexto como mensagem do sistema
+            context_str = self._format_context(context)
+            messages.insert(0, {"role": "system", "content": context_str})
+        
+        return messages
+    
+    def _estimate_tokens(self, messages: list) -> int:
+        """Estimativa de tokens da chamada (prompt + limite da resposta)."""
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return prompt_chars // 4 + self.max_tokens
+    
+    async def _backoff(self, attempt: int, error: Exception):
+        """Aguarda antes de nova tentativa após 429."""
+        delay = get_retry_after(error)
+        if delay is None:
+            delay = min(30.0, (2 ** attempt) + random.uniform(0, 1))
+        logger.warning(
+            f"LLM rate limit (429), tentativa {attempt + 1}/{self.max_retries}. "
+            f"Aguardando {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+    
+    async def generate(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> str:
         """Gera resposta do LLM."""
-        try:
-            client = self._get_client()
-            
-            messages = [{"role": "user", "content": prompt}]
-            
-            if context:
-                # Adicionar contexto como mensagem do sistema
-                context_str = self._format_context(context)
-                messages.insert(0, {"role": "system", "content": context_str})
+        client = self._get_client()
+        messages = self._build_messages(prompt, context)
+        estimated_tokens = self._estimate_tokens(messages)
+        limiter = self.rate_limiter
+        
+        attempt = 0
+        while True:
+            permit = None
+            started = time.monotonic()
+            try:
+                if limiter:
+                    permit = await limiter.acquire(estimated_tokens, priority)
+                    started = time.monotonic()
+                    self._record_queue_wait(permit.queue_wait)
+                
+                response = await self._create_completion(client, messages)
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                self._record_rate_limited(rate_limited)
+                if limiter and permit:
+                    limiter.release(
+                        permit,
+                        latency=time.monotonic() - started,
+                        rate_limited=rate_limited,
+                        retry_after=get_retry_after(e)
+                    )
+                if rate_limited and attempt < self.max_retries:
+                    await self._backoff(attempt, e)
+                    attempt += 1
+                    continue
+                logger.error(f"Erro ao gerar resposta do LLM: {e}", exc_info=True)
+                raise
+            except BaseException:
+                # Cancelamento: devolver a permissão
+                if limiter and permit:
+                    limiter.release(permit, latency=time.monotonic() - started)
+                raise
             
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
+            usage = getattr(response, 'usage', None)
+            self._record_usage(usage)
+            if limiter and permit:
+                limiter.release(
+                    permit,
+                    latency=time.monotonic() - started,
+                    tokens_used=usage.total_tokens if usage else None
+                )
             
             return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Erro ao gerar resposta do LLM: {e}", exc_info=True)
-            raise
     
-    async def generate_streaming(self, prompt: str, context: Optional[Dict[str, Any]] = None):
+    async def _create_completion(self, client, messages: list, stream: bool = False):
+        """Chama a API de chat completions."""
+        options = {}
+        if stream:
+            # Uso de tokens chega no último chunk do stream
+            options['stream_options'] = {"include_usage": True}
+        return await client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=self.max_tokens,
+            stream=stream,
+            **options
+        )
+    
+    def _record_queue_wait(self, queue_wait: float):
+        """Registra espera na fila do rate limiter na telemetria da chamada."""
+        record = current_llm_call.get()
+        if record:
+            record.queue_wait = (record.queue_wait or 0.0) + queue_wait
+    
+    def _record_rate_limited(self, rate_limited: bool):
+        """Registra 429 recebido na telemetria da chamada."""
+        record = current_llm_call.get()
+        if record and rate_limited:
+            record.rate_limited = True
+    
+    def _record_usage(self, usage):
+        """Registra uso de tokens informado pelo provedor."""
+        record = current_llm_call.get()
+        if record and usage is not None:
+            record.prompt_tokens = usage.prompt_tokens
+            record.completion_tokens = usage.completion_tokens
+    
+    async def generate_streaming(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> AsyncGenerator[str, None]:
         """Gera resposta do LLM em streaming."""
-        try:
-            client = self._get_client()
-            
-            messages = [{"role": "user", "content": prompt}]
-            
-            if context:
-                context_str = self._format_context(context)
-                messages.insert(0, {"role": "system", "content": context_str})
-            
-            stream = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=2000,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-        except Exception as e:
-            logger.error(f"Erro ao gerar resposta do LLM (streaming): {e}", exc_info=True)
-            raise
+        client = self._get_client()
+        messages = self._build_messages(prompt, context)
+        estimated_tokens = self._estimate_tokens(messages)
+        limiter = self.rate_limiter
+        
+        attempt = 0
+        while True:
+            permit = None
+            started = time.monotonic()
+            received_chars = 0
+            try:
+                if limiter:
+                    permit = await limiter.acquire(estimated_tokens, priority)
+                    started = time.monotonic()
+                    self._record_queue_wait(permit.queue_wait)
+                
+                stream = await self._create_completion(client, messages, stream=True)
+                try:
+                    async for chunk in stream:
+                        if getattr(chunk, 'usage', None) is not None:
+                            self._record_usage(chunk.usage)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            received_chars += len(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                finally:
+                    # Encerrar a conexão se o consumidor abortar o stream
+                    await stream.close()
+                
+                if limiter and permit:
+                    limiter.release(
+                        permit,
+                        latency=time.monotonic() - started,
+                        tokens_used=estimated_tokens - self.max_tokens + received_chars // 4
+                    )
+                return
+            except Exception as e:
+                rate_limited = is_rate_limit_error(e)
+                self._record_rate_limited(rate_limited)
+                if limiter and permit:
+                    limiter.release(
+                        permit,
+                        latency=time.monotonic() - started,
+                        rate_limited=rate_limited,
+                        retry_after=get_retry_after(e)
+                    )
+                # Só é seguro repetir se nada foi emitido ainda
+                if rate_limited and received_chars == 0 and attempt < self.max_retries:
+                    await self._backoff(attempt, e)
+                    attempt += 1
+                    continue
+                logger.error(f"Erro ao gerar resposta do LLM (streaming): {e}", exc_info=True)
+                raise
+            except BaseException:
+                # Stream fechado pelo consumidor (aclose/cancelamento)
+                if limiter and permit:
+                    limiter.release(permit, latency=time.monotonic() - started)
+                raise
     
     def _format_context(self, context: Dict[str, Any]) -> str:
         """Formata contexto para prompt."""
@@ -115,14 +277,24 @@ class OpenAILLMService(LLMService):
 class MockLLMService(LLMService):
     """Mock LLM Service para testes."""
     
-    async def generate(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
+    async def generate(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> str:
         """Gera resposta mock."""
         logger.debug(f"Mock LLM: prompt={prompt[:100]}...")
         return '{"type": "css", "target_element": "button", "changes": [{"property": "min-width", "value": "44px", "reason": "Mock fix"}]}'
     
-    async def generate_streaming(self, prompt: str, context: Optional[Dict[str, Any]] = None):
+    async def generate_streaming(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> AsyncGenerator[str, None]:
         """Gera resposta mock em streaming."""
-        response = await self.generate(prompt, context)
+        response = await self.generate(prompt, context, priority)
         for char in response:
             yield char
 
@@ -0,0 +1,243 @@
+"""
+LLM Simulator - Infrastructure Layer
+
+LLM local simulado para testes de carga e regressão, com latência realista,
+streaming, erros injetados e respostas determinísticas por problema.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, Optional, Dict, Any, List
+
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+# Propriedades plausíveis por tipo de problema
+_SIMULATED_CHANGES: Dict[str, List[tuple]] = {
+    'small_touch_target': [('min-width', '44px'), ('min-height', '44px'), ('padding', '12px 16px')],
+    'zero_dimensions': [('min-width', '1px'), ('min-height', '1px')],
+    'overflow': [('overflow', 'hidden'), ('text-overflow', 'ellipsis')],
+    'accessibility_low_contrast': [('color', '#1a1a1a'), ('background-color', '#ffffff')],
+    'accessibility_missing_focus': [('outline', '2px solid #0066cc'), ('outline-offset', '2px')],
+    'accessibility_small_text': [('font-size', '16px'), ('line-height', '1.5')],
+    'responsive_fixed_width': [('max-width', '100%'), ('width', 'auto')],
+    'responsive_overflow': [('overflow-x', 'hidden'), ('max-width', '100vw')],
+    'visual_poor_spacing': [('margin-bottom', '1rem'), ('padding', '0.5rem')],
+    'visual_z_index': [('position', 'relative'), ('z-index', '10')],
+}
+_DEFAULT_CHANGES = [('box-sizing', 'border-box'), ('max-width', '100%')]
+
+
+class SimulatedProviderError(Exception):
+    """Erro simulado do provedor (mesma forma dos erros HTTP do SDK)."""
+    
+    class _Response:
+        def __init__(self, headers: Dict[str, str]):
+            self.headers = headers
+    
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {'retry-after': str(retry_after)} if retry_after is not None else {}
+        self.response = self._Response(headers)
+
+
+class SimulatedLLMService(LLMService):
+    """
+    LLM simulado configurável.
+    
+    A latência total segue uma distribuição log-normal (mediana + sigma), com
+    tempo até o primeiro token e vazão de tokens separados no streaming. Erros
+    429, timeouts e JSON malformado são injetados com as probabilidades dadas.
+    O conteúdo da resposta é determinístico por (seed, tipo, elemento); falhas
+    e latências vêm de um gerador semeado por requisição (seed, prompt,
+    contexto e repetição do prompt), independente da ordem das chamadas
+    concorrentes. As repetições são contadas só para os max_tracked_prompts
+    prompts mais recentes (LRU); um prompt descartado volta à repetição 0.
+    """
+    
+    def __init__(
+        self,
+        seed: int = 0,
+        model: str = "simulated",
+        ttft_median: float = 0.4,
+        latency_median: float = 2.0,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 60.0,
+        rate_limit_probability: float = 0.0,
+        timeout_probability: float = 0.0,
+        malformed_probability: float = 0.0,
+        timeout_seconds: float = 30.0,
+        requests_per_minute: Optional[int] = None,
+        time_scale: float = 1.0,
+        max_tracked_prompts: int = 10000
+    ):
+        """
+        Args:
+            seed: Semente para respostas e sorteios determinísticos
+            model: Nome do modelo reportado
+            ttft_median: Mediana do tempo até o primeiro token (s)
+            latency_median: Mediana da latência total sem streaming (s)
+            latency_sigma: Dispersão da log-normal das latências
+            tokens_per_second: Vazão de tokens no streaming
+            rate_limit_probability: Probabilidade de responder 429
+            timeout_probability: Probabilidade de timeout
+            malformed_probability: Probabilidade de JSON malformado
+            timeout_seconds: Tempo até o timeout simulado (s)
+            requests_per_minute: Limite do provedor simulado (429 ao exceder)
+            time_scale: Multiplicador de todos os tempos (0 = instantâneo)
+            max_tracked_prompts: Prompts com repetições contadas (LRU)
+        """
+        self.seed = seed
+        self.model = model
+        self.ttft_median = ttft_median
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_probability = rate_limit_probability
+        self.timeout_probability = timeout_probability
+        self.malformed_probability = malformed_probability
+        self.timeout_seconds = timeout_seconds
+        self.requests_per_minute = requests_per_minute
+        self.time_scale = time_scale
+        self.max_tracked_prompts = max_tracked_prompts
+        self._prompt_calls: "OrderedDict[str, int]" = OrderedDict()
+        self._request_times: deque = deque()
+        self.calls = 0
+    
+    async def generate(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> str:
+        """Gera resposta simulada completa."""
+        rng = self._request_rng(prompt, context)
+        response = await self._start_call(context, rng)
+        await self._sleep(self._sample(rng, self.latency_median))
+        return response
+    
+    async def generate_streaming(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = 5
+    ) -> AsyncGenerator[str, None]:
+        """Gera resposta simulada em streaming (~4 caracteres por token)."""
+        rng = self._request_rng(prompt, context)
+        response = await self._start_call(context, rng)
+        await self._sleep(self._sample(rng, self.ttft_median))
+        
+        chunk_size = 4
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for start in range(0, len(response), chunk_size):
+            if start:
+                await self._sleep(delay)
+            yield response[start:start + chunk_size]
+    
+    def _request_rng(self, prompt: str, context: Optional[Dict[str, Any]]) -> random.Random:
+        """
+        Gerador da requisição, semeado por (seed, prompt, contexto, repetição):
+        a n-ésima chamada com o mesmo prompt sorteia sempre o mesmo, em
+        qualquer ordem de execução.
+        """
+        key = hashlib.sha256(
+            f"{prompt}\0{json.dumps(context or {}, sort_keys=True, default=str)}".encode('utf-8')
+        ).hexdigest()
+        repetition = self._prompt_calls.get(key, 0)
+        self._prompt_calls[key] = repetition + 1
+        self._prompt_calls.move_to_end(key)
+        while len(self._prompt_calls) > self.max_tracked_prompts:
+            self._prompt_calls.popitem(last=False)
+        digest = hashlib.sha256(f"{self.seed}:{key}:{repetition}".encode('utf-8')).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+    
+    async def _start_call(self, context: Optional[Dict[str, Any]], rng: random.Random) -> str:
+        """Aplica limites e falhas injetadas; retorna o conteúdo da resposta."""
+        self.calls += 1
+        self._check_provider_rate_limit()
+        
+        if rng.random() < self.rate_limit_probability:
+            await self._sleep(self._sample(rng, self.ttft_median))
+            raise SimulatedProviderError("Rate limit simulado", status_code=429, retry_after=1.0)
+        
+        if rng.random() < self.timeout_probability:
+            await self._sleep(self.timeout_seconds)
+            raise TimeoutError("Timeout simulado do LLM")
+        
+        response = self.build_response(context or {})
+        
+        if rng.random() < self.malformed_probability:
+            response = self._malform(response, rng)
+        
+        return response
+    
+    def build_response(self, context: Dict[str, Any]) -> str:
+        """Resposta JSON determinística para o problema do contexto."""
+        issue_type = context.get('issue_type') or 'unknown'
+        element = context.get('element') or 'body'
+        digest = hashlib.sha256(f"{self.seed}:{issue_type}:{element}".encode('utf-8')).digest()
+        rng = random.Random(int.from_bytes(digest[:8], 'big'))
+        
+        candidates = _SIMULATED_CHANGES.get(issue_type, _DEFAULT_CHANGES)
+        count = rng.randint(1, len(candidates))
+        changes = [
+            {
+                'property': prop,
+                'value': value,
+                'reason': f'Correção simulada para {issue_type}'
+            }
+            for prop, value in candidates[:count]
+        ]
+        
+        return json.dumps({
+            'type': 'css',
+            'target_element': element,
+            'target_selector': element,
+            'changes': changes,
+            'confidence': round(rng.uniform(0.4, 0.95), 2)
+        })
+    
+    def _malform(self, response: str, rng: random.Random) -> str:
+        """Corrompe a resposta de forma realista."""
+        kind = rng.choice(['truncated', 'prose', 'null'])
+        if kind == 'truncated':
+            return response[:rng.randint(1, max(1, len(response) - 1))]
+        if kind == 'prose':
+            return f"Claro! Aqui está a correção:\n{response}"
+        return 'null'
+    
+    def _check_provider_rate_limit(self):
+        """Simula o limite de requisições/minuto do provedor."""
+        if not self.requests_per_minute:
+            return
+        
+        now = time.monotonic()
+        window = 60.0 * self.time_scale if self.time_scale > 0 else 60.0
+        while self._request_times and now - self._request_times[0] > window:
+            self._request_times.popleft()
+        
+        if len(self._request_times) >= self.requests_per_minute:
+            retry_after = window - (now - self._request_times[0])
+            raise SimulatedProviderError(
+                "Limite de requisições do provedor simulado excedido",
+                status_code=429,
+                retry_after=round(retry_after, 3)
+            )
+        
+        self._request_times.append(now)
+    
+    def _sample(self, rng: random.Random, median: float) -> float:
+        """Amostra log-normal em torno da mediana."""
+        if median <= 0:
+            return 0.0
+        return rng.lognormvariate(0.0, self.latency_sigma) * median
+    
+    async def _sleep(self, seconds: float):
+        await asyncio.sleep(seconds * self.time_scale)
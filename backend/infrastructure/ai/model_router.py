@@ -0,0 +1,151 @@
+"""
+Model Router - Infrastructure Layer
+
+Roteamento de chamadas entre modelos: modelo rápido/barato primeiro e
+escalonamento para o modelo caro apenas quando necessário.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelTier:
+    """Nível de modelo (do mais barato para o mais caro)."""
+    name: str
+    llm_service: LLMService
+
+
+def _confidence(fix: Any) -> Optional[float]:
+    """Confiança da correção como float (ausente = 0.0; None se inválida)."""
+    try:
+        confidence = float(fix.get('confidence') or 0.0)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return None if math.isnan(confidence) else confidence
+
+
+class ModelRouter:
+    """
+    Tenta os níveis de modelo em ordem e escalona quando a resposta não serve.
+    
+    Escalona quando a tentativa falha (erro ou resposta inválida), quando a
+    confiança da correção fica abaixo do limiar ou quando o tipo de problema
+    está na lista de escalonamento direto (que vai direto ao último nível).
+    """
+    
+    def __init__(
+        self,
+        tiers: List[ModelTier],
+        confidence_threshold: float = 0.6,
+        escalate_issue_types: Optional[List[str]] = None
+    ):
+        if not tiers:
+            raise ValueError("ModelRouter precisa de pelo menos um nível de modelo")
+        
+        self.tiers = tiers
+        self.confidence_threshold = confidence_threshold
+        self.escalate_issue_types = set(escalate_issue_types or [])
+        self._stats: Dict[str, Dict[str, Any]] = {
+            tier.name: {
+                'calls': 0,
+                'accepted': 0,
+                'low_confidence': 0,
+                'invalid': 0,
+                'errors': 0,
+                'total_latency': 0.0,
+            }
+            for tier in tiers
+        }
+    
+    def select_tiers(self, issue_type: Optional[str]) -> List[ModelTier]:
+        """Níveis a tentar, em ordem, para um tipo de problema."""
+        if issue_type in self.escalate_issue_types:
+            return self.tiers[-1:]
+        return self.tiers
+    
+    async def run(
+        self,
+        issue_type: Optional[str],
+        attempt: Callable[[LLMService], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Executa a tentativa de geração nos níveis, escalonando conforme necessário.
+        
+        Args:
+            issue_type: Tipo do problema
+            attempt: Função que gera a correção com um LLMService
+                (retorna None se a resposta não for válida)
+        
+        Returns:
+            Correção aceita, a melhor correção de baixa confiança obtida
+            (se nenhum nível atingir o limiar) ou None
+        """
+        tiers = self.select_tiers(issue_type)
+        fallback = None
+        
+        for index, tier in enumerate(tiers):
+            stats = self._stats[tier.name]
+            stats['calls'] += 1
+            started = time.monotonic()
+            
+            failed = False
+            try:
+                fix = await attempt(tier.llm_service)
+            except Exception as e:
+                stats['errors'] += 1
+                logger.warning(f"Erro no modelo '{tier.name}' para {issue_type}: {e}")
+                fix = None
+                failed = True
+            finally:
+                stats['total_latency'] += time.monotonic() - started
+            
+            confidence = None
+            if fix is not None:
+                confidence = _confidence(fix)
+                if confidence is None:
+                    logger.warning(f"Confiança inválida do modelo '{tier.name}' para {issue_type}")
+                    fix = None
+                else:
+                    fix['confidence'] = confidence
+            
+            if fix is None or confidence is None:
+                if not failed:
+                    stats['invalid'] += 1
+            elif confidence >= self.confidence_threshold:
+                stats['accepted'] += 1
+                fix['model_tier'] = tier.name
+                return fix
+            else:
+                stats['low_confidence'] += 1
+                if fallback is None or confidence > fallback['confidence']:
+                    fix['model_tier'] = tier.name
+                    fallback = fix
+            
+            if index < len(tiers) - 1:
+                logger.info(
+                    f"Escalonando {issue_type} do modelo '{tier.name}' "
+                    f"para '{tiers[index + 1].name}'"
+                )
+        
+        return fallback
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores de latência e sucesso por nível."""
+        result = {}
+        for name, stats in self._stats.items():
+            calls = stats['calls']
+            result[name] = {
+                **stats,
+                'total_latency': round(stats['total_latency'], 3),
+                'avg_latency': round(stats['total_latency'] / calls, 3) if calls else 0.0,
+                'success_rate': round(stats['accepted'] / calls, 3) if calls else 0.0,
+            }
+        return result
@@ -0,0 +1,242 @@
+"""
+LLM Rate Limiter - Infrastructure Layer
+
+Limita taxa (requisições e tokens por minuto) e concorrência de chamadas ao LLM.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Verifica se o erro do provedor é um 429 (rate limit)."""
+    return getattr(error, 'status_code', None) == 429
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Obtém o header Retry-After (em segundos) de um erro do provedor, se houver."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        value = headers.get('retry-after')
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket com reabastecimento contínuo."""
+    
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+    
+    def time_until_available(self, amount: float) -> float:
+        """Segundos até haver `amount` tokens disponíveis (0 se já houver)."""
+        self._refill()
+        # Pedidos maiores que a capacidade aguardam o bucket cheio
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+    
+    def consume(self, amount: float):
+        """Consome tokens (pode deixar o saldo negativo)."""
+        self._refill()
+        self.tokens -= amount
+    
+    def refund(self, amount: float):
+        """Devolve tokens não utilizados."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+@dataclass
+class RateLimitPermit:
+    """Permissão concedida para uma chamada ao LLM."""
+    estimated_tokens: int
+    priority: int
+    enqueued_at: float
+    granted_at: float = 0.0
+    
+    @property
+    def queue_wait(self) -> float:
+        """Tempo (s) que a chamada esperou na fila."""
+        return self.granted_at - self.enqueued_at
+
+
+class LLMRateLimiter:
+    """
+    Limitador compartilhado para chamadas ao LLM.
+    
+    Combina token buckets de requisições/minuto e tokens/minuto com concorrência
+    adaptativa AIMD: aumenta aditivamente em respostas rápidas e reduz
+    multiplicativamente em 429 ou latência acima do alvo. Chamadas aguardando
+    são atendidas por prioridade (maior primeiro) e, dentro da mesma prioridade,
+    por ordem de chegada.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 90000,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        initial_concurrency: int = 4,
+        latency_target_seconds: float = 30.0,
+        backoff_factor: float = 0.5
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(
+            max(min_concurrency, min(initial_concurrency, max_concurrency))
+        )
+        self.latency_target_seconds = latency_target_seconds
+        self.backoff_factor = backoff_factor
+        
+        self._in_flight = 0
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self._cooldown_until = 0.0
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            'granted': 0,
+            'rate_limited': 0,
+            'slow_responses': 0,
+        }
+    
+    async def acquire(self, estimated_tokens: int, priority: int = 5) -> RateLimitPermit:
+        """Aguarda na fila até a chamada poder ser feita."""
+        loop = asyncio.get_running_loop()
+        permit = RateLimitPermit(
+            estimated_tokens=max(1, int(estimated_tokens)),
+            priority=priority,
+            enqueued_at=time.monotonic()
+        )
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._sequence), permit, future))
+        self._wake()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Permissão concedida no mesmo instante do cancelamento: devolver
+            if future.done() and not future.cancelled():
+                self.release(permit, latency=0.0, tokens_used=0)
+            raise
+        
+        return permit
+    
+    def release(
+        self,
+        permit: RateLimitPermit,
+        latency: float,
+        tokens_used: Optional[int] = None,
+        rate_limited: bool = False,
+        retry_after: Optional[float] = None
+    ):
+        """
+        Libera a permissão e ajusta limites com base no resultado observado.
+        
+        Args:
+            permit: Permissão obtida em acquire()
+            latency: Latência total da chamada (s)
+            tokens_used: Tokens efetivamente usados (ajusta a estimativa)
+            rate_limited: Provedor respondeu 429
+            retry_after: Retry-After informado pelo provedor (s)
+        """
+        self._in_flight = max(0, self._in_flight - 1)
+        
+        if tokens_used is not None:
+            difference = tokens_used - permit.estimated_tokens
+            if difference > 0:
+                self.token_bucket.consume(difference)
+            elif difference < 0:
+                self.token_bucket.refund(-difference)
+        
+        if rate_limited:
+            self._stats['rate_limited'] += 1
+            self._decrease()
+            cooldown = retry_after if retry_after is not None else 1.0
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown)
+        elif latency > self.latency_target_seconds:
+            self._stats['slow_responses'] += 1
+            self._decrease()
+        else:
+            # Aumento aditivo: ~+1 por "janela" de chamadas bem-sucedidas
+            self.concurrency_limit = min(
+                float(self.max_concurrency),
+                self.concurrency_limit + 1.0 / self.concurrency_limit
+            )
+        
+        self._wake()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Estado atual do limitador."""
+        return {
+            **self._stats,
+            'in_flight': self._in_flight,
+            'queued': sum(1 for waiter in self._waiters if not waiter[3].done()),
+            'concurrency_limit': round(self.concurrency_limit, 2),
+            'request_tokens': round(self.request_bucket.tokens, 2),
+            'llm_tokens': round(self.token_bucket.tokens, 2),
+        }
+    
+    def _decrease(self):
+        """Redução multiplicativa da concorrência."""
+        self.concurrency_limit = max(
+            float(self.min_concurrency),
+            self.concurrency_limit * self.backoff_factor
+        )
+        logger.info(f"Concorrência do LLM reduzida para {self.concurrency_limit:.2f}")
+    
+    def _wake(self):
+        """Concede permissões aos primeiros da fila enquanto houver capacidade."""
+        if self._wake_handle is not None:
+            self._wake_handle.cancel()
+            self._wake_handle = None
+        
+        while self._waiters:
+            _, _, permit, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            
+            if self._in_flight >= int(self.concurrency_limit):
+                # Será reavaliado no próximo release()
+                return
+            
+            wait = max(
+                self._cooldown_until - time.monotonic(),
+                self.request_bucket.time_until_available(1),
+                self.token_bucket.time_until_available(permit.estimated_tokens)
+            )
+            if wait > 0:
+                loop = asyncio.get_running_loop()
+                self._wake_handle = loop.call_later(wait, self._wake)
+                return
+            
+            heapq.heappop(self._waiters)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(permit.estimated_tokens)
+            self._in_flight += 1
+            self._stats['granted'] += 1
+            permit.granted_at = time.monotonic()
+            future.set_result(permit)
@@ -0,0 +1,265 @@
+"""
+Selector Synthesizer - Infrastructure Layer
+
+Gera o seletor CSS mais curto que identifica um único elemento do documento,
+usando um índice de ids, classes, tags e atributos montado em uma passagem.
+"""
+
+import bisect
+import logging
+import re
+from itertools import combinations
+from typing import List, Dict, Any, Optional, Tuple
+
+from .html_backends import HTMLParserBackend
+
+logger = logging.getLogger(__name__)
+
+# Atributos estáveis o suficiente para identificar elementos
+_SELECTOR_ATTRIBUTES = (
+    'data-testid', 'data-test', 'data-id', 'name', 'aria-label', 'role', 'type', 'for', 'href'
+)
+
+# Identificadores CSS que não precisam de escape
+_CSS_IDENT = re.compile(r'^-?[_a-zA-Z][_a-zA-Z0-9-]*$')
+
+# Limite de classes combinadas por elemento (evita explosão combinatória)
+_MAX_CLASSES = 4
+
+# Ancestrais que não entram em caminhos: o libxml2 pode deixar no head
+# conteúdo que o navegador coloca no body
+_PATH_BOUNDARY_TAGS = frozenset(['head', 'html'])
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+class DocumentSelectorIndex:
+    """
+    Índice de tokens (tag, id, classe, atributo) do documento.
+    
+    Elementos são numerados em ordem de documento; cada token aponta para a
+    lista ordenada dos elementos que o possuem. Como a numeração é em
+    pré-ordem, a subárvore de um elemento é o intervalo (i, end[i]].
+    """
+    
+    def __init__(self, backend: HTMLParserBackend):
+        self.backend = backend
+        self.nodes: List[Any] = []
+        self.parents: List[int] = []
+        self.tags: List[str] = []
+        self.nth_of_type: List[int] = []
+        self.end: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._positions: Dict[int, int] = {}
+        self._type_counts: Dict[Tuple[int, str], int] = {}
+        self._finished = False
+    
+    def add(self, node: Any):
+        """Adiciona o próximo elemento (chamado em ordem de documento)."""
+        backend = self.backend
+        index = len(self.nodes)
+        parent = backend.parent(node)
+        parent_index = self._positions.get(id(parent), -1) if parent is not None else -1
+        tag = backend.tag_name(node)
+        
+        self.nodes.append(node)
+        self.parents.append(parent_index)
+        self.tags.append(tag)
+        self.end.append(index)
+        self._positions[id(node)] = index
+        
+        type_key = (parent_index, tag)
+        self._type_counts[type_key] = self._type_counts.get(type_key, 0) + 1
+        self.nth_of_type.append(self._type_counts[type_key])
+        
+        for token in self._tokens(node, tag):
+            self.postings.setdefault(token, []).append(index)
+    
+    def finish(self):
+        """Calcula os intervalos das subárvores (após o último add)."""
+        if self._finished:
+            return
+        for index in range(len(self.nodes) - 1, -1, -1):
+            parent = self.parents[index]
+            if parent >= 0 and self.end[index] > self.end[parent]:
+                self.end[parent] = self.end[index]
+        self._finished = True
+    
+    def position(self, node: Any) -> Optional[int]:
+        return self._positions.get(id(node))
+    
+    def type_count(self, index: int) -> int:
+        """Número de irmãos com a mesma tag (incluindo o elemento)."""
+        return self._type_counts[(self.parents[index], self.tags[index])]
+    
+    def count_in_range(self, tokens: Tuple[str, ...], start: int, stop: int, limit: int = 2) -> int:
+        """Elementos com todos os tokens no intervalo [start, stop] (para de contar em limit)."""
+        lists = sorted((self.postings.get(token, []) for token in tokens), key=len)
+        first = lists[0]
+        others = lists[1:]
+        count = 0
+        
+        for position in range(bisect.bisect_left(first, start), bisect.bisect_right(first, stop)):
+            candidate = first[position]
+            if all(self._contains(other, candidate) for other in others):
+                count += 1
+                if count >= limit:
+                    break
+        return count
+    
+    def _contains(self, sorted_list: List[int], value: int) -> bool:
+        position = bisect.bisect_left(sorted_list, value)
+        return position < len(sorted_list) and sorted_list[position] == value
+    
+    def _tokens(self, node: Any, tag: str) -> List[str]:
+        attributes = self.backend.attributes(node)
+        tokens = [f"tag:{tag}"]
+        if not attributes:
+            return tokens
+        
+        element_id = attributes.get('id')
+        if element_id:
+            tokens.append(f"id:{element_id}")
+        
+        for class_name in set(attributes.get('class') or []):
+            tokens.append(f"class:{class_name}")
+        
+        for attribute in _SELECTOR_ATTRIBUTES:
+            value = attributes.get(attribute)
+            if value:
+                tokens.append(f"attr:{attribute}={value}")
+        
+        return tokens
+
+
+class SelectorSynthesizer:
+    """
+    Sintetiza seletores únicos e curtos a partir de um DocumentSelectorIndex.
+    
+    Ordem de tentativa: seletor composto do próprio elemento (id, atributos,
+    classes, tag); depois, subindo até max_ancestor_depth ancestrais, o
+    seletor único de um ancestral combinado a um seletor do elemento único
+    na subárvore dele, ou o caminho com :nth-of-type a partir dele. Sem
+    ancestral único no limite, retorna o seletor composto mais seletivo.
+    
+    Caminhos só são gerados quando o backend tem structural_selectors: a
+    árvore do html.parser não fecha tags implícitas ('<li>a<li>b' aninha os
+    itens) e geraria seletores que não casam no navegador. Nesse caso só
+    são usados seletores compostos do próprio elemento.
+    """
+    
+    def __init__(self, index: DocumentSelectorIndex, max_ancestor_depth: int = 5):
+        self.index = index
+        self.max_ancestor_depth = max_ancestor_depth
+        self._unique_cache: Dict[int, Optional[str]] = {}
+        self._document_counts: Dict[Tuple[str, ...], int] = {}
+        index.finish()
+    
+    def selector_for(self, node: Any) -> Optional[str]:
+        """Seletor único mais curto do elemento (None se não estiver no índice)."""
+        index = self.index.position(node)
+        if index is None:
+            return None
+        
+        own = self._unique_compound(index)
+        if own:
+            return own
+        
+        if not self.index.backend.structural_selectors:
+            return self._most_selective_compound(index)
+        
+        ancestor = self.index.parents[index]
+        path = [index]
+        for _ in range(self.max_ancestor_depth):
+            if ancestor < 0 or self.index.tags[ancestor] in _PATH_BOUNDARY_TAGS:
+                break
+            
+            ancestor_selector = self._unique_compound(ancestor)
+            if ancestor_selector:
+                start, stop = ancestor + 1, self.index.end[ancestor]
+                for tokens, selector in self._compounds(index):
+                    if self.index.count_in_range(tokens, start, stop) == 1:
+                        return f"{ancestor_selector} {selector}"
+                steps = [self._path_step(step) for step in reversed(path)]
+                return ' > '.join([ancestor_selector] + steps)
+            
+            path.append(ancestor)
+            ancestor = self.index.parents[ancestor]
+        
+        # Sem ancestral único por perto
+        return self._most_selective_compound(index)
+    
+    def _most_selective_compound(self, index: int) -> str:
+        """Seletor composto do elemento que casa com menos elementos."""
+        return min(
+            self._compounds(index),
+            key=lambda compound: (self._document_count(compound[0]), len(compound[1]))
+        )[1]
+    
+    def _document_count(self, tokens: Tuple[str, ...]) -> int:
+        """Elementos do documento com todos os tokens (contagem completa, em cache)."""
+        if tokens not in self._document_counts:
+            total = len(self.index.nodes)
+            self._document_counts[tokens] = self.index.count_in_range(
+                tokens, 0, total, limit=total
+            )
+        return self._document_counts[tokens]
+    
+    def _unique_compound(self, index: int) -> Optional[str]:
+        """Seletor composto mais curto que casa apenas com o elemento."""
+        if index not in self._unique_cache:
+            total = len(self.index.nodes)
+            self._unique_cache[index] = next(
+                (
+                    selector for tokens, selector in self._compounds(index)
+                    if self.index.count_in_range(tokens, 0, total) == 1
+                ),
+                None
+            )
+        return self._unique_cache[index]
+    
+    def _compounds(self, index: int) -> List[Tuple[Tuple[str, ...], str]]:
+        """Seletores compostos candidatos do elemento, do mais curto ao mais longo."""
+        attributes = self.index.backend.attributes(self.index.nodes[index])
+        tag = self.index.tags[index]
+        tag_token = f"tag:{tag}"
+        candidates: List[Tuple[Tuple[str, ...], str]] = []
+        
+        element_id = attributes.get('id')
+        if element_id:
+            if _CSS_IDENT.match(element_id):
+                id_selector = f"#{element_id}"
+            else:
+                id_selector = f"[id={_quote(element_id)}]"
+            candidates.append(((f"id:{element_id}",), id_selector))
+        
+        for attribute in _SELECTOR_ATTRIBUTES:
+            value = attributes.get(attribute)
+            if value:
+                token = f"attr:{attribute}={value}"
+                attribute_selector = f"[{attribute}={_quote(value)}]"
+                candidates.append(((token,), attribute_selector))
+                candidates.append(((tag_token, token), f"{tag}{attribute_selector}"))
+        
+        classes = [
+            class_name for class_name in dict.fromkeys(attributes.get('class') or [])
+            if _CSS_IDENT.match(class_name)
+        ][:_MAX_CLASSES]
+        for size in (1, 2):
+            for combo in combinations(classes, size):
+                tokens = tuple(f"class:{class_name}" for class_name in combo)
+                class_selector = ''.join(f".{class_name}" for class_name in combo)
+                candidates.append((tokens, class_selector))
+                candidates.append(((tag_token,) + tokens, f"{tag}{class_selector}"))
+        
+        candidates.append(((tag_token,), tag))
+        candidates.sort(key=lambda candidate: len(candidate[1]))
+        return candidates
+    
+    def _path_step(self, index: int) -> str:
+        tag = self.index.tags[index]
+        if self.index.type_count(index) == 1:
+            return tag
+        return f"{tag}:nth-of-type({self.index.nth_of_type[index]})"
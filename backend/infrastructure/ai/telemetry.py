@@ -0,0 +1,206 @@
+"""
+LLM Telemetry - Infrastructure Layer
+
+Instrumentação das chamadas ao LLM: tempos, tokens, custo e resultado do parse,
+agregados em histogramas por modelo e tipo de problema.
+"""
+
+import bisect
+import logging
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS: List[float] = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+TOKEN_BUCKETS: List[float] = [100, 250, 500, 1000, 2000, 4000, 8000, 16000]
+
+# Preço em USD por 1K tokens (prompt, completion)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+
+class Histogram:
+    """Histograma com limites fixos de buckets."""
+    
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantil aproximado (limite superior do bucket correspondente)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.total, 4),
+            'avg': round(self.total / self.count, 4) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {
+                **{f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)},
+                'inf': self.counts[-1],
+            },
+        }
+
+
+@dataclass
+class LLMCallRecord:
+    """Medições de uma chamada ao LLM (preenchidas ao longo da chamada)."""
+    model: str
+    issue_type: str
+    queue_wait: Optional[float] = None
+    time_to_first_token: Optional[float] = None
+    latency: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    parse_success: Optional[bool] = None
+    aborted: bool = False
+    rate_limited: bool = False
+    error: Optional[str] = None
+
+
+# Chamada em andamento no contexto atual (permite que o LLMService complete o registro)
+current_llm_call: ContextVar[Optional[LLMCallRecord]] = ContextVar('current_llm_call', default=None)
+
+
+@dataclass
+class _CallStats:
+    calls: int = 0
+    parse_success: int = 0
+    parse_failures: int = 0
+    aborted: int = 0
+    rate_limited: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    histograms: Dict[str, Histogram] = field(default_factory=lambda: {
+        'queue_wait': Histogram(LATENCY_BUCKETS),
+        'time_to_first_token': Histogram(LATENCY_BUCKETS),
+        'latency': Histogram(LATENCY_BUCKETS),
+        'prompt_tokens': Histogram(TOKEN_BUCKETS),
+        'completion_tokens': Histogram(TOKEN_BUCKETS),
+    })
+
+
+class LLMTelemetry:
+    """Agrega registros de chamadas ao LLM em memória."""
+    
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], _CallStats] = {}
+        self._fallbacks: Dict[str, int] = {}
+    
+    def start_call(self, model: str, issue_type: Optional[str]) -> LLMCallRecord:
+        """Cria o registro da chamada e o torna o registro do contexto atual."""
+        record = LLMCallRecord(model=model or 'unknown', issue_type=issue_type or 'unknown')
+        current_llm_call.set(record)
+        return record
+    
+    def current_record(self) -> Optional[LLMCallRecord]:
+        """Registro da chamada em andamento no contexto atual."""
+        return current_llm_call.get()
+    
+    def finish_call(self, record: LLMCallRecord):
+        """Agrega o registro concluído."""
+        if current_llm_call.get() is record:
+            current_llm_call.set(None)
+        
+        stats = self._stats.setdefault((record.model, record.issue_type), _CallStats())
+        stats.calls += 1
+        
+        if record.parse_success:
+            stats.parse_success += 1
+        elif record.parse_success is False:
+            stats.parse_failures += 1
+        if record.aborted:
+            stats.aborted += 1
+        if record.rate_limited:
+            stats.rate_limited += 1
+        if record.error:
+            stats.errors += 1
+        
+        for name in ('queue_wait', 'time_to_first_token', 'latency', 'prompt_tokens', 'completion_tokens'):
+            value = getattr(record, name)
+            if value is not None:
+                stats.histograms[name].observe(value)
+        
+        stats.prompt_tokens += record.prompt_tokens or 0
+        stats.completion_tokens += record.completion_tokens or 0
+        stats.cost_usd += self._estimate_cost(record)
+    
+    def record_fallback(self, issue_type: Optional[str]):
+        """Registra que a IA não gerou correção e uma regra foi usada."""
+        issue_type = issue_type or 'unknown'
+        self._fallbacks[issue_type] = self._fallbacks.get(issue_type, 0) + 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas agregadas por modelo e tipo de problema."""
+        models: Dict[str, Dict[str, Any]] = {}
+        for (model, issue_type), stats in sorted(self._stats.items()):
+            models.setdefault(model, {})[issue_type] = {
+                'calls': stats.calls,
+                'parse_success': stats.parse_success,
+                'parse_failures': stats.parse_failures,
+                'aborted': stats.aborted,
+                'rate_limited': stats.rate_limited,
+                'errors': stats.errors,
+                'prompt_tokens': stats.prompt_tokens,
+                'completion_tokens': stats.completion_tokens,
+                'cost_usd': round(stats.cost_usd, 6),
+                # Separados dos totais: prompt_tokens/completion_tokens também são histogramas
+                'histograms': {name: histogram.to_dict() for name, histogram in stats.histograms.items()},
+            }
+        
+        return {
+            'models': models,
+            'fallback_to_rule': dict(self._fallbacks),
+        }
+    
+    def reset(self):
+        """Limpa todas as métricas."""
+        self._stats.clear()
+        self._fallbacks.clear()
+    
+    def _estimate_cost(self, record: LLMCallRecord) -> float:
+        """Custo estimado da chamada (0 para modelos sem preço conhecido)."""
+        prices = MODEL_PRICES.get(record.model)
+        if not prices:
+            return 0.0
+        prompt_price, completion_price = prices
+        return (
+            (record.prompt_tokens or 0) / 1000 * prompt_price
+            + (record.completion_tokens or 0) / 1000 * completion_price
+        )
+
+
+# Instância global
+llm_telemetry = LLMTelemetry()
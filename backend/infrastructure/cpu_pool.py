@@ -0,0 +1,178 @@
+"""
+CPU Pool - Infrastructure Layer
+
+Pool de processos para análises CPU-bound (parse de HTML e CSS), mantendo o
+event loop livre durante o processamento de documentos grandes.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CPUTaskTimeout(TimeoutError):
+    """Tarefa excedeu o tempo limite no pool de processos."""
+
+
+class CPUAnalysisPool:
+    """
+    Executa funções CPU-bound em processos separados.
+    
+    Entradas abaixo de sync_threshold_bytes rodam diretamente no processo
+    atual (o custo de serialização superaria o ganho). Funções e argumentos
+    precisam ser picklable: use funções de nível de módulo. Ao estourar o
+    timeout, os workers são encerrados e o pool é recriado na próxima tarefa.
+    """
+    
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        task_timeout: float = 30.0,
+        sync_threshold_bytes: int = 64 * 1024
+    ):
+        """
+        Args:
+            max_workers: Número de processos (padrão: núcleos disponíveis; 0 desativa o pool)
+            task_timeout: Tempo limite padrão por tarefa (s)
+            sync_threshold_bytes: Entradas menores rodam sem o pool
+        """
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.task_timeout = task_timeout
+        self.sync_threshold_bytes = sync_threshold_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats = {
+            'pool_tasks': 0,
+            'sync_tasks': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'pool_restarts': 0,
+            'total_pool_time': 0.0,
+        }
+    
+    async def run(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        size: int = 0,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Executa func(*args), no pool quando a entrada é grande.
+        
+        Args:
+            func: Função de nível de módulo (picklable)
+            *args: Argumentos picklable
+            size: Tamanho da entrada em bytes (decide entre pool e execução direta)
+            timeout: Tempo limite da tarefa (padrão: task_timeout)
+        
+        Raises:
+            CPUTaskTimeout: Se a tarefa exceder o tempo limite
+        """
+        if self.max_workers <= 0 or size < self.sync_threshold_bytes:
+            self._stats['sync_tasks'] += 1
+            return func(*args)
+        
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self._stats['pool_tasks'] += 1
+        
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, func, *args),
+                timeout=timeout or self.task_timeout
+            )
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            logger.warning(
+                f"Tarefa {func.__name__} excedeu {timeout or self.task_timeout}s "
+                "no pool de processos"
+            )
+            # O worker continua ocupado com a tarefa; descartar o pool
+            self._reset_executor(terminate=True)
+            raise CPUTaskTimeout(f"Tarefa {func.__name__} excedeu o tempo limite")
+        except BrokenProcessPool:
+            self._stats['errors'] += 1
+            logger.error("Pool de processos quebrado, recriando na próxima tarefa")
+            self._reset_executor(terminate=True)
+            raise
+        finally:
+            self._stats['total_pool_time'] += time.monotonic() - started
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: processos filhos não herdam threads/conexões do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+    
+    def _reset_executor(self, terminate: bool = False):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        
+        self._stats['pool_restarts'] += 1
+        if terminate:
+            _terminate_workers(executor)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def shutdown(self):
+        """Encerra os processos do pool."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso do pool."""
+        return {
+            **self._stats,
+            'total_pool_time': round(self._stats['total_pool_time'], 3),
+            'max_workers': self.max_workers,
+            'sync_threshold_bytes': self.sync_threshold_bytes,
+            'task_timeout': self.task_timeout,
+            'running': self._executor is not None,
+        }
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    """Encerra o executor e seus workers, inclusive os ocupados com uma tarefa."""
+    if sys.version_info >= (3, 14):
+        executor.terminate_workers()
+        return
+    
+    # Antes do 3.14 não há API pública para encerrar workers ocupados:
+    # shutdown(cancel_futures=True) só cancela as tarefas ainda na fila
+    processes = getattr(executor, '_processes', None)
+    if processes is None:
+        logger.warning(
+            "ProcessPoolExecutor sem o atributo _processes: workers ocupados não foram "
+            "encerrados e continuam até terminar a tarefa"
+        )
+    else:
+        for process in list(processes.values()):
+            process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# Instância global
+cpu_pool = CPUAnalysisPool(
+    max_workers=_env_int("CPU_POOL_WORKERS"),
+    task_timeout=float(os.getenv("CPU_POOL_TASK_TIMEOUT", "30")),
+    sync_threshold_bytes=int(os.getenv("CPU_POOL_SYNC_THRESHOLD_BYTES", str(64 * 1024)))
+)
@@ -8,11 +8,13 @@ from .source_analyzer import SourceAnalyzer
 from .file_locator import FileLocator
 from .css_modifier import CSSModifier
 from .patch_applier import PatchApplier
+from .backup_store import BackupStore
 
 __all__ = [
     "SourceAnalyzer",
     "FileLocator",
     "CSSModifier",
-    "PatchApplier"
+    "PatchApplier",
+    "BackupStore"
 ]
 
@@ -0,0 +1,585 @@
+"""
+Backup Store
+
+Backups dos arquivos fonte endereçados por conteúdo: cada versão é
+comprimida e gravada uma única vez como blob (nome = sha256 do conteúdo),
+e um manifesto SQLite registra qual correção fez backup de qual arquivo,
+com qual blob e quando. A retenção (quantidade por arquivo, idade e total
+de bytes) é aplicada por uma coleta de lixo em segundo plano.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ...config.project_config import ProjectConfig
+from ..storage.html_snapshots import compress_bytes, decompress_bytes
+from .file_safety import atomic_write_bytes, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Prefixo da referência de backup guardada na correção (ex: "backup:42")
+BACKUP_REF_PREFIX = "backup:"
+
+# Retenção padrão
+DEFAULT_MAX_PER_FILE = 20
+DEFAULT_MAX_AGE_DAYS = 30.0
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_GC_INTERVAL = 300.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backup_blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fix_id TEXT,
+    file_path TEXT NOT NULL,
+    blob_hash TEXT NOT NULL REFERENCES backup_blobs(hash),
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_backups_file ON backups(file_path, created_at);
+CREATE INDEX IF NOT EXISTS idx_backups_fix ON backups(fix_id);
+CREATE INDEX IF NOT EXISTS idx_backups_created ON backups(created_at);
+CREATE INDEX IF NOT EXISTS idx_backups_blob ON backups(blob_hash);
+CREATE TABLE IF NOT EXISTS pinned_fixes (
+    fix_id TEXT PRIMARY KEY,
+    pinned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Entradas de correções fixadas (ainda aplicadas) não entram na retenção
+UNPINNED = "NOT EXISTS (SELECT 1 FROM pinned_fixes WHERE pinned_fixes.fix_id = backups.fix_id)"
+
+# Página padrão da listagem
+DEFAULT_PAGE_SIZE = 50
+
+
+def backup_ref(backup_id: int) -> str:
+    """Referência de um backup do manifesto (guardada em backup_path)."""
+    return f"{BACKUP_REF_PREFIX}{backup_id}"
+
+
+def parse_backup_ref(ref: str) -> Optional[int]:
+    """Id do backup de uma referência; None se for um caminho (backup antigo)."""
+    if not ref or not str(ref).startswith(BACKUP_REF_PREFIX):
+        return None
+    try:
+        return int(str(ref)[len(BACKUP_REF_PREFIX):])
+    except ValueError:
+        return None
+
+
+class BackupStore:
+    """Blobs deduplicados + manifesto SQLite + retenção."""
+    
+    def __init__(
+        self,
+        store_dir: Path,
+        max_per_file: Optional[int] = DEFAULT_MAX_PER_FILE,
+        max_age_days: Optional[float] = DEFAULT_MAX_AGE_DAYS,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES
+    ):
+        """
+        Args:
+            store_dir: Diretório do store (blobs/ e manifest.db)
+            max_per_file: Backups mantidos por arquivo (None = sem limite)
+            max_age_days: Idade máxima de um backup (None = sem limite)
+            max_bytes: Total de bytes comprimidos dos blobs (None = sem limite)
+        """
+        self.store_dir = Path(store_dir)
+        self.blobs_dir = self.store_dir / "blobs"
+        self.db_path = self.store_dir / "manifest.db"
+        self.max_per_file = max_per_file
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        
+        self._gc_thread: Optional[threading.Thread] = None
+        self._gc_stop = threading.Event()
+        self._import_thread: Optional[threading.Thread] = None
+        
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexão em autocommit (leituras e criação do schema)."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Transação com lock de escrita (BEGIN IMMEDIATE): gravação de blobs e a
+        coleta de lixo ficam serializadas entre threads e processos.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+    
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+    
+    def save(
+        self,
+        file_path: str,
+        data: bytes,
+        fix_ids: Optional[List[Optional[str]]] = None,
+        created_at: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Registra um backup do conteúdo de um arquivo.
+        
+        O blob só é comprimido e gravado se o conteúdo ainda não estiver no
+        store; cada correção recebe uma entrada no manifesto.
+        
+        Args:
+            file_path: Caminho relativo do arquivo
+            data: Conteúdo atual do arquivo
+            fix_ids: Correções cobertas por este backup (None = entrada sem correção)
+            created_at: Momento do backup (padrão: agora)
+        
+        Returns:
+            Lista de entradas do manifesto (uma por correção)
+        """
+        digest = content_hash(data)
+        blob_path = self._blob_path(digest)
+        now = created_at if created_at is not None else time.time()
+        entries = []
+        
+        with self._transaction() as conn:
+            known = conn.execute("SELECT 1 FROM backup_blobs WHERE hash = ?", (digest,)).fetchone()
+            if not known or not blob_path.exists():
+                codec, stored = compress_bytes(data)
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                # Codec em um cabeçalho curto: o blob é legível sem o manifesto
+                atomic_write_bytes(blob_path, codec.encode('ascii') + b"\n" + stored)
+                conn.execute(
+                    "INSERT OR REPLACE INTO backup_blobs "
+                    "(hash, codec, size, stored_size, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (digest, codec, len(data), len(stored), now)
+                )
+            
+            for fix_id in fix_ids or [None]:
+                cursor = conn.execute(
+                    "INSERT INTO backups (fix_id, file_path, blob_hash, size, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fix_id, file_path, digest, len(data), now)
+                )
+                # lastrowid é sempre definido após um INSERT
+                backup_id = cursor.lastrowid or 0
+                entries.append({
+                    "id": backup_id,
+                    "backup_path": backup_ref(backup_id),
+                    "fix_id": fix_id,
+                    "file_path": file_path,
+                    "blob_hash": digest,
+                    "size": len(data),
+                    "created_at": now
+                })
+        
+        logger.info(f"Backup registrado: {file_path} ({digest[:12]}, {len(entries)} entrada(s))")
+        return entries
+    
+    def get(self, backup_id: int) -> Optional[Dict]:
+        """Entrada do manifesto (ou None)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM backups WHERE id = ?", (backup_id,)).fetchone()
+        return self._entry(row) if row else None
+    
+    def load(self, backup_id: int) -> Optional[bytes]:
+        """Conteúdo do backup; None se a entrada ou o blob não existirem mais."""
+        entry = self.get(backup_id)
+        if not entry:
+            return None
+        
+        blob_path = self._blob_path(entry["blob_hash"])
+        try:
+            codec, _, stored = blob_path.read_bytes().partition(b"\n")
+        except FileNotFoundError:
+            logger.error(f"Blob de backup ausente: {entry['blob_hash']}")
+            return None
+        
+        data = decompress_bytes(codec.decode('ascii'), stored)
+        if content_hash(data) != entry["blob_hash"]:
+            logger.error(f"Blob de backup corrompido: {entry['blob_hash']}")
+            return None
+        return data
+    
+    @staticmethod
+    def _filters(
+        file_path: Optional[str],
+        fix_id: Optional[str],
+        since: Optional[float],
+        until: Optional[float]
+    ) -> Tuple[str, List]:
+        """Cláusula WHERE (servida pelos índices do manifesto) e parâmetros."""
+        clauses = []
+        params: List = []
+        if file_path is not None:
+            clauses.append("file_path = ?")
+            params.append(file_path)
+        if fix_id is not None:
+            clauses.append("fix_id = ?")
+            params.append(fix_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+    
+    def list_entries(
+        self,
+        file_path: Optional[str] = None,
+        fix_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = DEFAULT_PAGE_SIZE,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        Entradas do manifesto, mais recentes primeiro.
+        
+        Args:
+            file_path: Só backups deste arquivo
+            fix_id: Só backups desta correção
+            since: Criados a partir deste timestamp
+            until: Criados antes deste timestamp
+            limit: Tamanho da página (None = todas)
+            offset: Entradas a pular
+        """
+        where, params = self._filters(file_path, fix_id, since, until)
+        query = f"SELECT * FROM backups{where} ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._entry(row) for row in rows]
+    
+    def count_entries(
+        self,
+        file_path: Optional[str] = None,
+        fix_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> int:
+        """Total de entradas com os mesmos filtros de list_entries."""
+        where, params = self._filters(file_path, fix_id, since, until)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM backups{where}", params).fetchone()[0]
+    
+    def import_legacy(self, backup_dir: Path) -> int:
+        """
+        Importa uma única vez os backups antigos (diretórios por timestamp em
+        backup_dir, com a estrutura do projeto) para o store, com a data de
+        modificação de cada arquivo. Os arquivos antigos não são removidos.
+        
+        Returns:
+            Quantidade de arquivos importados
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM store_meta WHERE key = 'legacy_imported'").fetchone():
+                return 0
+        
+        imported = 0
+        backup_dir = Path(backup_dir)
+        store_dir = self.store_dir.resolve()
+        folders = sorted(backup_dir.iterdir()) if backup_dir.exists() else []
+        for backup_folder in folders:
+            if (
+                not backup_folder.is_dir()
+                or backup_folder.name == ".locks"
+                or backup_folder.resolve() == store_dir
+            ):
+                continue
+            for backup_file in backup_folder.rglob('*'):
+                if not backup_file.is_file():
+                    continue
+                try:
+                    self.save(
+                        backup_file.relative_to(backup_folder).as_posix(),
+                        backup_file.read_bytes(),
+                        created_at=backup_file.stat().st_mtime
+                    )
+                    imported += 1
+                except OSError as e:
+                    logger.warning(f"Backup antigo ignorado ({backup_file}): {e}")
+        
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('legacy_imported', ?)",
+                (str(time.time()),)
+            )
+        
+        if imported:
+            logger.info(f"{imported} backups antigos importados para o store")
+        return imported
+    
+    def start_legacy_import(self, backup_dir: Path) -> threading.Thread:
+        """
+        Importa os backups antigos (import_legacy) em uma thread daemon: a
+        varredura, o hash e a compressão não bloqueiam quem criou o store.
+        """
+        if self._import_thread is None:
+            self._import_thread = threading.Thread(
+                target=self._import_legacy_safely,
+                args=(backup_dir,),
+                name="backup-import",
+                daemon=True
+            )
+            self._import_thread.start()
+        return self._import_thread
+    
+    def _import_legacy_safely(self, backup_dir: Path):
+        try:
+            self.import_legacy(backup_dir)
+        except Exception as e:
+            logger.error(f"Erro ao importar backups antigos: {e}")
+    
+    def _entry(self, row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "backup_path": backup_ref(row["id"]),
+            "fix_id": row["fix_id"],
+            "file_path": row["file_path"],
+            "blob_hash": row["blob_hash"],
+            "size": row["size"],
+            "created_at": row["created_at"]
+        }
+    
+    def pin_fixes(self, fix_ids: List[Optional[str]]):
+        """
+        Fixa as entradas das correções: a retenção do gc não as remove
+        enquanto a correção estiver aplicada (a referência "backup:<id>"
+        guardada na correção continua válida).
+        """
+        rows = [(fix_id, time.time()) for fix_id in fix_ids if fix_id]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO pinned_fixes (fix_id, pinned_at) VALUES (?, ?)", rows
+            )
+    
+    def unpin_fixes(self, fix_ids: List[Optional[str]]):
+        """Libera as entradas das correções para a retenção (ex: após reverter)."""
+        rows = [(fix_id,) for fix_id in fix_ids if fix_id]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM pinned_fixes WHERE fix_id = ?", rows)
+    
+    def stats(self) -> Dict:
+        """Quantidade de entradas e blobs e bytes ocupados."""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM backups").fetchone()[0]
+            blobs, size, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) "
+                "FROM backup_blobs"
+            ).fetchone()
+        return {"entries": entries, "blobs": blobs, "size": size, "stored_size": stored}
+    
+    def gc(self) -> Dict:
+        """
+        Aplica a retenção e remove blobs sem referência.
+        
+        Ordem: idade, quantidade por arquivo e, por fim, entradas mais antigas
+        até o total de bytes dos blobs caber em max_bytes. Entradas de
+        correções fixadas (pin_fixes) nunca são removidas, mas contam no
+        limite por arquivo e no total de bytes.
+        
+        Returns:
+            Dict com entradas e blobs removidos e bytes liberados
+        """
+        removed_entries = 0
+        removed_blobs = 0
+        freed = 0
+        dropped: List[str] = []
+        
+        with self._transaction() as conn:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed_entries += conn.execute(
+                    f"DELETE FROM backups WHERE created_at < ? AND {UNPINNED}", (cutoff,)
+                ).rowcount
+            
+            if self.max_per_file is not None:
+                removed_entries += conn.execute(
+                    f"""
+                    DELETE FROM backups WHERE {UNPINNED} AND id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (
+                                PARTITION BY file_path ORDER BY created_at DESC, id DESC
+                            ) AS position
+                            FROM backups
+                        ) WHERE position > ?
+                    )
+                    """,
+                    (self.max_per_file,)
+                ).rowcount
+            
+            removed_blobs, freed = self._drop_unreferenced(conn, dropped)
+            
+            if self.max_bytes is not None:
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(stored_size), 0) FROM backup_blobs"
+                ).fetchone()[0]
+                oldest = conn.execute(
+                    f"SELECT id, blob_hash FROM backups WHERE {UNPINNED} ORDER BY created_at, id"
+                ).fetchall()
+                for row in oldest:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM backups WHERE id = ?", (row["id"],))
+                    removed_entries += 1
+                    blobs, size = self._drop_unreferenced(conn, dropped, row["blob_hash"])
+                    removed_blobs += blobs
+                    freed += size
+                    total -= size
+        
+        # Arquivos só são apagados após o commit: se a transação falhar, o
+        # manifesto volta ao estado anterior com todos os blobs no disco
+        self._unlink_blobs(dropped)
+        
+        if removed_entries or removed_blobs:
+            logger.info(
+                f"GC de backups: {removed_entries} entradas, {removed_blobs} blobs, "
+                f"{freed} bytes liberados"
+            )
+        return {
+            "removed_entries": removed_entries,
+            "removed_blobs": removed_blobs,
+            "freed_bytes": freed
+        }
+    
+    def _drop_unreferenced(
+        self,
+        conn: sqlite3.Connection,
+        dropped: List[str],
+        digest: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Remove do manifesto blobs sem entradas (todos ou só digest).
+        
+        Roda dentro da transação; os hashes removidos vão para dropped e os
+        arquivos são apagados por _unlink_blobs após o commit.
+        """
+        query = (
+            "SELECT hash, stored_size FROM backup_blobs "
+            "WHERE NOT EXISTS (SELECT 1 FROM backups WHERE backups.blob_hash = backup_blobs.hash)"
+        )
+        params: tuple = ()
+        if digest is not None:
+            query += " AND hash = ?"
+            params = (digest,)
+        rows = conn.execute(query, params).fetchall()
+        freed = 0
+        for row in rows:
+            conn.execute("DELETE FROM backup_blobs WHERE hash = ?", (row["hash"],))
+            dropped.append(row["hash"])
+            freed += row["stored_size"]
+        return len(rows), freed
+    
+    def _unlink_blobs(self, digests: List[str]):
+        """
+        Apaga os arquivos de blobs já removidos do manifesto.
+        
+        Roda sob o lock de escrita: um save do mesmo conteúdo entre o commit
+        do GC e este ponto regrava o blob, que então é mantido.
+        """
+        if not digests:
+            return
+        with self._transaction() as conn:
+            for digest in digests:
+                if conn.execute("SELECT 1 FROM backup_blobs WHERE hash = ?", (digest,)).fetchone():
+                    continue
+                try:
+                    self._blob_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+    
+    def start_gc(self, interval: float = DEFAULT_GC_INTERVAL):
+        """Inicia a coleta de lixo periódica em uma thread daemon."""
+        if interval <= 0 or (self._gc_thread and self._gc_thread.is_alive()):
+            return
+        self._gc_stop.clear()
+        self._gc_thread = threading.Thread(
+            target=self._gc_loop, args=(interval,), name="backup-gc", daemon=True
+        )
+        self._gc_thread.start()
+    
+    def stop_gc(self):
+        """Interrompe a coleta de lixo periódica."""
+        self._gc_stop.set()
+        if self._gc_thread:
+            self._gc_thread.join()
+            self._gc_thread = None
+    
+    def _gc_loop(self, interval: float):
+        while not self._gc_stop.is_set():
+            try:
+                self.gc()
+            except Exception as e:
+                logger.error(f"Erro na coleta de lixo de backups: {e}")
+            self._gc_stop.wait(interval)
+
+
+_stores: Dict[str, BackupStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _env_limit(name: str, default, cast):
+    """Limite de retenção do ambiente; 0 ou negativo desativa o limite."""
+    value = cast(os.getenv(name, default))
+    return value if value > 0 else None
+
+
+def get_backup_store(project_config: ProjectConfig) -> BackupStore:
+    """
+    Store de backups do projeto (criado no primeiro acesso; a importação dos
+    backups antigos e a coleta de lixo rodam em segundo plano, então a
+    criação é barata mesmo dentro de uma rota async). Retenção via
+    BACKUP_MAX_PER_FILE, BACKUP_MAX_AGE_DAYS, BACKUP_MAX_BYTES e BACKUP_GC_INTERVAL.
+    """
+    store_dir = (project_config.backup_dir / "store").resolve()
+    key = str(store_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BackupStore(
+                store_dir,
+                max_per_file=_env_limit("BACKUP_MAX_PER_FILE", DEFAULT_MAX_PER_FILE, int),
+                max_age_days=_env_limit("BACKUP_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS, float),
+                max_bytes=_env_limit("BACKUP_MAX_BYTES", DEFAULT_MAX_BYTES, int)
+            )
+            store.start_legacy_import(project_config.backup_dir)
+            store.start_gc(float(os.getenv("BACKUP_GC_INTERVAL", DEFAULT_GC_INTERVAL)))
+        return store
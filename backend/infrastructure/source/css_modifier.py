@@ -4,21 +4,233 @@ CSS Modifier
 Modifica arquivos CSS usando AST.
 """
 
+import bisect
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import re
 
 from ...config.project_config import ProjectConfig
+from .css_parser import CSSBudgetExceeded, CSSDeclaration, CSSRule, CSSStylesheet, parse_css
+from .reverse_patch import add_line_numbers, make_reverse_hunks
 
 logger = logging.getLogger(__name__)
 
+# Limites do parse em modificações e validações (arquivos maiores ou
+# malformados a ponto de estourar o tempo falham com erro explícito)
+MAX_CSS_SIZE = 5 * 1024 * 1024
+CSS_TIME_BUDGET = 2.0
+
+# Regras de botão usadas para seletores genéricos, em ordem de preferência
+GENERIC_BUTTON_PATTERNS = [
+    re.compile(r'\.btn-base$'),
+    re.compile(r'\.btn-primary$'),
+    re.compile(r'\.btn-secondary$'),
+    re.compile(r'button$'),
+    re.compile(r'\[role=["\']button["\']\]$'),
+]
+
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def _property_key(name: str) -> str:
+    """Nome de propriedade para comparação (custom properties diferenciam caixa)."""
+    name = name.strip()
+    return name if name.startswith('--') else name.lower()
+
+
+def _leading_whitespace(text: str) -> str:
+    return text[:len(text) - len(text.lstrip(' \t'))]
+
+
+def _apply_splices(content: str, splices: List[Tuple[int, int, str]]) -> str:
+    """Aplica substituições (início, fim, texto) sem sobreposição em uma passagem."""
+    if not splices:
+        return content
+    parts = []
+    position = 0
+    for start, end, text in sorted(splices, key=lambda splice: (splice[0], splice[1])):
+        parts.append(content[position:start])
+        parts.append(text)
+        position = max(position, end)
+    parts.append(content[position:])
+    return "".join(parts)
+
+
+class _RuleEdits:
+    """Plano de edições de uma regra: valores novos, remoções e inclusões no fim do bloco."""
+    
+    def __init__(self, rule: CSSRule):
+        self.rule = rule
+        # Declaração efetiva de cada propriedade (a última do bloco)
+        self.declarations: Dict[str, CSSDeclaration] = {}
+        self.occurrences: Dict[str, List[CSSDeclaration]] = {}
+        for declaration in rule.declarations:
+            key = _property_key(declaration.name)
+            self.declarations[key] = declaration
+            self.occurrences.setdefault(key, []).append(declaration)
+        
+        self.new_values: Dict[str, str] = {}
+        self.removed: Dict[str, bool] = {}
+        self.added: Dict[str, Tuple[str, str]] = {}
+    
+    def save(self) -> Tuple[Dict, Dict, Dict]:
+        return dict(self.new_values), dict(self.removed), dict(self.added)
+    
+    def restore(self, state: Tuple[Dict, Dict, Dict]):
+        self.new_values, self.removed, self.added = state
+    
+    def plan(self, changes: List[Dict]) -> Tuple[List[Dict], List[str]]:
+        """Registra as mudanças de uma correção; retorna (changes_applied, errors)."""
+        changes_applied = []
+        errors = []
+        
+        for change in changes:
+            property_name = change.get("property", "").strip()
+            property_value = change.get("value", "").strip()
+            action = change.get("action", "modify").lower()
+            
+            if not property_name:
+                errors.append("Propriedade não especificada")
+                continue
+            
+            key = _property_key(property_name)
+            exists = key in self.added or (key in self.declarations and key not in self.removed)
+            
+            if action == "modify" and exists:
+                if key in self.added:
+                    old_value = self.added[key][1]
+                    self.added[key] = (property_name, property_value)
+                else:
+                    old_value = self.new_values.get(key, self.declarations[key].value)
+                    self.new_values[key] = property_value
+                changes_applied.append({
+                    "property": property_name,
+                    "action": "modified",
+                    "old_value": old_value,
+                    "new_value": property_value
+                })
+            
+            elif action in ("modify", "add"):
+                if exists:
+                    errors.append(f"Propriedade já existe: {property_name}")
+                    continue
+                # Adicionar nova propriedade no final do bloco
+                self.added[key] = (property_name, property_value)
+                changes_applied.append({
+                    "property": property_name,
+                    "action": "added",
+                    "new_value": property_value
+                })
+            
+            elif action == "remove":
+                if not exists:
+                    errors.append(f"Propriedade não encontrada: {property_name}")
+                    continue
+                if key in self.added:
+                    del self.added[key]
+                else:
+                    self.removed[key] = True
+                    self.new_values.pop(key, None)
+                changes_applied.append({
+                    "property": property_name,
+                    "action": "removed"
+                })
+        
+        return changes_applied, errors
+    
+    def splices(self, content: str) -> List[Tuple[int, int, str]]:
+        """Substituições (início, fim, texto) no texto original."""
+        splices = []
+        for key, value in self.new_values.items():
+            declaration = self.declarations[key]
+            if declaration.important and not value.lower().endswith("!important"):
+                value = f"{value} !important"
+            splices.append((declaration.value_start, declaration.value_end, value))
+        for key in self.removed:
+            for declaration in self.occurrences[key]:
+                splices.append(self._removal_splice(content, declaration))
+        if self.added:
+            kept = [
+                declaration for declaration in self.rule.declarations
+                if _property_key(declaration.name) not in self.removed
+            ]
+            splices.append(self._insertion_splice(content, kept, list(self.added.values())))
+        return splices
+    
+    @staticmethod
+    def _removal_splice(content: str, declaration: CSSDeclaration) -> Tuple[int, int, str]:
+        """Remove a declaração e, se estiver sozinha na linha, a linha inteira."""
+        start, end = declaration.start, declaration.end
+        line_start = content.rfind('\n', 0, start) + 1
+        line_end = content.find('\n', end)
+        line_end = len(content) if line_end < 0 else line_end
+        
+        if not content[line_start:start].strip() and not content[end:line_end].strip():
+            return line_start, min(line_end + 1, len(content)), ""
+        
+        # Mesma linha de outras declarações: remover também os espaços seguintes
+        while end < line_end and content[end] in ' \t':
+            end += 1
+        return start, end, ""
+    
+    def _insertion_splice(
+        self,
+        content: str,
+        kept: List[CSSDeclaration],
+        properties: List[Tuple[str, str]]
+    ) -> Tuple[int, int, str]:
+        """Inclui declarações após a última mantida no bloco, seguindo a indentação existente."""
+        rule = self.rule
+        block = content[rule.block_start:rule.block_end]
+        last = kept[-1] if kept else None
+        # Fechar a última declaração se ela não terminar com ";"
+        prefix = ";" if last is not None and content[last.end - 1] != ";" else ""
+        position = last.end if last is not None else rule.block_start
+        
+        if '\n' not in block:
+            # Bloco em uma linha: manter em uma linha
+            text = "".join(f" {name}: {value};" for name, value in properties)
+            if not rule.declarations and not block.strip():
+                return rule.block_start, rule.block_end, text + " "
+            return position, position, prefix + text
+        
+        if last is not None:
+            line_start = content.rfind('\n', 0, last.start) + 1
+            indent = content[line_start:last.start]
+            if indent.strip():
+                indent = "  "
+            # Manter comentários do fim da linha junto da declaração anterior
+            line_end = content.find('\n', position, rule.block_end)
+            if line_end >= 0 and not _COMMENT.sub('', content[position:line_end]).strip():
+                position = line_end
+        else:
+            line_start = content.rfind('\n', 0, rule.start) + 1
+            indent = _leading_whitespace(content[line_start:rule.start]) + "  "
+        
+        text = "".join(f"\n{indent}{name}: {value};" for name, value in properties)
+        return position, position, prefix + text
+
 
 class CSSModifier:
     """Modificador de arquivos CSS."""
     
-    def __init__(self, project_config: ProjectConfig):
+    def __init__(
+        self,
+        project_config: ProjectConfig,
+        max_size: Optional[int] = MAX_CSS_SIZE,
+        time_budget: Optional[float] = CSS_TIME_BUDGET
+    ):
+        """
+        Args:
+            project_config: Configuração do projeto
+            max_size: Tamanho máximo (caracteres) de CSS modificado ou validado
+            time_budget: Tempo máximo (segundos) de parse por operação
+        """
         self.project_config = project_config
+        self.max_size = max_size
+        self.time_budget = time_budget
         logger.info(f"CSSModifier inicializado para projeto: {project_config.project_id}")
     
     def modify_css_file(
@@ -26,7 +238,8 @@ class CSSModifier:
         file_path: str,
         selector: str,
         changes: List[Dict],
-        preserve_formatting: bool = True
+        preserve_formatting: bool = True,
+        at_rule: Optional[str] = None
     ) -> Dict:
         """
         Modifica arquivo CSS.
@@ -36,6 +249,7 @@ class CSSModifier:
             selector: Seletor CSS a modificar
             changes: Lista de mudanças: [{"property": str, "value": str, "action": str}]
             preserve_formatting: Preservar formatação original
+            at_rule: Contexto da regra (ex: "@media (max-width: 600px)")
         
         Returns:
             Dict com resultado:
@@ -59,11 +273,12 @@ class CSSModifier:
             # Ler conteúdo original
             original_content = full_path.read_text(encoding='utf-8')
             
-            # Modificar usando regex (mais simples e preserva formatação)
-            modified_content, changes_applied, errors = self._modify_with_regex(
+            # Modificar sobre o AST (preserva formatação)
+            modified_content, changes_applied, errors = self.modify_css_content(
                 original_content,
                 selector,
-                changes
+                changes,
+                at_rule
             )
             
             return {
@@ -81,186 +296,226 @@ class CSSModifier:
                 "errors": [str(e)]
             }
     
-    def _modify_with_regex(
+    def modify_css_content(
         self,
         content: str,
         selector: str,
-        changes: List[Dict]
-    ) -> tuple:
+        changes: List[Dict],
+        at_rule: Optional[str] = None
+    ) -> Tuple[str, List[Dict], List[str]]:
         """
-        Modifica CSS usando regex (preserva formatação).
+        Aplica as mudanças de um seletor no conteúdo CSS (sem ler/gravar arquivo).
+        
+        As edições são calculadas sobre o AST como substituições por offset e
+        aplicadas em uma única passagem sobre o texto original: só as
+        declarações alteradas mudam, o resto da formatação é preservado.
+        
+        Args:
+            content: Conteúdo CSS original
+            selector: Seletor CSS a modificar
+            changes: Lista de mudanças: [{"property": str, "value": str, "action": str}]
+            at_rule: Contexto da regra (ex: "@media (max-width: 600px)"); por
+                padrão a regra fora de at-rules tem preferência
         
         Returns:
             (modified_content, changes_applied, errors)
         """
-        modified = content
-        changes_applied = []
-        errors = []
+        modified, results = self._apply_edits(
+            content,
+            [{"selector": selector, "changes": changes, "at_rule": at_rule}],
+            discard_failed=False
+        )
+        return modified, results[0]["changes_applied"], results[0]["errors"]
+    
+    def modify_css_content_batch(
+        self,
+        content: str,
+        edits: List[Dict],
+        reverse_patches: bool = False
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Aplica as mudanças de várias correções no mesmo conteúdo CSS.
         
-        # Normalizar seletor
-        selector = selector.strip()
+        O conteúdo é parseado uma vez; as mudanças de correções que atingem a
+        mesma regra são combinadas em ordem, e todas as substituições são
+        aplicadas em uma única passagem. Correções com erro não alteram o
+        conteúdo (as demais continuam).
         
-        # Se seletor for genérico (ex: "button, [role=\"button\"]"), 
-        # tentar encontrar seletor mais específico no arquivo
-        if "," in selector or selector in ["button", "[role=\"button\"]"]:
-            # Procurar por seletores de botão no arquivo
-            button_patterns = [
-                r'\.btn-base\s*\{',
-                r'\.btn-primary\s*\{',
-                r'\.btn-secondary\s*\{',
-                r'button\s*\{',
-                r'\[role=["\']button["\']\]\s*\{'
-            ]
-            
-            match = None
-            for pattern in button_patterns:
-                match = re.search(pattern, modified, re.MULTILINE)
-                if match:
-                    # Encontrar início do seletor completo
-                    start = match.start()
-                    # Encontrar início da linha
-                    line_start = modified.rfind('\n', 0, start) + 1
-                    # Encontrar fim do seletor (até {)
-                    brace_pos = modified.find('{', start)
-                    if brace_pos > 0:
-                        actual_selector = modified[line_start:brace_pos].strip()
-                        selector = actual_selector
-                        break
-            
-            if not match:
-                errors.append(f"Seletor genérico não encontrado no arquivo: {selector}")
-                return modified, changes_applied, errors
+        Args:
+            content: Conteúdo CSS original
+            edits: [{"selector": str, "changes": List[Dict], "at_rule": Optional[str]}]
+            reverse_patches: Incluir em cada edição aplicada o patch reverso
+                ("reverse_patch": hunks sobre o conteúdo modificado, ver reverse_patch)
         
-        selector_escaped = re.escape(selector)
+        Returns:
+            (modified_content, [{"changes_applied": List[Dict], "errors": List[str]}] por edição)
+        """
+        return self._apply_edits(content, edits, discard_failed=True, reverse_patches=reverse_patches)
+    
+    def _apply_edits(
+        self,
+        content: str,
+        edits: List[Dict],
+        discard_failed: bool,
+        reverse_patches: bool = False
+    ) -> Tuple[str, List[Dict]]:
+        try:
+            stylesheet = parse_css(content, self.max_size, self.time_budget)
+        except CSSBudgetExceeded as e:
+            logger.warning(f"Modificação de CSS abortada: {e}")
+            return content, [{"changes_applied": [], "errors": [str(e)]} for _ in edits]
         
-        # Encontrar bloco do seletor
-        # Padrão: selector { ... }
-        pattern = rf'({selector_escaped})\s*\{{([^}}]*(?:\{{[^}}]*\}}[^}}]*)*)\}}'
+        plans: Dict[int, _RuleEdits] = {}
+        results = []
+        # Estados do plano antes/depois de cada edição (para os patches reversos)
+        states = []
         
-        match = re.search(pattern, modified, re.MULTILINE | re.DOTALL)
+        for edit in edits:
+            rule, error = self._resolve_rule(stylesheet, edit.get("selector", ""), edit.get("at_rule"))
+            if rule is None:
+                results.append({"changes_applied": [], "errors": [error]})
+                states.append(None)
+                continue
+            
+            plan = plans.get(rule.start)
+            if plan is None:
+                plan = plans[rule.start] = _RuleEdits(rule)
+            
+            state = plan.save()
+            changes_applied, errors = plan.plan(edit.get("changes", []))
+            if errors and discard_failed:
+                plan.restore(state)
+            results.append({"changes_applied": changes_applied, "errors": errors})
+            states.append((plan, state, plan.save()))
         
-        if not match:
-            errors.append(f"Seletor não encontrado: {selector}")
-            return modified, changes_applied, errors
+        splices = [splice for plan in plans.values() for splice in plan.splices(content)]
+        modified = _apply_splices(content, splices)
         
-        selector_text = match.group(1)
-        block_content = match.group(2)
-        block_start = match.start(2)
-        block_end = match.end(2)
+        if reverse_patches:
+            self._add_reverse_patches(content, modified, splices, results, states)
+        return modified, results
+    
+    @staticmethod
+    def _add_reverse_patches(
+        content: str,
+        modified: str,
+        splices: List[Tuple[int, int, str]],
+        results: List[Dict],
+        states: List[Optional[Tuple[_RuleEdits, Tuple, Tuple]]]
+    ):
+        """
+        Patch reverso de cada edição: o bloco da regra é renderizado com o plano
+        antes e depois da edição e a diferença vira hunks sobre o conteúdo
+        modificado (edições da mesma regra são desfeitas uma a uma).
+        """
+        starts = sorted(splices)
+        deltas = [0]
+        for start, end, text in starts:
+            deltas.append(deltas[-1] + len(text) - (end - start))
         
-        # Modificar propriedades no bloco
-        modified_block = block_content
+        def render(plan: _RuleEdits, state: Tuple) -> str:
+            rule = plan.rule
+            plan.restore(state)
+            return _apply_splices(
+                content[rule.block_start:rule.block_end],
+                [(start - rule.block_start, end - rule.block_start, text) for start, end, text in plan.splices(content)]
+            )
         
-        for change in changes:
-            property_name = change.get("property", "").strip()
-            property_value = change.get("value", "").strip()
-            action = change.get("action", "modify").lower()
-            
-            if not property_name:
-                errors.append("Propriedade não especificada")
+        plans = {id(state[0]): state[0] for state in states if state}
+        final_states = {key: plan.save() for key, plan in plans.items()}
+        for result, state in zip(results, states):
+            if result["errors"] or not state:
                 continue
+            plan, before_state, after_state = state
+            rule = plan.rule
+            before = render(plan, before_state)
+            after = render(plan, after_state)
+            final_block = render(plan, final_states[id(plan)])
             
-            # Escapar nome da propriedade
-            prop_escaped = re.escape(property_name)
-            
-            # Padrão para propriedade CSS
-            prop_pattern = rf'({prop_escaped})\s*:\s*([^;]+);'
-            
-            prop_match = re.search(prop_pattern, modified_block)
-            
-            if action == "modify":
-                if prop_match:
-                    # Modificar propriedade existente
-                    old_value = prop_match.group(2).strip()
-                    new_prop = f"{property_name}: {property_value};"
-                    modified_block = modified_block[:prop_match.start()] + new_prop + modified_block[prop_match.end():]
-                    changes_applied.append({
-                        "property": property_name,
-                        "action": "modified",
-                        "old_value": old_value,
-                        "new_value": property_value
-                    })
-                else:
-                    # Adicionar nova propriedade
-                    # Adicionar no final do bloco (antes do })
-                    if modified_block.strip():
-                        modified_block = modified_block.rstrip() + f"\n  {property_name}: {property_value};"
-                    else:
-                        modified_block = f"  {property_name}: {property_value};"
-                    changes_applied.append({
-                        "property": property_name,
-                        "action": "added",
-                        "new_value": property_value
-                    })
-            
-            elif action == "add":
-                if not prop_match:
-                    # Adicionar nova propriedade
-                    if modified_block.strip():
-                        modified_block = modified_block.rstrip() + f"\n  {property_name}: {property_value};"
-                    else:
-                        modified_block = f"  {property_name}: {property_value};"
-                    changes_applied.append({
-                        "property": property_name,
-                        "action": "added",
-                        "new_value": property_value
-                    })
-                else:
-                    errors.append(f"Propriedade já existe: {property_name}")
-            
-            elif action == "remove":
-                if prop_match:
-                    # Remover propriedade
-                    # Remover linha inteira incluindo quebra de linha anterior
-                    start = prop_match.start()
-                    # Encontrar início da linha
-                    line_start = modified_block.rfind('\n', 0, start) + 1
-                    # Encontrar fim da linha (incluindo ;)
-                    line_end = modified_block.find(';', start) + 1
-                    # Remover espaços em branco antes
-                    while line_start > 0 and modified_block[line_start-1] in ' \t':
-                        line_start -= 1
-                    # Remover quebra de linha após se houver
-                    if line_end < len(modified_block) and modified_block[line_end] == '\n':
-                        line_end += 1
-                    
-                    modified_block = modified_block[:line_start] + modified_block[line_end:]
-                    changes_applied.append({
-                        "property": property_name,
-                        "action": "removed"
-                    })
-                else:
-                    errors.append(f"Propriedade não encontrada: {property_name}")
+            # Posição do bloco no conteúdo modificado
+            block_start = rule.block_start + deltas[bisect.bisect_left(starts, (rule.block_start, -1, ""))]
+            block_end = block_start + len(final_block)
+            result["reverse_patch"] = add_line_numbers(
+                make_reverse_hunks(
+                    before, after, block_start, modified[:block_start], modified[block_end:], rule.selector
+                ),
+                modified
+            )
         
-        # Reconstruir CSS
-        modified = (
-            modified[:match.start()] +
-            f"{selector_text} {{\n{modified_block}\n}}" +
-            modified[match.end():]
-        )
+        for key, plan in plans.items():
+            plan.restore(final_states[key])
+    
+    def _resolve_rule(
+        self,
+        stylesheet: CSSStylesheet,
+        selector: str,
+        at_rule: Optional[str]
+    ) -> Tuple[Optional[CSSRule], Optional[str]]:
+        """Regra alvo de um seletor, ou (None, mensagem de erro)."""
+        # Normalizar seletor
+        selector = selector.strip()
+        
+        # Se seletor for genérico (ex: "button, [role=\"button\"]"),
+        # usar a regra de botão mais específica do arquivo
+        if "," in selector or selector in ["button", "[role=\"button\"]"]:
+            rule = self._find_generic_rule(stylesheet)
+            return rule, None if rule else f"Seletor genérico não encontrado no arquivo: {selector}"
+        
+        rule = self._find_rule(stylesheet, selector, at_rule)
+        return rule, None if rule else f"Seletor não encontrado: {selector}"
+    
+    @staticmethod
+    def _find_rule(stylesheet: CSSStylesheet, selector: str, at_rule: Optional[str] = None) -> Optional[CSSRule]:
+        """
+        Regra do seletor: exata ou, sem ela, com o seletor em sua lista.
         
-        return modified, changes_applied, errors
+        Entre várias regras, a do contexto at_rule (ou, sem ele, a que está
+        fora de at-rules) tem preferência; depois, a primeira do arquivo.
+        """
+        target = ' '.join(selector.split())
+        candidates = stylesheet.find_rules(selector) or [
+            rule for rule in stylesheet.rules()
+            if target in (' '.join(part.split()) for part in rule.selector.split(','))
+        ]
+        if not candidates:
+            return None
+        
+        wanted = [' '.join(at_rule.split())] if at_rule else []
+        for rule in candidates:
+            context = [' '.join(f"@{node.name} {node.prelude}".split()) for node in rule.at_rules()]
+            if context == wanted:
+                return rule
+        return None if at_rule else candidates[0]
+    
+    @staticmethod
+    def _find_generic_rule(stylesheet: CSSStylesheet) -> Optional[CSSRule]:
+        """Regra de botão mais específica para seletores genéricos."""
+        for pattern in GENERIC_BUTTON_PATTERNS:
+            for rule in stylesheet.rules():
+                if pattern.search(rule.selector):
+                    return rule
+        return None
     
     def validate_css(self, content: str) -> tuple:
         """
-        Valida sintaxe CSS básica.
+        Valida a estrutura do CSS (chaves, comentários e blocos) pelo parser.
+        
+        Erros em declarações isoladas não invalidam o arquivo, como no navegador.
         
         Returns:
             (is_valid, errors)
         """
         try:
-            # Validação básica: verificar se há chaves balanceadas
-            open_braces = content.count('{')
-            close_braces = content.count('}')
-            
-            if open_braces != close_braces:
-                return False, [f"Chaves desbalanceadas: {open_braces} abertas, {close_braces} fechadas"]
-            
-            # Verificar se há seletores e propriedades básicas
-            if not re.search(r'[^{}]+{[^}]+}', content):
-                return False, ["Nenhuma regra CSS válida encontrada"]
-            
-            return True, []
-        except Exception as e:
+            stylesheet = parse_css(content, self.max_size, self.time_budget)
+        except CSSBudgetExceeded as e:
             return False, [str(e)]
-
+        
+        structural_errors = stylesheet.structural_errors
+        if structural_errors:
+            return False, [f"Linha {error['line']}: {error['message']}" for error in structural_errors]
+        
+        # Verificar se há ao menos uma regra (ou at-rule) com declarações
+        if not any(node.declarations for node in stylesheet.walk()):
+            return False, ["Nenhuma regra CSS válida encontrada"]
+        
+        return True, []
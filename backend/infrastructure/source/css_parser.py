@@ -0,0 +1,409 @@
+"""
+CSS Parser
+
+Tokenização e parse de CSS em uma única passagem: regras, at-rules e
+declarações com offsets no texto original e tabela de linhas pré-calculada.
+Compartilhado por SourceAnalyzer, FileLocator e CSSModifier.
+"""
+
+import logging
+import re
+import time
+from bisect import bisect_right
+from typing import List, Dict, Optional, Iterator, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Próximo caractere com significado estrutural (o resto é pulado em C)
+_SPECIAL = re.compile(r'/\*|\\.|["\'{};()]', re.DOTALL)
+
+# Strings terminam na aspa ou, sem ela, na quebra de linha (como no navegador)
+_STRINGS = {
+    '"': re.compile(r'"(?:[^"\\\n]|\\.)*\\?(?:"|(?=\n)|$)', re.DOTALL),
+    "'": re.compile(r"'(?:[^'\\\n]|\\.)*\\?(?:'|(?=\n)|$)", re.DOTALL),
+}
+
+_COMMENT = re.compile(r'/\*.*?(?:\*/|$)', re.DOTALL)
+_AT_RULE = re.compile(r'@([-\w]*)\s*(.*)', re.DOTALL)
+_IMPORTANT = re.compile(r'!\s*important\s*', re.IGNORECASE)
+_IMPORT_TARGET = re.compile(r'''^(?:url\(\s*)?["']?([^"')\s]+)''', re.IGNORECASE)
+
+# Blocos aninhados além disso interrompem o parse (CSSBudgetExceeded)
+MAX_NESTING_DEPTH = 256
+
+# Erros guardados em stylesheet.errors (o total fica em error_count)
+MAX_REPORTED_ERRORS = 100
+
+# Intervalo (em tokens) entre verificações do orçamento de tempo
+_TIME_CHECK_INTERVAL = 4096
+
+# At-rules cujos blocos contêm regras de quadros, não seletores
+KEYFRAMES_AT_RULES = ('keyframes', '-webkit-keyframes', '-moz-keyframes', '-o-keyframes')
+
+
+class CSSBudgetExceeded(ValueError):
+    """Entrada CSS acima do limite de tamanho, tempo ou aninhamento."""
+
+
+class CSSDeclaration:
+    """Declaração "propriedade: valor" com offsets no texto."""
+    
+    __slots__ = ('name', 'value', 'important', 'start', 'end', 'value_start', 'value_end')
+    
+    def __init__(
+        self,
+        name: str,
+        value: str,
+        important: bool,
+        start: int,
+        end: int,
+        value_start: int,
+        value_end: int
+    ):
+        self.name = name
+        self.value = value
+        self.important = important
+        # start: início do nome; end: após o ";" (ou após o valor, se não houver)
+        self.start = start
+        self.end = end
+        # Valor sem espaços nas pontas (inclui "!important")
+        self.value_start = value_start
+        self.value_end = value_end
+
+
+class CSSRule:
+    """Regra de estilo: seletor e bloco de declarações."""
+    
+    __slots__ = (
+        'selector', 'start', 'block_start', 'block_end', 'declarations', 'children', 'parent'
+    )
+    
+    def __init__(
+        self,
+        selector: str,
+        start: int,
+        block_start: int,
+        parent: Optional[Union['CSSRule', 'CSSAtRule']]
+    ):
+        self.selector = selector
+        # start: início do seletor; block_start: após "{"; block_end: posição do "}"
+        self.start = start
+        self.block_start = block_start
+        self.block_end = -1
+        self.declarations: List[CSSDeclaration] = []
+        # Regras e at-rules aninhadas (CSS nesting)
+        self.children: List[Union['CSSRule', 'CSSAtRule']] = []
+        self.parent = parent
+    
+    @property
+    def end(self) -> int:
+        return self.block_end + 1
+    
+    def at_rules(self) -> List['CSSAtRule']:
+        """At-rules que contêm a regra, da mais externa para a mais interna."""
+        chain = []
+        node = self.parent
+        while node is not None:
+            if isinstance(node, CSSAtRule):
+                chain.append(node)
+            node = node.parent
+        return chain[::-1]
+
+
+class CSSAtRule:
+    """At-rule com bloco (@media, @supports, @font-face...) ou instrução (@import, @charset)."""
+    
+    __slots__ = (
+        'name', 'prelude', 'start', 'block_start', 'block_end', 'declarations', 'children', 'parent'
+    )
+    
+    def __init__(self, name: str, prelude: str, start: int, block_start: int, parent):
+        self.name = name
+        self.prelude = prelude
+        self.start = start
+        # Instruções sem bloco: block_start == -1 e block_end na posição do ";"
+        self.block_start = block_start
+        self.block_end = -1
+        self.declarations: List[CSSDeclaration] = []
+        self.children: List[Union[CSSRule, 'CSSAtRule']] = []
+        self.parent = parent
+    
+    @property
+    def end(self) -> int:
+        return self.block_end + 1
+    
+    @property
+    def has_block(self) -> bool:
+        return self.block_start >= 0
+
+
+class CSSStylesheet:
+    """Resultado do parse: nós de nível superior, tabela de linhas e erros."""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.children: List[Union[CSSRule, CSSAtRule]] = []
+        self.errors: List[Dict] = []
+        self.error_count = 0
+        self._line_starts: Optional[List[int]] = None
+    
+    @property
+    def line_starts(self) -> List[int]:
+        """Offset do início de cada linha (calculado uma vez)."""
+        if self._line_starts is None:
+            self._line_starts = [0] + [match.end() for match in re.finditer('\n', self.text)]
+        return self._line_starts
+    
+    def line_of(self, offset: int) -> int:
+        """Linha (a partir de 1) de um offset."""
+        return bisect_right(self.line_starts, offset)
+    
+    def walk(self) -> Iterator[Union[CSSRule, CSSAtRule]]:
+        """Todos os nós em ordem de documento."""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+    
+    def rules(self, include_keyframes: bool = False) -> Iterator[CSSRule]:
+        """Regras de estilo em ordem de documento (inclusive dentro de at-rules)."""
+        for node in self.walk():
+            if not isinstance(node, CSSRule):
+                continue
+            if not include_keyframes and any(
+                at_rule.name.lower() in KEYFRAMES_AT_RULES for at_rule in node.at_rules()
+            ):
+                continue
+            yield node
+    
+    def at_rules(self, name: Optional[str] = None) -> Iterator[CSSAtRule]:
+        """At-rules em ordem de documento (opcionalmente filtradas pelo nome, sem "@")."""
+        for node in self.walk():
+            if isinstance(node, CSSAtRule) and (name is None or node.name.lower() == name):
+                yield node
+    
+    @property
+    def structural_errors(self) -> List[Dict]:
+        """Erros que quebram a estrutura de blocos (chaves, comentários)."""
+        return [error for error in self.errors if error['kind'] == 'structure']
+    
+    def find_rules(self, selector: str) -> List[CSSRule]:
+        """Regras cujo seletor é exatamente o informado (espaços normalizados)."""
+        target = _normalize_selector(selector)
+        return [rule for rule in self.rules() if _normalize_selector(rule.selector) == target]
+
+
+def _normalize_selector(selector: str) -> str:
+    return ' '.join(selector.split())
+
+
+def _skip_trivia(text: str, start: int, stop: int) -> int:
+    """Primeira posição em [start, stop) que não é espaço nem comentário."""
+    position = start
+    while position < stop:
+        char = text[position]
+        if char.isspace():
+            position += 1
+        elif text.startswith('/*', position):
+            end = text.find('*/', position + 2)
+            position = stop if end < 0 else min(end + 2, stop)
+        else:
+            break
+    return position
+
+
+def _split_important(value: str) -> Tuple[str, bool]:
+    """Separa "!important" do fim do valor (sem backtracking sobre espaços)."""
+    bang = value.rfind('!')
+    if bang < 0 or not _IMPORTANT.fullmatch(value, bang):
+        return value, False
+    return value[:bang].rstrip(), True
+
+
+def _at_rule_parts(text: str) -> Tuple[str, str]:
+    """Nome (sem "@") e prelúdio de uma at-rule."""
+    match = _AT_RULE.match(text)
+    if match is None:
+        return '', text[1:].strip()
+    return match.group(1), match.group(2).strip()
+
+
+def _clean(text: str, has_comment: bool) -> str:
+    """Texto do segmento sem comentários e espaços nas pontas."""
+    if has_comment:
+        text = _COMMENT.sub('', text)
+    return text.strip()
+
+
+def parse_css(
+    text: str,
+    max_size: Optional[int] = None,
+    time_budget: Optional[float] = None
+) -> CSSStylesheet:
+    """
+    Faz o parse do CSS em uma passagem (tempo linear no tamanho do texto).
+    
+    Comentários, strings, escapes e parênteses (ex: url(data:...;base64))
+    são respeitados ao procurar "{", "}" e ";". Erros (chaves sem par,
+    comentários não fechados) são registrados em stylesheet.errors sem
+    interromper o parse.
+    
+    Args:
+        text: Conteúdo CSS
+        max_size: Tamanho máximo do texto em caracteres (None = sem limite)
+        time_budget: Tempo máximo de parse em segundos (None = sem limite)
+    
+    Raises:
+        CSSBudgetExceeded: Texto maior que max_size, parse acima de
+            time_budget ou blocos aninhados além de MAX_NESTING_DEPTH
+    """
+    if max_size is not None and len(text) > max_size:
+        raise CSSBudgetExceeded(f"CSS com {len(text)} caracteres excede o limite de {max_size}")
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    tokens = 0
+    
+    stylesheet = CSSStylesheet(text)
+    # Blocos abertos, do mais externo ao mais interno (vazio = nível superior)
+    stack: List[Union[CSSRule, CSSAtRule]] = []
+    length = len(text)
+    segment_start = 0
+    has_comment = False
+    paren_depth = 0
+    position = 0
+    
+    def add_error(message: str, offset: int, kind: str = 'syntax'):
+        stylesheet.error_count += 1
+        if len(stylesheet.errors) < MAX_REPORTED_ERRORS:
+            stylesheet.errors.append({
+                'message': message,
+                'offset': offset,
+                'line': stylesheet.line_of(offset),
+                'kind': kind
+            })
+    
+    def parent_node() -> Optional[Union[CSSRule, CSSAtRule]]:
+        return stack[-1] if stack else None
+    
+    def children_of_current() -> List[Union[CSSRule, CSSAtRule]]:
+        return stack[-1].children if stack else stylesheet.children
+    
+    def finish_segment(stop: int, terminator: int):
+        """Trata o texto pendente antes de ";" ou "}" (declaração ou instrução)."""
+        start = _skip_trivia(text, segment_start, stop)
+        if start >= stop:
+            return
+        if text[start] == '@':
+            name, prelude = _at_rule_parts(_clean(text[start:stop], has_comment))
+            at_rule = CSSAtRule(name, prelude, start, -1, parent_node())
+            at_rule.block_end = terminator
+            children_of_current().append(at_rule)
+            return
+        
+        if not stack:
+            add_error(f"Conteúdo fora de regra: {text[start:stop].strip()[:40]}", start)
+            return
+        
+        colon = text.find(':', start, stop)
+        if colon < 0:
+            add_error(f"Declaração inválida: {text[start:stop].strip()[:40]}", start)
+            return
+        
+        name = _clean(text[start:colon], has_comment)
+        value_start = _skip_trivia(text, colon + 1, stop)
+        value_end = stop
+        while value_end > value_start and text[value_end - 1].isspace():
+            value_end -= 1
+        value, important = _split_important(_clean(text[value_start:value_end], has_comment))
+        end = terminator + 1 if text[terminator:terminator + 1] == ';' else value_end
+        stack[-1].declarations.append(
+            CSSDeclaration(name, value, important, start, end, value_start, value_end)
+        )
+    
+    while True:
+        match = _SPECIAL.search(text, position)
+        if match is None:
+            break
+        token = match.group()
+        index = match.start()
+        
+        tokens += 1
+        if (
+            deadline is not None
+            and tokens % _TIME_CHECK_INTERVAL == 0
+            and time.monotonic() > deadline
+        ):
+            raise CSSBudgetExceeded(
+                f"Parse do CSS excedeu {time_budget}s (parado na linha {stylesheet.line_of(index)})"
+            )
+        
+        if token == '/*':
+            end = text.find('*/', index + 2)
+            if end < 0:
+                add_error("Comentário não fechado", index, 'structure')
+                position = length
+                break
+            has_comment = True
+            position = end + 2
+            continue
+        
+        if token in _STRINGS:
+            # O padrão sempre casa a partir da aspa (no pior caso, até o fim da linha)
+            string_match = _STRINGS[token].match(text, index)
+            position = string_match.end() if string_match else length
+            continue
+        
+        position = match.end()
+        
+        if token == '(':
+            paren_depth += 1
+        elif token == ')':
+            paren_depth = max(paren_depth - 1, 0)
+        elif token == ';':
+            if paren_depth == 0:
+                finish_segment(index, index)
+                segment_start, has_comment = position, False
+        elif token == '{':
+            paren_depth = 0
+            start = _skip_trivia(text, segment_start, index)
+            prelude = _clean(text[start:index], has_comment)
+            node: Union[CSSRule, CSSAtRule]
+            if prelude.startswith('@'):
+                name, rest = _at_rule_parts(prelude)
+                node = CSSAtRule(name, rest, start, position, parent_node())
+            else:
+                node = CSSRule(prelude, start, position, parent_node())
+            children_of_current().append(node)
+            stack.append(node)
+            if len(stack) > MAX_NESTING_DEPTH:
+                raise CSSBudgetExceeded(
+                    f"Blocos aninhados além de {MAX_NESTING_DEPTH} níveis "
+                    f"(linha {stylesheet.line_of(index)})"
+                )
+            segment_start, has_comment = position, False
+        elif token == '}':
+            paren_depth = 0
+            finish_segment(index, index)
+            if stack:
+                stack.pop().block_end = index
+            else:
+                add_error("Chave de fechamento sem abertura", index, 'structure')
+            segment_start, has_comment = position, False
+    
+    if stack:
+        # Blocos não fechados terminam no fim do texto
+        finish_segment(length, length)
+        for node in stack:
+            add_error("Bloco não fechado", node.start, 'structure')
+            node.block_end = length
+    else:
+        # Instrução final sem ";" (ex: @import no fim do arquivo)
+        finish_segment(length, length)
+    
+    return stylesheet
+
+
+def import_target(at_rule: CSSAtRule) -> Optional[str]:
+    """Arquivo de um @import ("x.css", url(x.css) ou url("x.css"))."""
+    match = _IMPORT_TARGET.match(at_rule.prelude)
+    return match.group(1) if match else None
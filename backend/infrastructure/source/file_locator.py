@@ -39,6 +39,22 @@ class FileLocator:
                 "confidence": float  # 0.0 a 1.0
             }
         """
+        generic_match = self._locate_generic_selector(selector)
+        if generic_match:
+            return generic_match
+        
+        return self._select_best_match(selector, self.analyzer.find_selector_in_files(selector))
+    
+    async def locate_file_for_selector_async(self, selector: str) -> Optional[Dict]:
+        """Versão assíncrona de locate_file_for_selector (parse no pool de processos)."""
+        generic_match = self._locate_generic_selector(selector)
+        if generic_match:
+            return generic_match
+        
+        return self._select_best_match(selector, await self.analyzer.find_selector_in_files_async(selector))
+    
+    def _locate_generic_selector(self, selector: str) -> Optional[Dict]:
+        """Arquivo para seletores genéricos (sem busca nos arquivos)."""
         # Se seletor for genérico (ex: "button, [role=\"button\"]"), 
         # tentar encontrar arquivo mais apropriado baseado em padrões
         if "," in selector or selector.strip() in ["button", "[role=\"button\"]"]:
@@ -66,8 +82,10 @@ class FileLocator:
                     "confidence": 0.4
                 }
         
-        matches = self.analyzer.find_selector_in_files(selector)
-        
+        return None
+    
+    def _select_best_match(self, selector: str, matches: List[Dict]) -> Optional[Dict]:
+        """Escolhe a ocorrência mais apropriada do seletor."""
         if not matches:
             logger.warning(f"Seletor não encontrado: {selector}")
             # Fallback: retornar arquivo de componentes se existir
@@ -139,6 +157,16 @@ class FileLocator:
         
         return self.locate_file_for_selector(selector)
     
+    async def locate_file_for_fix_async(self, fix: Dict) -> Optional[Dict]:
+        """Versão assíncrona de locate_file_for_fix."""
+        selector = fix.get("target_selector") or fix.get("target_element", "")
+        
+        if not selector:
+            logger.error("Fix sem seletor alvo")
+            return None
+        
+        return await self.locate_file_for_selector_async(selector)
+    
     def get_all_css_files(self) -> List[Dict]:
         """Retorna lista de todos os arquivos CSS."""
         css_files = self.project_config.get_css_files()
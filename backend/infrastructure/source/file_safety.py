@@ -0,0 +1,143 @@
+"""
+File Safety
+
+Escrita segura dos arquivos fonte: lock exclusivo por arquivo (entre threads
+e processos, via fcntl), escrita atômica (arquivo temporário + fsync +
+rename) e hash de conteúdo para pré-condições otimistas.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Sem fcntl (ex: Windows) o lock vale só dentro do processo
+    FCNTL_AVAILABLE = False
+
+# Locks de thread por arquivo de lock (flock já exclui entre processos)
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+class ContentChangedError(Exception):
+    """O arquivo mudou desde que o hash esperado foi calculado (ex: no preview)."""
+    
+    def __init__(self, file_path: str, expected_hash: str, actual_hash: str):
+        super().__init__(
+            f"Arquivo alterado desde o preview: {file_path} "
+            f"(esperado {expected_hash[:12]}, atual {actual_hash[:12]})"
+        )
+        self.file_path = file_path
+        self.expected_hash = expected_hash
+        self.actual_hash = actual_hash
+
+
+def content_hash(content: Union[str, bytes]) -> str:
+    """Hash do conteúdo do arquivo (sha256 dos bytes em UTF-8)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def check_expected_hash(file_path: str, content: str, expected_hash: Optional[str] = None) -> str:
+    """
+    Confere o hash atual com o esperado.
+    
+    Returns:
+        Hash atual do conteúdo
+    
+    Raises:
+        ContentChangedError: Se expected_hash foi informado e difere do atual
+    """
+    actual_hash = content_hash(content)
+    if expected_hash and expected_hash != actual_hash:
+        raise ContentChangedError(file_path, expected_hash, actual_hash)
+    return actual_hash
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Lock exclusivo associado a um arquivo.
+    
+    O lock fica em um arquivo separado (lock_path): o alvo é substituído por
+    rename a cada escrita, e um lock no inode antigo não protegeria o novo.
+    A espera bloqueia a thread: código async deve usar asyncio.to_thread.
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(str(lock_path), threading.Lock())
+    
+    with thread_lock:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        
+        with open(lock_path, 'a+b') as handle:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """
+    Substitui o arquivo atomicamente: grava em temporário no mesmo diretório,
+    faz fsync e renomeia por cima do original (leitores veem o conteúdo antigo
+    ou o novo, nunca um arquivo pela metade).
+    """
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        
+        # Manter as permissões do original
+        try:
+            os.chmod(temp_name, path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    
+    _fsync_directory(path.parent)
+
+
+def atomic_write_text(path: Path, content: str, encoding: str = 'utf-8'):
+    """atomic_write_bytes para texto."""
+    atomic_write_bytes(path, content.encode(encoding))
+
+
+def _fsync_directory(directory: Path):
+    """Persiste o rename (entrada do diretório); ignorado onde não é suportado."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -4,15 +4,25 @@ Patch Applier
 Aplica correções nos arquivos fonte com backup.
 """
 
+import hashlib
 import logging
-import shutil
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Sequence
 from datetime import datetime
 
 from ...config.project_config import ProjectConfig
+from .backup_store import DEFAULT_PAGE_SIZE, get_backup_store, parse_backup_ref
 from .css_modifier import CSSModifier
 from .file_locator import FileLocator
+from .reverse_patch import revert_hunks
+from .file_safety import (
+    ContentChangedError,
+    atomic_write_bytes,
+    atomic_write_text,
+    check_expected_hash,
+    content_hash,
+    file_lock,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -24,19 +34,28 @@ class PatchApplier:
         self.project_config = project_config
         self.css_modifier = CSSModifier(project_config)
         self.file_locator = FileLocator(project_config)
+        self.backup_store = get_backup_store(project_config)
         logger.info(f"PatchApplier inicializado para projeto: {project_config.project_id}")
     
     def apply_fix(
         self,
         fix: Dict,
-        create_backup: bool = True
+        create_backup: bool = True,
+        file_info: Optional[Dict] = None,
+        expected_hash: Optional[str] = None
     ) -> Dict:
         """
         Aplica correção no arquivo fonte.
         
+        Leitura, verificação, backup e escrita acontecem sob o lock do arquivo;
+        a escrita é atômica (temporário + fsync + rename).
+        
         Args:
             fix: Dict com informações da correção
             create_backup: Criar backup antes de aplicar
+            file_info: Arquivo alvo já localizado (ver FileLocator.locate_file_for_fix_async)
+            expected_hash: Hash do conteúdo visto no preview; se o arquivo mudou
+                desde então, nada é escrito e o resultado traz "conflict": True
         
         Returns:
             Dict com resultado:
@@ -45,11 +64,14 @@ class PatchApplier:
                 "file_path": str,
                 "backup_path": Optional[str],
                 "changes_applied": List[Dict],
+                "content_hash": str,  # hash do conteúdo atual do arquivo
+                "reverse_patch": List[Dict],  # hunks para revert_fixes
                 "errors": List[str]
             }
         """
         # Localizar arquivo
-        file_info = self.file_locator.locate_file_for_fix(fix)
+        if file_info is None:
+            file_info = self.file_locator.locate_file_for_fix(fix)
         
         if not file_info:
             return {
@@ -60,78 +82,333 @@ class PatchApplier:
         file_path = file_info["relative_path"]
         selector = fix.get("target_selector") or fix.get("target_element", "")
         changes = fix.get("changes", [])
+        full_path = self.project_config.root_path / file_path
         
-        # Criar backup se solicitado
-        backup_path = None
-        if create_backup:
-            backup_path = self._create_backup(file_path)
-            if not backup_path:
+        if not self.project_config.validate_path(full_path):
+            return {
+                "success": False,
+                "file_path": file_path,
+                "errors": [f"Caminho inválido: {file_path}"]
+            }
+        
+        with self.lock_file(file_path):
+            try:
+                original_content = full_path.read_text(encoding='utf-8')
+                current_hash = check_expected_hash(file_path, original_content, expected_hash)
+            except ContentChangedError as e:
+                logger.warning(str(e))
+                return {
+                    "success": False,
+                    "conflict": True,
+                    "file_path": file_path,
+                    "content_hash": e.actual_hash,
+                    "errors": [str(e)]
+                }
+            except Exception as e:
+                logger.error(f"Erro ao ler arquivo {file_path}: {e}")
                 return {
                     "success": False,
-                    "errors": ["Falha ao criar backup"]
+                    "file_path": file_path,
+                    "errors": [str(e)]
                 }
+            
+            # Aplicar modificação
+            modified_content, edit_results = self.css_modifier.modify_css_content_batch(
+                original_content,
+                [{"selector": selector, "changes": changes}],
+                reverse_patches=True
+            )
+            changes_applied = edit_results[0]["changes_applied"]
+            errors = edit_results[0]["errors"]
+            
+            if errors:
+                return {
+                    "success": False,
+                    "file_path": file_path,
+                    "content_hash": current_hash,
+                    "errors": errors
+                }
+            
+            # Validar CSS modificado
+            is_valid, validation_errors = self.css_modifier.validate_css(modified_content)
+            
+            if not is_valid:
+                return {
+                    "success": False,
+                    "file_path": file_path,
+                    "content_hash": current_hash,
+                    "errors": validation_errors
+                }
+            
+            # Criar backup se solicitado
+            backup_path = None
+            if create_backup:
+                backup_path = self._create_backup(file_path, [fix.get("id")])
+                if not backup_path:
+                    return {
+                        "success": False,
+                        "file_path": file_path,
+                        "content_hash": current_hash,
+                        "errors": ["Falha ao criar backup"]
+                    }
+            
+            # Escrever arquivo modificado
+            try:
+                atomic_write_text(full_path, modified_content)
+                self._invalidate_index(file_path)
+                if backup_path:
+                    self._pin_backups([fix.get("id")])
+                
+                return {
+                    "success": True,
+                    "file_path": file_path,
+                    "backup_path": str(backup_path) if backup_path else None,
+                    "changes_applied": changes_applied,
+                    "content_hash": content_hash(modified_content),
+                    "reverse_patch": edit_results[0]["reverse_patch"],
+                    "errors": []
+                }
+            
+            except Exception as e:
+                # A escrita atômica não deixa o original pela metade
+                logger.error(f"Erro ao escrever arquivo: {e}")
+                
+                return {
+                    "success": False,
+                    "file_path": file_path,
+                    "backup_path": str(backup_path) if backup_path else None,
+                    "content_hash": current_hash,
+                    "errors": [str(e)]
+                }
+    
+    def apply_fixes(
+        self,
+        fixes: List[Dict],
+        create_backup: bool = True,
+        file_infos: Optional[Sequence[Optional[Dict]]] = None,
+        expected_hashes: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        """
+        Aplica várias correções, agrupadas por arquivo alvo.
         
-        # Aplicar modificação
-        result = self.css_modifier.modify_css_file(
-            file_path=file_path,
-            selector=selector,
-            changes=changes
-        )
+        Cada arquivo é lido, copiado para backup e escrito uma única vez; as
+        mudanças de todas as correções do arquivo passam juntas pelo
+        modificador. Uma correção com erro não impede as demais do mesmo
+        arquivo, mas se o CSS resultante for inválido nenhuma delas é aplicada.
         
-        if not result["success"]:
-            return {
-                "success": False,
-                "file_path": file_path,
-                "backup_path": backup_path,
-                "errors": result.get("errors", [])
+        Args:
+            fixes: Correções a aplicar
+            create_backup: Criar backup (um por arquivo) antes de escrever
+            file_infos: Arquivos já localizados, na ordem de fixes
+            expected_hashes: {caminho relativo: hash visto no preview}; arquivos
+                alterados desde então não são escritos ("conflict": True)
+        
+        Returns:
+            Dict com resultado:
+            {
+                "success": bool,
+                # por correção, na ordem recebida (com reverse_patch)
+                "results": List[Dict],
+                # por arquivo: file_path, backup_path, fix_ids, content_hash, success, errors
+                "files": List[Dict]
             }
+        """
+        if file_infos is None:
+            file_infos = [self.file_locator.locate_file_for_fix(fix) for fix in fixes]
         
-        # Validar CSS modificado
-        is_valid, validation_errors = self.css_modifier.validate_css(
-            result["modified_content"]
-        )
+        # Resultado por posição em fixes (todas preenchidas ao final)
+        results: Dict[int, Dict] = {}
+        groups: Dict[str, List[int]] = {}
         
-        if not is_valid:
-            # Restaurar backup se validação falhar
-            if backup_path:
-                self._restore_backup(file_path, backup_path)
-            
-            return {
-                "success": False,
-                "file_path": file_path,
-                "backup_path": backup_path,
-                "errors": validation_errors
-            }
+        for index, (fix, file_info) in enumerate(zip(fixes, file_infos)):
+            if not file_info:
+                results[index] = self._fix_result(
+                    fix, None, None, errors=["Arquivo não encontrado para o seletor"]
+                )
+                continue
+            groups.setdefault(file_info["relative_path"], []).append(index)
         
-        # Escrever arquivo modificado
-        try:
-            full_path = self.project_config.root_path / file_path
-            full_path.write_text(result["modified_content"], encoding='utf-8')
-            
+        expected_hashes = expected_hashes or {}
+        files = []
+        for file_path, indexes in groups.items():
+            with self.lock_file(file_path):
+                files.append(self._apply_file_batch(
+                    file_path, fixes, indexes, results, create_backup,
+                    expected_hashes.get(file_path)
+                ))
+        
+        ordered = [results[index] for index in range(len(fixes))]
+        return {
+            "success": all(result["success"] for result in ordered),
+            "results": ordered,
+            "files": files
+        }
+    
+    def _apply_file_batch(
+        self,
+        file_path: str,
+        fixes: List[Dict],
+        indexes: List[int],
+        results: Dict[int, Dict],
+        create_backup: bool,
+        expected_hash: Optional[str]
+    ) -> Dict:
+        """
+        Aplica as correções de um arquivo, já sob o lock (preenche results
+        nas posições de indexes).
+        """
+        batch = [fixes[index] for index in indexes]
+        current_hash = None
+        
+        def fail(
+            errors: List[str], backup_path: Optional[str] = None, conflict: bool = False
+        ) -> Dict:
+            for index, fix in zip(indexes, batch):
+                if index not in results:
+                    result = self._fix_result(fix, file_path, backup_path, errors=errors)
+                    if conflict:
+                        result["conflict"] = True
+                    results[index] = result
             return {
-                "success": True,
                 "file_path": file_path,
                 "backup_path": str(backup_path) if backup_path else None,
-                "changes_applied": result["changes_applied"],
-                "errors": []
+                "fix_ids": [fix.get("id") for fix in batch],
+                "content_hash": current_hash,
+                "success": False,
+                "conflict": conflict,
+                "errors": errors
             }
         
+        full_path = self.project_config.root_path / file_path
+        if not self.project_config.validate_path(full_path):
+            return fail([f"Caminho inválido: {file_path}"])
+        
+        try:
+            original_content = full_path.read_text(encoding='utf-8')
+            current_hash = check_expected_hash(file_path, original_content, expected_hash)
+        except ContentChangedError as e:
+            logger.warning(str(e))
+            current_hash = e.actual_hash
+            return fail([str(e)], conflict=True)
+        except Exception as e:
+            logger.error(f"Erro ao ler arquivo {file_path}: {e}")
+            return fail([str(e)])
+        
+        modified_content, edit_results = self.css_modifier.modify_css_content_batch(
+            original_content,
+            [
+                {
+                    "selector": fix.get("target_selector") or fix.get("target_element", ""),
+                    "changes": fix.get("changes", [])
+                }
+                for fix in batch
+            ],
+            reverse_patches=True
+        )
+        
+        # Correções com erro não entram no arquivo
+        applied = []
+        for index, fix, edit_result in zip(indexes, batch, edit_results):
+            if edit_result["errors"]:
+                results[index] = self._fix_result(
+                    fix, file_path, None, errors=edit_result["errors"]
+                )
+            else:
+                applied.append((index, fix, edit_result))
+        
+        if not applied:
+            return fail(["Nenhuma correção aplicável no arquivo"])
+        
+        # Validar CSS modificado
+        is_valid, validation_errors = self.css_modifier.validate_css(modified_content)
+        if not is_valid:
+            return fail(validation_errors)
+        
+        # Um blob para o arquivo; uma entrada no manifesto por correção
+        backup_path = None
+        backup_paths = {}
+        if create_backup:
+            refs = self._create_backup(
+                file_path, [fix.get("id") for _, fix, _ in applied], all_refs=True
+            )
+            if not refs:
+                return fail(["Falha ao criar backup"])
+            backup_path = refs[0]
+            backup_paths = {index: ref for (index, _, _), ref in zip(applied, refs)}
+        
+        # Escrever arquivo modificado (uma vez para todas as correções)
+        try:
+            atomic_write_text(full_path, modified_content)
+            self._invalidate_index(file_path)
         except Exception as e:
             logger.error(f"Erro ao escrever arquivo: {e}")
-            
-            # Restaurar backup se escrita falhar
-            if backup_path:
-                self._restore_backup(file_path, backup_path)
-            
-            return {
-                "success": False,
-                "file_path": file_path,
-                "backup_path": str(backup_path) if backup_path else None,
-                "errors": [str(e)]
-            }
+            return fail([str(e)], backup_path)
+        if backup_paths:
+            self._pin_backups([fix.get("id") for _, fix, _ in applied])
+        current_hash = content_hash(modified_content)
+        
+        for index, fix, edit_result in applied:
+            results[index] = self._fix_result(
+                fix, file_path, backup_paths.get(index),
+                changes_applied=edit_result["changes_applied"]
+            )
+            results[index]["reverse_patch"] = edit_result["reverse_patch"]
+        
+        logger.info(f"{len(applied)} correções aplicadas em {file_path}")
+        return {
+            "file_path": file_path,
+            "backup_path": str(backup_path) if backup_path else None,
+            "fix_ids": [fix.get("id") for _, fix, _ in applied],
+            "content_hash": current_hash,
+            "success": True,
+            "conflict": False,
+            "errors": []
+        }
+    
+    @staticmethod
+    def _fix_result(
+        fix: Dict,
+        file_path: Optional[str],
+        backup_path: Optional[str],
+        changes_applied: Optional[List[Dict]] = None,
+        errors: Optional[List[str]] = None
+    ) -> Dict:
+        return {
+            "fix_id": fix.get("id"),
+            "success": not errors,
+            "file_path": file_path,
+            "backup_path": str(backup_path) if backup_path else None,
+            "changes_applied": changes_applied or [],
+            "errors": errors or []
+        }
+    
+    def lock_file(self, file_path: str):
+        """
+        Lock exclusivo de um arquivo do projeto (entre threads e processos).
+        
+        Não é reentrante: métodos chamados com o lock já adquirido (ex:
+        _restore_backup) não o adquirem de novo.
+        """
+        digest = hashlib.sha1(str(file_path).encode('utf-8')).hexdigest()[:16]
+        return file_lock(self.project_config.backup_dir / ".locks" / f"{digest}.lock")
+    
+    def _invalidate_index(self, file_path: str):
+        """Arquivo alterado pelo serviço: reindexar no próximo acesso."""
+        self.file_locator.analyzer.selector_index.invalidate(file_path)
     
-    def _create_backup(self, file_path: str) -> Optional[Path]:
-        """Cria backup de um arquivo."""
+    def _create_backup(
+        self,
+        file_path: str,
+        fix_ids: Optional[List[Optional[str]]] = None,
+        all_refs: bool = False
+    ):
+        """
+        Registra o conteúdo atual do arquivo no store de backups.
+        
+        Returns:
+            Referência do backup ("backup:<id>"), ou a lista de referências (uma
+            por correção) se all_refs; None em caso de erro
+        """
         try:
             full_path = self.project_config.root_path / file_path
             
@@ -139,30 +416,45 @@ class PatchApplier:
                 logger.warning(f"Arquivo não existe para backup: {file_path}")
                 return None
             
-            # Criar diretório de backup com timestamp
-            backup_dir = self.project_config.get_backup_path()
-            backup_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Caminho do backup (preservar estrutura de diretórios)
-            backup_file = backup_dir / file_path
+            entries = self.backup_store.save(file_path, full_path.read_bytes(), fix_ids)
+            refs = [entry["backup_path"] for entry in entries]
             
-            # Criar diretórios necessários
-            backup_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Copiar arquivo
-            shutil.copy2(full_path, backup_file)
-            
-            logger.info(f"Backup criado: {backup_file}")
-            return backup_file
+            logger.info(f"Backup criado: {file_path} -> {', '.join(refs)}")
+            return refs if all_refs else refs[0]
         
         except Exception as e:
             logger.error(f"Erro ao criar backup: {e}")
             return None
     
-    def _restore_backup(self, file_path: str, backup_path: Path) -> bool:
+    def _pin_backups(self, fix_ids: List[Optional[str]], pinned: bool = True):
+        """
+        Fixa (ou libera) os backups das correções na retenção do store: o
+        backup de uma correção aplicada é mantido até ela ser revertida.
+        """
+        try:
+            if pinned:
+                self.backup_store.pin_fixes(fix_ids)
+            else:
+                self.backup_store.unpin_fixes(fix_ids)
+        except Exception as e:
+            logger.warning(f"Erro ao atualizar retenção dos backups: {e}")
+    
+    def _read_backup(self, backup_path: str) -> Optional[bytes]:
+        """Conteúdo de um backup: referência do store ou caminho (backups antigos)."""
+        backup_id = parse_backup_ref(backup_path)
+        if backup_id is not None:
+            return self.backup_store.load(backup_id)
+        
+        backup_file = Path(backup_path)
+        if not backup_file.exists():
+            return None
+        return backup_file.read_bytes()
+    
+    def _restore_backup(self, file_path: str, backup_path: str) -> bool:
         """Restaura arquivo do backup."""
         try:
-            if not backup_path.exists():
+            data = self._read_backup(backup_path)
+            if data is None:
                 logger.error(f"Backup não existe: {backup_path}")
                 return False
             
@@ -171,8 +463,9 @@ class PatchApplier:
             # Criar diretório se não existir
             full_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Restaurar arquivo
-            shutil.copy2(backup_path, full_path)
+            # Restaurar arquivo (escrita atômica)
+            atomic_write_bytes(full_path, data)
+            self._invalidate_index(file_path)
             
             logger.info(f"Arquivo restaurado do backup: {file_path}")
             return True
@@ -181,17 +474,37 @@ class PatchApplier:
             logger.error(f"Erro ao restaurar backup: {e}")
             return False
     
-    def rollback_fix(self, fix: Dict, backup_path: str) -> Dict:
+    def rollback_fix(
+        self,
+        fix: Dict,
+        backup_path: Optional[str] = None,
+        reverse_patch: Optional[Dict] = None
+    ) -> Dict:
         """
-        Reverte correção usando backup.
+        Reverte correção.
+        
+        Com reverse_patch, desfaz só as mudanças da correção (ver revert_fixes);
+        com backup_path, restaura o arquivo inteiro do backup, descartando
+        também mudanças posteriores.
         
         Args:
             fix: Dict com informações da correção
-            backup_path: Caminho do backup
+            backup_path: Referência ou caminho do backup
+            reverse_patch: {"file_path": str, "hunks": List[Dict]} registrado na aplicação
         
         Returns:
             Dict com resultado
         """
+        if reverse_patch:
+            result = self.revert_fixes([{**reverse_patch, "fix_id": fix.get("id")}])
+            return result["results"][0]
+        
+        if not backup_path:
+            return {
+                "success": False,
+                "errors": ["Nenhum patch reverso ou backup para reverter"]
+            }
+        
         file_info = self.file_locator.locate_file_for_fix(fix)
         
         if not file_info:
@@ -201,15 +514,24 @@ class PatchApplier:
             }
         
         file_path = file_info["relative_path"]
-        backup_file = Path(backup_path)
         
-        if not backup_file.exists():
+        backup_id = parse_backup_ref(backup_path)
+        if backup_id is not None:
+            exists = self.backup_store.get(backup_id)
+        else:
+            exists = Path(backup_path).exists()
+        if not exists:
+            # Removido pela retenção (correção já revertida) ou referência inválida
             return {
                 "success": False,
+                "backup_missing": True,
                 "errors": [f"Backup não encontrado: {backup_path}"]
             }
         
-        success = self._restore_backup(file_path, backup_file)
+        with self.lock_file(file_path):
+            success = self._restore_backup(file_path, backup_path)
+        if success:
+            self._pin_backups([fix.get("id")], pinned=False)
         
         return {
             "success": success,
@@ -218,29 +540,164 @@ class PatchApplier:
             "errors": [] if success else ["Falha ao restaurar backup"]
         }
     
-    def list_backups(self) -> List[Dict]:
-        """Lista backups disponíveis."""
-        backups = []
-        backup_dir = self.project_config.backup_dir
-        
-        if not backup_dir.exists():
-            return backups
-        
-        for backup_folder in sorted(backup_dir.iterdir(), reverse=True):
-            if backup_folder.is_dir():
-                # Listar arquivos no backup
-                for backup_file in backup_folder.rglob('*'):
-                    if backup_file.is_file():
-                        relative_path = backup_file.relative_to(backup_folder)
-                        backups.append({
-                            "backup_path": str(backup_file),
-                            "relative_path": str(relative_path),
-                            "timestamp": backup_folder.name,
-                            "size": backup_file.stat().st_size,
-                            "created_at": datetime.fromtimestamp(
-                                backup_file.stat().st_mtime
-                            ).isoformat()
-                        })
-        
-        return backups
-
+    def revert_fixes(self, patches: List[Dict]) -> Dict:
+        """
+        Desfaz correções aplicando seus patches reversos.
+        
+        Os patches são agrupados por arquivo: cada arquivo é lido e escrito
+        uma única vez, sob o lock. Dentro do arquivo as correções são
+        desfeitas da mais recente para a mais antiga (ordem de patches), e
+        cada trecho é localizado pelo contexto no conteúdo atual, então
+        mudanças posteriores de outras correções ou manuais são mantidas.
+        Uma correção cujo trecho não é mais encontrado falha sozinha.
+        
+        Args:
+            patches: [{"fix_id": str, "file_path": str, "hunks": List[Dict]}],
+                na ordem em que as correções foram aplicadas
+        
+        Returns:
+            Dict com resultado:
+            {
+                "success": bool,
+                "results": List[Dict],  # por patch: fix_id, success, file_path, errors
+                # por arquivo: file_path, fix_ids, content_hash, success, errors
+                "files": List[Dict]
+            }
+        """
+        # Resultado por posição em patches (todas preenchidas ao final)
+        results: Dict[int, Dict] = {}
+        groups: Dict[str, List[int]] = {}
+        for index, patch in enumerate(patches):
+            groups.setdefault(patch["file_path"], []).append(index)
+        
+        files = []
+        for file_path, indexes in groups.items():
+            with self.lock_file(file_path):
+                files.append(self._revert_file(file_path, patches, indexes, results))
+        self._pin_backups(
+            [fix_id for item in files for fix_id in item["fix_ids"]], pinned=False
+        )
+        
+        ordered = [results[index] for index in range(len(patches))]
+        return {
+            "success": all(result["success"] for result in ordered),
+            "results": ordered,
+            "files": files
+        }
+    
+    def _revert_file(
+        self,
+        file_path: str,
+        patches: List[Dict],
+        indexes: List[int],
+        results: Dict[int, Dict]
+    ) -> Dict:
+        """
+        Desfaz os patches de um arquivo, já sob o lock (preenche results nas
+        posições de indexes).
+        """
+        def result(index: int, errors: List[str]) -> Dict:
+            return {
+                "fix_id": patches[index].get("fix_id"),
+                "success": not errors,
+                "file_path": file_path,
+                "errors": errors
+            }
+        
+        full_path = self.project_config.root_path / file_path
+        errors = []
+        if not self.project_config.validate_path(full_path):
+            errors = [f"Caminho inválido: {file_path}"]
+        else:
+            try:
+                content = full_path.read_text(encoding='utf-8')
+            except Exception as e:
+                logger.error(f"Erro ao ler arquivo {file_path}: {e}")
+                errors = [str(e)]
+        
+        if errors:
+            for index in indexes:
+                results[index] = result(index, errors)
+            return {
+                "file_path": file_path, "fix_ids": [], "content_hash": None,
+                "success": False, "errors": errors
+            }
+        
+        reverted = []
+        for index in reversed(indexes):
+            content, patch_errors = revert_hunks(content, patches[index].get("hunks", []))
+            results[index] = result(index, patch_errors)
+            if not patch_errors:
+                reverted.append(patches[index].get("fix_id"))
+        
+        if reverted:
+            try:
+                atomic_write_text(full_path, content)
+                self._invalidate_index(file_path)
+            except Exception as e:
+                logger.error(f"Erro ao escrever arquivo: {e}")
+                for index in indexes:
+                    if results[index]["success"]:
+                        results[index] = result(index, [str(e)])
+                return {
+                    "file_path": file_path, "fix_ids": [], "content_hash": None,
+                    "success": False, "errors": [str(e)]
+                }
+            logger.info(f"{len(reverted)} correções revertidas em {file_path}")
+        
+        return {
+            "file_path": file_path,
+            "fix_ids": reverted,
+            "content_hash": content_hash(content),
+            "success": len(reverted) == len(indexes),
+            "errors": [error for index in indexes for error in results[index]["errors"]]
+        }
+    
+    def list_backups(
+        self,
+        file_path: Optional[str] = None,
+        fix_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0
+    ) -> Dict:
+        """
+        Lista backups a partir do manifesto do store (sem percorrer o disco).
+        
+        Args:
+            file_path: Caminho relativo do arquivo
+            fix_id: Correção que gerou o backup
+            since: Criados a partir de
+            until: Criados antes de
+            limit: Tamanho da página
+            offset: Backups a pular
+        
+        Returns:
+            {"backups": List[Dict], "total": int, "limit": int, "offset": int}
+        """
+        filters = {
+            "file_path": file_path,
+            "fix_id": fix_id,
+            "since": since.timestamp() if since else None,
+            "until": until.timestamp() if until else None
+        }
+        entries = self.backup_store.list_entries(limit=limit, offset=offset, **filters)
+        return {
+            "backups": [
+                {
+                    "backup_path": entry["backup_path"],
+                    "relative_path": entry["file_path"],
+                    "fix_id": entry["fix_id"],
+                    "timestamp": datetime.fromtimestamp(entry["created_at"]).strftime(
+                        "%Y-%m-%d-%H-%M-%S"
+                    ),
+                    "size": entry["size"],
+                    "created_at": datetime.fromtimestamp(entry["created_at"]).isoformat()
+                }
+                for entry in entries
+            ],
+            "total": self.backup_store.count_entries(**filters),
+            "limit": limit,
+            "offset": offset
+        }
@@ -0,0 +1,230 @@
+"""
+Reverse Patch
+
+Patch reverso mínimo de uma correção: trechos (hunks) com o texto escrito
+pela correção, o texto original e um pouco de contexto ao redor. Reverter
+aplica os hunks sobre o conteúdo atual do arquivo localizando cada trecho
+pelo contexto (com tolerância a deslocamentos e a contexto alterado), de
+modo que correções possam ser desfeitas em qualquer ordem sem cópias do
+arquivo inteiro.
+"""
+
+import bisect
+import difflib
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Caracteres de contexto guardados antes e depois de cada trecho
+CONTEXT_CHARS = 48
+
+# Ocorrências examinadas por nível de contexto ao procurar um trecho
+MAX_CANDIDATES = 1000
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+def _trim(old: str, new: str) -> Tuple[int, str, str]:
+    """Remove prefixo e sufixo comuns; retorna (tamanho do prefixo, old, new)."""
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[len(old) - 1 - suffix] == new[len(new) - 1 - suffix]:
+        suffix += 1
+    return prefix, old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+
+
+def make_reverse_hunks(
+    before: str,
+    after: str,
+    offset: int = 0,
+    text_before: str = "",
+    text_after: str = "",
+    selector: Optional[str] = None
+) -> List[Dict]:
+    """
+    Hunks que levam o trecho after (escrito pela correção) de volta a before.
+    
+    Args:
+        before: Trecho antes da correção
+        after: Trecho depois da correção
+        offset: Posição de after no arquivo escrito
+        text_before: Texto do arquivo imediatamente antes de after (contexto)
+        text_after: Texto do arquivo imediatamente depois de after (contexto)
+        selector: Seletor da regra editada (a reversão só vale dentro dela)
+    
+    Returns:
+        [{"offset", "old", "new", "context_before", "context_after", "selector"}],
+        com offset no arquivo escrito e old = texto atual a substituir por new
+    """
+    before_lines = before.splitlines(keepends=True)
+    after_lines = after.splitlines(keepends=True)
+    after_starts = [0]
+    for line in after_lines:
+        after_starts.append(after_starts[-1] + len(line))
+    
+    hunks = []
+    matcher = difflib.SequenceMatcher(None, after_lines, before_lines, autojunk=False)
+    for tag, a1, a2, b1, b2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        prefix, old, new = _trim(''.join(after_lines[a1:a2]), ''.join(before_lines[b1:b2]))
+        start = after_starts[a1] + prefix
+        end = start + len(old)
+        hunks.append({
+            "offset": offset + start,
+            "old": old,
+            "new": new,
+            "context_before": (text_before[-CONTEXT_CHARS:] + after[:start])[-CONTEXT_CHARS:],
+            "context_after": (after[end:] + text_after[:CONTEXT_CHARS])[:CONTEXT_CHARS],
+            "selector": selector
+        })
+    return hunks
+
+
+def add_line_numbers(hunks: List[Dict], content: str) -> List[Dict]:
+    """Preenche "line" (linha do trecho no conteúdo escrito) em cada hunk."""
+    line_starts = [0]
+    position = content.find('\n')
+    while position >= 0:
+        line_starts.append(position + 1)
+        position = content.find('\n', position + 1)
+    for hunk in hunks:
+        hunk["line"] = bisect.bisect_right(line_starts, hunk["offset"])
+    return hunks
+
+
+def _occurrences(content: str, needle: str) -> List[int]:
+    positions = []
+    position = content.find(needle)
+    while position >= 0 and len(positions) < MAX_CANDIDATES:
+        positions.append(position)
+        position = content.find(needle, position + 1)
+    return positions
+
+
+def _normalize_selector(selector: str) -> str:
+    return ' '.join(_COMMENT.sub(' ', selector).split())
+
+
+def _enclosing_selector(content: str, position: int) -> Optional[str]:
+    """Seletor da regra cujo bloco contém position (None fora de blocos)."""
+    brace = content.rfind('{', 0, position)
+    if brace < 0 or content.rfind('}', 0, position) > brace:
+        return None
+    start = max(content.rfind(char, 0, brace) for char in '{};') + 1
+    return _normalize_selector(content[start:brace])
+
+
+def _minimal_context(hunk: Dict) -> Tuple[int, int]:
+    """
+    Contexto mínimo (caracteres antes, depois) de um hunk: a declaração
+    inteira em que o trecho está. Antes, até o fim da declaração anterior
+    (ou a chave de abertura); depois, até o ";" ou "}" que fecha a
+    declaração, exceto quando o trecho já é formado por declarações inteiras.
+    """
+    context_before = hunk.get("context_before", "")
+    context_after = hunk.get("context_after", "")
+    boundary = max(context_before.rfind(char) for char in '{};')
+    # Sem o início da declaração no contexto: exigir o contexto inteiro
+    before = len(context_before) - boundary - 1 if boundary >= 0 else len(context_before)
+    
+    whole = not context_before[len(context_before) - before:].strip() and all(
+        not text.strip() or text.rstrip().endswith((';', '}'))
+        for text in (hunk["old"], hunk["new"])
+    )
+    if whole:
+        after = len(context_after) - len(context_after.lstrip(' \t'))
+    else:
+        ends = [index for index in (context_after.find(';'), context_after.find('}')) if index >= 0]
+        after = min(ends) + 1 if ends else len(context_after)
+    return before, after
+
+
+def locate_hunk(content: str, hunk: Dict) -> Optional[int]:
+    """
+    Posição atual do trecho old do hunk (ou None).
+    
+    Procura old com o contexto completo e depois com contextos menores,
+    escolhendo a ocorrência mais próxima da posição registrada. O contexto
+    nunca fica menor que a declaração do trecho (ver _minimal_context), e a
+    ocorrência precisa estar dentro de uma regra com o seletor registrado:
+    se a declaração mudou depois da correção, o trecho não é encontrado em
+    vez de ser aplicado em outra regra.
+    """
+    old = hunk["old"]
+    context_before = hunk.get("context_before", "")
+    context_after = hunk.get("context_after", "")
+    hint = hunk.get("offset", 0)
+    selector = hunk.get("selector")
+    target = _normalize_selector(selector) if selector else None
+    
+    def in_rule(position: int) -> bool:
+        return target is None or _enclosing_selector(content, position) == target
+    
+    min_before, min_after = _minimal_context(hunk)
+    if target is None:
+        # Patches sem seletor: só o contexto completo identifica a regra
+        min_before, min_after = len(context_before), len(context_after)
+    
+    size = max(len(context_before), len(context_after))
+    while True:
+        before = context_before[len(context_before) - max(min(size, len(context_before)), min_before):]
+        after = context_after[:max(size, min_after)]
+        needle = before + old + after
+        if needle:
+            candidates = [
+                position + len(before)
+                for position in _occurrences(content, needle)
+                if in_rule(position + len(before))
+            ]
+            if candidates:
+                return min(candidates, key=lambda position: abs(position - hint))
+        if size <= 0 or (len(before) <= min_before and len(after) <= min_after):
+            return None
+        size //= 2
+
+
+def revert_hunks(content: str, hunks: List[Dict]) -> Tuple[str, List[str]]:
+    """
+    Aplica os hunks reversos de uma correção sobre o conteúdo atual.
+    
+    Tudo ou nada: se algum trecho não for localizado (ou se sobrepuser a
+    outro), o conteúdo volta inalterado com os erros.
+    
+    Returns:
+        (conteúdo revertido, erros)
+    """
+    splices = []
+    errors = []
+    for hunk in hunks:
+        position = locate_hunk(content, hunk)
+        if position is None:
+            errors.append(
+                f"Trecho da linha {hunk.get('line', '?')} não encontrado "
+                f"(alterado depois da correção): {hunk['old'].strip()[:60]!r}"
+            )
+            continue
+        splices.append((position, position + len(hunk["old"]), hunk["new"]))
+    
+    if errors:
+        return content, errors
+    
+    splices.sort()
+    for (_, previous_end, _), (start, _, _) in zip(splices, splices[1:]):
+        if start < previous_end:
+            return content, ["Trechos do patch reverso se sobrepõem no conteúdo atual"]
+    
+    parts = []
+    position = 0
+    for start, end, text in splices:
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return "".join(parts), []
@@ -0,0 +1,228 @@
+"""
+CSS Selector Index
+
+Índice persistente (em memória, por projeto) da estrutura dos arquivos CSS,
+atualizado arquivo a arquivo apenas quando mtime/tamanho ou conteúdo mudam.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+
+from ...config.project_config import ProjectConfig
+from ..cpu_pool import cpu_pool
+from .selector_tokens import SelectorTokenIndex
+
+logger = logging.getLogger(__name__)
+
+
+class _IndexedFile:
+    """Estado de um arquivo indexado."""
+    
+    __slots__ = ('mtime_ns', 'size', 'content_hash', 'info')
+    
+    def __init__(self, mtime_ns: int, size: int, content_hash: str, info: Dict):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.content_hash = content_hash
+        self.info = info
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CSSSelectorIndex:
+    """
+    Estrutura dos arquivos CSS de um projeto, mantida entre consultas.
+    
+    A cada refresh os arquivos são listados e verificados por stat; só os
+    que mudaram de mtime/tamanho são relidos, e só os que mudaram de
+    conteúdo (hash) são parseados de novo. Refreshes dentro de
+    refresh_interval segundos reutilizam o estado atual; escritas feitas
+    pelo próprio serviço devem chamar invalidate().
+    
+    Junto da estrutura é mantido um índice invertido de tokens dos seletores
+    (SelectorTokenIndex), atualizado só para os arquivos reparseados.
+    """
+    
+    def __init__(self, project_config: ProjectConfig, refresh_interval: float = 1.0):
+        self.project_config = project_config
+        self.refresh_interval = refresh_interval
+        self._files: Dict[str, _IndexedFile] = {}
+        self._structure: Dict[str, Dict] = {}
+        self._tokens = SelectorTokenIndex()
+        self._last_refresh: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats = {'refreshes': 0, 'parsed': 0, 'unchanged': 0, 'rehashed': 0}
+    
+    def structure(self) -> Dict[str, Dict]:
+        """Estrutura atual: {caminho relativo: {file_path, relative_path, selectors, ...}}."""
+        if self._needs_refresh():
+            self.refresh()
+        return self._structure
+    
+    async def structure_async(self) -> Dict[str, Dict]:
+        """Mesmo que structure(), com o parse dos arquivos alterados no pool de processos."""
+        if self._needs_refresh():
+            await self.refresh_async()
+        return self._structure
+    
+    def candidates(self, selector: str) -> Optional[Dict[str, Set[int]]]:
+        """
+        Seletores candidatos a casar com o alvo: {caminho relativo: {índices em "selectors"}}.
+        
+        None quando o alvo não pode ser resolvido pelo índice (busca completa).
+        """
+        with self._lock:
+            return self._tokens.candidates(selector)
+    
+    def invalidate(self, relative_path: Optional[str] = None):
+        """Força a verificação de um arquivo (ou de todos) no próximo acesso."""
+        with self._lock:
+            if relative_path is None:
+                targets = self._files.values()
+            else:
+                targets = [self._files.get(str(relative_path))]
+            for indexed in targets:
+                if indexed is not None:
+                    # Releitura com comparação de hash (o stat pode não mudar, ex: shutil.copy2)
+                    indexed.mtime_ns = -1
+            self._last_refresh = None
+    
+    def refresh(self):
+        """Atualiza o índice parseando os arquivos alterados."""
+        from .source_analyzer import analyze_css_content
+        
+        pending, current = self._scan()
+        parsed = []
+        for entry in pending:
+            try:
+                parsed.append((entry, analyze_css_content(entry[3])))
+            except Exception as e:
+                logger.error(f"Erro ao analisar {entry[0]}: {e}")
+        self._commit(current, parsed)
+    
+    async def refresh_async(self):
+        """Atualiza o índice parseando os arquivos alterados no pool de processos."""
+        from .source_analyzer import analyze_css_content
+        
+        pending, current = await asyncio.to_thread(self._scan)
+        results = await asyncio.gather(
+            *[cpu_pool.run(analyze_css_content, entry[3], size=len(entry[3])) for entry in pending],
+            return_exceptions=True
+        )
+        
+        parsed = []
+        for entry, file_analysis in zip(pending, results):
+            if isinstance(file_analysis, Exception):
+                logger.error(f"Erro ao analisar {entry[0]}: {file_analysis}")
+                continue
+            parsed.append((entry, file_analysis))
+        self._commit(current, parsed)
+    
+    def _needs_refresh(self) -> bool:
+        if self._last_refresh is None:
+            return True
+        return time.monotonic() - self._last_refresh >= self.refresh_interval
+    
+    def _scan(
+        self
+    ) -> Tuple[List[Tuple[str, Path, os.stat_result, str, str]], Dict[str, _IndexedFile]]:
+        """
+        Verifica os arquivos do projeto.
+        
+        Returns:
+            Tupla (arquivos a parsear: [(caminho relativo, caminho, stat, conteúdo, hash)],
+            arquivos inalterados: {caminho relativo: _IndexedFile})
+        """
+        pending = []
+        current: Dict[str, _IndexedFile] = {}
+        
+        for css_file in self.project_config.get_css_files():
+            relative_path = str(css_file.relative_to(self.project_config.root_path))
+            try:
+                stat = css_file.stat()
+            except OSError as e:
+                logger.error(f"Erro ao analisar {css_file}: {e}")
+                continue
+            
+            indexed = self._files.get(relative_path)
+            if indexed and indexed.mtime_ns == stat.st_mtime_ns and indexed.size == stat.st_size:
+                current[relative_path] = indexed
+                self._stats['unchanged'] += 1
+                continue
+            
+            try:
+                content = css_file.read_text(encoding='utf-8')
+            except Exception as e:
+                logger.error(f"Erro ao analisar {css_file}: {e}")
+                continue
+            
+            content_hash = _content_hash(content)
+            if indexed and indexed.content_hash == content_hash:
+                # Só o stat mudou (ex: touch): manter a análise
+                current[relative_path] = _IndexedFile(
+                    stat.st_mtime_ns, stat.st_size, indexed.content_hash, indexed.info
+                )
+                self._stats['rehashed'] += 1
+                continue
+            
+            pending.append((relative_path, css_file, stat, content, content_hash))
+        
+        return pending, current
+    
+    def _commit(self, current: Dict[str, _IndexedFile], parsed: List[Tuple[Tuple, Dict]]):
+        for (relative_path, css_file, stat, _, content_hash), file_analysis in parsed:
+            info = {
+                "file_path": str(css_file),
+                "relative_path": relative_path,
+                **file_analysis
+            }
+            current[relative_path] = _IndexedFile(
+                stat.st_mtime_ns, stat.st_size, content_hash, info
+            )
+        
+        with self._lock:
+            for relative_path in self._files.keys() - current.keys():
+                self._tokens.remove_file(relative_path)
+            for (relative_path, *_), _ in parsed:
+                selectors = current[relative_path].info.get("selectors", [])
+                self._tokens.add_file(relative_path, selectors)
+            self._files = current
+            self._structure = {
+                relative_path: indexed.info for relative_path, indexed in current.items()
+            }
+            self._last_refresh = time.monotonic()
+            self._stats['refreshes'] += 1
+            self._stats['parsed'] += len(parsed)
+        
+        if parsed:
+            logger.debug(
+                f"Índice de seletores de {self.project_config.project_id}: "
+                f"{len(parsed)} arquivos reparseados"
+            )
+    
+    def stats(self) -> Dict:
+        """Contadores do índice."""
+        return {**self._stats, 'files': len(self._files), 'tokens': len(self._tokens)}
+
+
+# Índices compartilhados por projeto (sobrevivem às instâncias de SourceAnalyzer)
+_indexes: Dict[Tuple[str, str], CSSSelectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_selector_index(project_config: ProjectConfig) -> CSSSelectorIndex:
+    """Índice de seletores do projeto (criado no primeiro acesso)."""
+    key = (project_config.project_id, str(project_config.root_path))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.project_config.css_paths != project_config.css_paths:
+            index = _indexes[key] = CSSSelectorIndex(project_config)
+        return index
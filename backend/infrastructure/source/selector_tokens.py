@@ -0,0 +1,119 @@
+"""
+Selector Token Index
+
+Índice invertido dos seletores dos arquivos CSS: de tokens (seletor exato,
+classe e trigramas do texto) para as ocorrências de seletores por arquivo.
+"""
+
+import logging
+import re
+from typing import List, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Mesma extração de classes de SourceAnalyzer._selector_matches
+CLASS_PATTERN = re.compile(r'\.([a-zA-Z0-9_-]+)')
+
+TRIGRAM = 3
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+def selector_tokens(selector: str) -> Set[str]:
+    """
+    Tokens indexados de um seletor do arquivo.
+    
+    Só os tokens usados por candidates: ids, tags e atributos não restringem
+    a busca, já que o alvo casa por substring ("#x" casa com "#xy").
+    """
+    selector = selector.strip()
+    tokens = {f"exact:{selector}"}
+    tokens.update(f"class:{name}" for name in CLASS_PATTERN.findall(selector))
+    tokens.update(f"tri:{trigram}" for trigram in _trigrams(selector))
+    return tokens
+
+
+class SelectorTokenIndex:
+    """
+    Posting lists {token: {arquivo: [índices de seletores]}}.
+    
+    Os índices apontam para a lista "selectors" do arquivo na estrutura do
+    SourceAnalyzer (com linha e offsets do bloco). Arquivos são adicionados
+    e removidos individualmente, acompanhando o CSSSelectorIndex.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._file_tokens: Dict[str, Set[str]] = {}
+    
+    def add_file(self, relative_path: str, selectors: List[Dict]):
+        """Indexa (ou reindexa) os seletores de um arquivo."""
+        self.remove_file(relative_path)
+        file_tokens: Set[str] = set()
+        
+        for position, selector_info in enumerate(selectors):
+            for token in selector_tokens(selector_info["selector"]):
+                self._postings.setdefault(token, {}).setdefault(relative_path, []).append(position)
+                file_tokens.add(token)
+        
+        self._file_tokens[relative_path] = file_tokens
+    
+    def remove_file(self, relative_path: str):
+        """Remove as ocorrências de um arquivo."""
+        for token in self._file_tokens.pop(relative_path, ()):
+            files = self._postings.get(token)
+            if files is None:
+                continue
+            files.pop(relative_path, None)
+            if not files:
+                del self._postings[token]
+    
+    def lookup(self, token: str) -> Dict[str, List[int]]:
+        """Ocorrências de um token: {arquivo: [índices]}."""
+        return self._postings.get(token, {})
+    
+    def candidates(self, target_selector: str) -> Optional[Dict[str, Set[int]]]:
+        """
+        Seletores que podem casar com o alvo (semântica de _selector_matches).
+        
+        União de: seletor exato, seletores que contêm o alvo (interseção dos
+        trigramas; requer verificação do texto) e seletores com alguma classe
+        do alvo. Retorna None quando o alvo é curto demais para trigramas e
+        a busca precisa percorrer todos os seletores.
+        """
+        target = target_selector.strip()
+        if len(target) < TRIGRAM:
+            return None
+        
+        found: Dict[str, Set[int]] = {}
+        
+        def add(files: Dict[str, List[int]]):
+            for relative_path, positions in files.items():
+                found.setdefault(relative_path, set()).update(positions)
+        
+        add(self.lookup(f"exact:{target}"))
+        
+        # Substring: arquivos e seletores presentes em todos os trigramas
+        posting_lists = sorted(
+            (self.lookup(f"tri:{trigram}") for trigram in _trigrams(target)),
+            key=len
+        )
+        if posting_lists and posting_lists[0]:
+            for relative_path, positions in posting_lists[0].items():
+                common = set(positions)
+                for files in posting_lists[1:]:
+                    common.intersection_update(files.get(relative_path, ()))
+                    if not common:
+                        break
+                if common:
+                    found.setdefault(relative_path, set()).update(common)
+        
+        for class_name in set(CLASS_PATTERN.findall(target)):
+            add(self.lookup(f"class:{class_name}"))
+        
+        return found
+    
+    def __len__(self) -> int:
+        return len(self._postings)
@@ -5,11 +5,12 @@ Analisa estrutura de arquivos do projeto alvo.
 """
 
 import logging
-from pathlib import Path
 from typing import List, Dict, Optional, Set
 import re
 
 from ...config.project_config import ProjectConfig
+from .css_parser import CSSStylesheet, parse_css, import_target
+from .selector_index import get_selector_index
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +20,11 @@ class SourceAnalyzer:
     
     def __init__(self, project_config: ProjectConfig):
         self.project_config = project_config
+        # Índice compartilhado por todas as instâncias do mesmo projeto
+        self.selector_index = get_selector_index(project_config)
         logger.info(f"SourceAnalyzer inicializado para projeto: {project_config.project_id}")
     
-    def analyze_css_structure(self) -> Dict[str, List[Dict]]:
+    def analyze_css_structure(self) -> Dict[str, Dict]:
         """
         Analisa estrutura de arquivos CSS.
         
@@ -33,104 +36,67 @@ class SourceAnalyzer:
                 "imports": List[str],
                 "variables": List[str]
             }
-        """
-        css_files = self.project_config.get_css_files()
-        structure = {}
-        
-        for css_file in css_files:
-            try:
-                content = css_file.read_text(encoding='utf-8')
-                selectors = self._extract_selectors(content, css_file)
-                imports = self._extract_imports(content)
-                variables = self._extract_css_variables(content)
-                
-                structure[str(css_file.relative_to(self.project_config.root_path))] = {
-                    "file_path": str(css_file),
-                    "relative_path": str(css_file.relative_to(self.project_config.root_path)),
-                    "selectors": selectors,
-                    "imports": imports,
-                    "variables": variables,
-                    "line_count": len(content.splitlines())
-                }
-            except Exception as e:
-                logger.error(f"Erro ao analisar {css_file}: {e}")
-                continue
         
-        return structure
+        O resultado vem do índice do projeto (reparseando apenas arquivos
+        alterados) e é compartilhado: não deve ser modificado.
+        """
+        return self.selector_index.structure()
+    
+    async def analyze_css_structure_async(self) -> Dict[str, Dict]:
+        """
+        Mesmo resultado de analyze_css_structure, com o parse de arquivos
+        alterados feito no pool de processos (em paralelo).
+        """
+        return await self.selector_index.structure_async()
     
-    def _extract_selectors(self, content: str, file_path: Path) -> List[Dict]:
-        """Extrai seletores CSS do conteúdo."""
+    @staticmethod
+    def _extract_selectors(content: str, stylesheet: Optional[CSSStylesheet] = None) -> List[Dict]:
+        """Extrai seletores CSS do conteúdo (regras de estilo, inclusive dentro de at-rules)."""
+        stylesheet = stylesheet or parse_css(content)
         selectors = []
-        lines = content.splitlines()
         
-        # Regex para seletores CSS (simplificado)
-        selector_pattern = re.compile(r'^([^{]+)\s*\{', re.MULTILINE)
-        
-        for match in selector_pattern.finditer(content):
-            selector_text = match.group(1).strip()
-            # Remover comentários
-            selector_text = re.sub(r'/\*.*?\*/', '', selector_text, flags=re.DOTALL).strip()
-            
-            if not selector_text or selector_text.startswith('@'):
+        for rule in stylesheet.rules():
+            if not rule.selector:
                 continue
-            
-            # Calcular linha
-            line_number = content[:match.start()].count('\n') + 1
-            
-            # Extrair propriedades dentro do bloco
-            start_pos = match.end()
-            brace_count = 1
-            end_pos = start_pos
-            
-            while end_pos < len(content) and brace_count > 0:
-                if content[end_pos] == '{':
-                    brace_count += 1
-                elif content[end_pos] == '}':
-                    brace_count -= 1
-                end_pos += 1
-            
-            block_content = content[start_pos:end_pos-1]
-            properties = self._extract_properties(block_content)
-            
             selectors.append({
-                "selector": selector_text,
-                "line": line_number,
-                "properties": properties,
-                "block_start": start_pos,
-                "block_end": end_pos - 1
+                "selector": rule.selector,
+                "line": stylesheet.line_of(rule.start),
+                "properties": [declaration.name for declaration in rule.declarations],
+                "block_start": rule.block_start,
+                "block_end": rule.block_end,
+                "at_rules": [
+                    f"@{at_rule.name} {at_rule.prelude}".strip() for at_rule in rule.at_rules()
+                ]
             })
         
         return selectors
     
-    def _extract_properties(self, block_content: str) -> List[str]:
-        """Extrai propriedades CSS de um bloco."""
-        properties = []
-        # Regex para propriedades CSS
-        prop_pattern = re.compile(r'([a-zA-Z-]+)\s*:\s*([^;]+);')
-        
-        for match in prop_pattern.finditer(block_content):
-            prop_name = match.group(1).strip()
-            properties.append(prop_name)
-        
-        return properties
-    
-    def _extract_imports(self, content: str) -> List[str]:
+    @staticmethod
+    def _extract_imports(content: str, stylesheet: Optional[CSSStylesheet] = None) -> List[str]:
         """Extrai imports CSS."""
+        stylesheet = stylesheet or parse_css(content)
         imports = []
-        import_pattern = re.compile(r'@import\s+["\']([^"\']+)["\']', re.IGNORECASE)
         
-        for match in import_pattern.finditer(content):
-            imports.append(match.group(1))
+        for at_rule in stylesheet.at_rules('import'):
+            target = import_target(at_rule)
+            if target:
+                imports.append(target)
         
         return imports
     
-    def _extract_css_variables(self, content: str) -> List[str]:
+    @staticmethod
+    def _extract_css_variables(
+        content: str,
+        stylesheet: Optional[CSSStylesheet] = None
+    ) -> List[str]:
         """Extrai variáveis CSS (custom properties)."""
+        stylesheet = stylesheet or parse_css(content)
         variables = []
-        var_pattern = re.compile(r'--([a-zA-Z0-9-]+)\s*:', re.IGNORECASE)
         
-        for match in var_pattern.finditer(content):
-            variables.append(f"--{match.group(1)}")
+        for node in stylesheet.walk():
+            for declaration in node.declarations:
+                if declaration.name.startswith('--'):
+                    variables.append(declaration.name)
         
         return variables
     
@@ -145,13 +111,42 @@ class SourceAnalyzer:
             Lista de ocorrências: [{file_path, line, selector_info}]
         """
         structure = self.analyze_css_structure()
+        candidates = self.selector_index.candidates(selector)
+        return self._find_selector_in_structure(structure, selector, candidates)
+    
+    async def find_selector_in_files_async(self, selector: str) -> List[Dict]:
+        """Versão assíncrona de find_selector_in_files (parse no pool de processos)."""
+        structure = await self.analyze_css_structure_async()
+        candidates = self.selector_index.candidates(selector)
+        return self._find_selector_in_structure(structure, selector, candidates)
+    
+    def _find_selector_in_structure(
+        self,
+        structure: Dict,
+        selector: str,
+        candidates: Optional[Dict[str, Set[int]]] = None
+    ) -> List[Dict]:
+        """
+        Ocorrências do seletor na estrutura, na ordem dos arquivos e seletores.
+        
+        Com candidates (do índice de tokens) só os seletores candidatos são
+        verificados; sem eles, todos os seletores são percorridos.
+        """
         matches = []
         
         # Normalizar seletor (remover espaços extras)
         selector = selector.strip()
         
         for file_path, file_info in structure.items():
-            for sel_info in file_info["selectors"]:
+            selectors = file_info["selectors"]
+            if candidates is None:
+                positions = range(len(selectors))
+            else:
+                # Estrutura e índice podem ser de refreshes diferentes: descartar posições inválidas
+                positions = sorted(p for p in candidates.get(file_path, ()) if p < len(selectors))
+            
+            for position in positions:
+                sel_info = selectors[position]
                 # Verificar se seletor corresponde (exato ou parcial)
                 if self._selector_matches(sel_info["selector"], selector):
                     matches.append({
@@ -201,3 +196,18 @@ class SourceAnalyzer:
             logger.error(f"Erro ao ler arquivo {relative_path}: {e}")
             return None
 
+
+def analyze_css_content(content: str) -> Dict:
+    """
+    Analisa o conteúdo de um arquivo CSS.
+    
+    Função de nível de módulo para poder rodar no pool de processos. O
+    conteúdo é parseado uma única vez para seletores, imports e variáveis.
+    """
+    stylesheet = parse_css(content)
+    return {
+        "selectors": SourceAnalyzer._extract_selectors(content, stylesheet),
+        "imports": SourceAnalyzer._extract_imports(content, stylesheet),
+        "variables": SourceAnalyzer._extract_css_variables(content, stylesheet),
+        "line_count": len(content.splitlines())
+    }
@@ -3,5 +3,6 @@ Storage Infrastructure
 """
 
 from .fix_repository import FixRepository
+from .fix_index import SimilarFixIndex
 
-__all__ = ['FixRepository']
+__all__ = ['FixRepository', 'SimilarFixIndex']
@@ -0,0 +1,223 @@
+"""
+Similar Fix Index - Infrastructure Layer
+
+Índice em memória para recuperar correções históricas similares a um problema.
+"""
+
+import logging
+import math
+import re
+import zlib
+from typing import List, Dict, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tokens de seletor: "#id", ".classe", "tag", "[atributo"
+_SELECTOR_TOKEN_PATTERN = re.compile(r'[#.\[]?[a-zA-Z_][\w-]*')
+_TAG_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9]*')
+
+# Só correções que chegaram ao código servem de exemplo para a IA
+INDEXED_STATUSES = ('applied', 'validated')
+
+# Pesos relativos de cada família de features
+_FEATURE_WEIGHTS = {
+    'type': 3.0,
+    'tag': 1.5,
+    'sel': 1.0,
+    'part': 0.5,
+    'det': 1.0,
+}
+
+
+class SimilarFixIndex:
+    """
+    Índice de correções históricas baseado em vetores de features com hashing.
+    
+    Cada correção vira um vetor normalizado (tipo do problema, tokens do seletor,
+    tag e faixas dos detalhes); a busca é um top-k por similaridade de cosseno.
+    Apenas correções com status em INDEXED_STATUSES ficam no índice.
+    """
+    
+    def __init__(self, dimensions: int = 256, initial_capacity: int = 64):
+        self.dimensions = dimensions
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, fix_id: str) -> bool:
+        return fix_id in self._rows
+    
+    def add(self, fix: Dict[str, Any]):
+        """Adiciona (ou substitui) uma correção no índice; as de outros status saem dele."""
+        fix_id = fix.get('id')
+        if not fix_id:
+            return
+        
+        if fix.get('status') not in INDEXED_STATUSES:
+            self.remove(fix_id)
+            return
+        
+        issue = dict(fix.get('issue') or {})
+        issue.setdefault('type', fix.get('issue_type'))
+        issue.setdefault('element', fix.get('target_element'))
+        
+        vector = self._vectorize(issue)
+        entry = {
+            'id': fix_id,
+            'issue_type': fix.get('issue_type') or issue.get('type'),
+            'target_element': fix.get('target_element'),
+            'target_selector': fix.get('target_selector'),
+            'changes': fix.get('changes', []),
+            'confidence': fix.get('confidence'),
+            'generated_by': fix.get('generated_by'),
+            'status': fix['status'],
+        }
+        
+        row = self._rows.get(fix_id)
+        if row is None:
+            row = len(self._entries)
+            self._ensure_capacity(row + 1)
+            self._entries.append(entry)
+            self._rows[fix_id] = row
+        else:
+            self._entries[row] = entry
+        
+        self._matrix[row] = vector
+    
+    def remove(self, fix_id: str):
+        """Remove uma correção do índice (troca com a última linha)."""
+        row = self._rows.pop(fix_id, None)
+        if row is None:
+            return
+        
+        last = len(self._entries) - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._entries[row] = self._entries[last]
+            self._rows[self._entries[row]['id']] = row
+        
+        self._matrix[last] = 0.0
+        self._entries.pop()
+    
+    def update_status(self, fix_id: str, status: str):
+        """Atualiza status de uma correção indexada (removida se o status não é indexado)."""
+        if status not in INDEXED_STATUSES:
+            self.remove(fix_id)
+            return
+        row = self._rows.get(fix_id)
+        if row is not None:
+            self._entries[row]['status'] = status
+    
+    def search(
+        self,
+        issue: Dict[str, Any],
+        k: int = 5,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Retorna as k correções mais similares ao problema.
+        
+        Returns:
+            Lista de correções (resumidas) com campo "similarity", da mais similar
+            para a menos similar
+        """
+        count = len(self._entries)
+        if count == 0 or k <= 0:
+            return []
+        
+        query = self._vectorize(issue)
+        scores = self._matrix[:count] @ query
+        
+        if k < count:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        
+        results = []
+        for row in top:
+            score = float(scores[row])
+            if score <= min_score:
+                break
+            results.append({**self._entries[row], 'similarity': round(score, 4)})
+        
+        return results
+    
+    def _ensure_capacity(self, size: int):
+        """Garante capacidade da matriz (crescimento geométrico)."""
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+        
+        new_capacity = max(size, capacity * 2)
+        matrix = np.zeros((new_capacity, self.dimensions), dtype=np.float32)
+        matrix[:capacity] = self._matrix
+        self._matrix = matrix
+    
+    def _vectorize(self, issue: Dict[str, Any]) -> np.ndarray:
+        """Converte um problema em vetor normalizado por feature hashing."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        
+        for family, feature in self._extract_features(issue):
+            digest = zlib.crc32(f"{family}:{feature}".encode('utf-8'))
+            sign = 1.0 if (digest // self.dimensions) & 1 else -1.0
+            vector[digest % self.dimensions] += sign * _FEATURE_WEIGHTS[family]
+        
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+    
+    def _extract_features(self, issue: Dict[str, Any]) -> List[tuple]:
+        """Extrai features (família, valor) de um problema."""
+        features = []
+        
+        issue_type = issue.get('type')
+        if issue_type:
+            features.append(('type', str(issue_type)))
+        
+        details = issue.get('details') or {}
+        if not isinstance(details, dict):
+            details = {}
+        
+        selector = issue.get('element') or details.get('selector') or ''
+        if isinstance(selector, str) and selector:
+            # Considerar apenas o último composto do seletor (o próprio elemento)
+            compounds = selector.split(',')[0].split()
+            last_compound = compounds[-1] if compounds else ''
+            tag_match = _TAG_PATTERN.match(last_compound)
+            if tag_match:
+                features.append(('tag', tag_match.group(0).lower()))
+            
+            for token in _SELECTOR_TOKEN_PATTERN.findall(selector):
+                features.append(('sel', token.lower()))
+                for part in re.split(r'[-_]', token.lstrip('#.[')):
+                    if part:
+                        features.append(('part', part.lower()))
+        
+        tag = issue.get('tag') or details.get('tag')
+        if isinstance(tag, str) and tag:
+            features.append(('tag', tag.lower()))
+        
+        for key, value in details.items():
+            if key in ('selector', 'tag') or isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                features.append(('det', f"{key}:{self._bucket(value)}"))
+            elif isinstance(value, str) and len(value) <= 32:
+                features.append(('det', f"{key}={value.lower()}"))
+        
+        return features
+    
+    @staticmethod
+    def _bucket(value: float) -> str:
+        """Agrupa valores numéricos em faixas logarítmicas."""
+        if value == 0 or not math.isfinite(value):
+            return '0'
+        sign = '-' if value < 0 else ''
+        return f"{sign}{int(math.floor(math.log2(abs(value))))}"
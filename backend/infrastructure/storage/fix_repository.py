@@ -6,10 +6,20 @@ Persistência de correções, histórico e métricas usando SQLite.
 
 import logging
 import aiosqlite
-from typing import List, Dict, Any, Optional
+from typing import Awaitable, Callable, List, Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
+from .fix_index import INDEXED_STATUSES, SimilarFixIndex
+from .html_snapshots import (
+    HTML_ISSUE_KEYS,
+    SNAPSHOT_REF_SUFFIX,
+    encode_snapshot,
+    decode_snapshot,
+    split_issue_html,
+    issue_html_refs,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +28,9 @@ class FixRepository:
     
     def __init__(self, db_path: str = "data/fixes.db"):
         self.db_path = db_path
+        self.fix_index = SimilarFixIndex()
+        self._fix_index_loaded = False
+        self._status_callbacks: List[Callable[[str, str], Awaitable[None]]] = []
         self._ensure_db_dir()
     
     def _ensure_db_dir(self):
@@ -61,6 +74,33 @@ class FixRepository:
                 )
             """)
             
+            # HTML dos problemas, comprimido e guardado uma vez por conteúdo
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS html_snapshots (
+                    hash TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            
+            # Patches reversos das correções aplicadas nos arquivos fonte
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS fix_patches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fix_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    hunks TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    reverted_at TEXT,
+                    FOREIGN KEY (fix_id) REFERENCES fixes(id)
+                )
+            """)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_fix_patches_fix ON fix_patches(fix_id, reverted_at)"
+            )
+            
             # Tabela de métricas
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS metrics (
@@ -76,12 +116,24 @@ class FixRepository:
             logger.info("Banco de dados inicializado")
     
     async def save_fix(self, fix: Dict[str, Any]) -> str:
-        """Salva uma correção."""
+        """
+        Salva uma correção.
+        
+        HTML grande do problema (html/element_html) vai para html_snapshots
+        e o problema guarda apenas a referência. Nem o contexto da IA nem o
+        preview leem esse HTML de volta; ele fica só como registro.
+        """
         import json
         
         fix_id = fix.get('id') or f"fix-{datetime.now().timestamp()}"
+        issue_data, snapshots = split_issue_html(fix.get('issue') or {})
         
         async with aiosqlite.connect(self.db_path) as db:
+            # Lock de escrita desde a consulta dos snapshots existentes: o
+            # gc_html_snapshots não remove um snapshot entre ela e o INSERT
+            await db.execute("BEGIN IMMEDIATE")
+            if snapshots:
+                await self._store_snapshots(db, snapshots)
             await db.execute("""
                 INSERT OR REPLACE INTO fixes 
                 (id, type, target_element, target_selector, changes, priority, status, 
@@ -96,7 +148,7 @@ class FixRepository:
                 fix.get('priority', 0),
                 fix.get('status', 'pending'),
                 fix.get('issue_type'),
-                json.dumps(fix.get('issue', {})),
+                json.dumps(issue_data),
                 fix.get('generated_by', 'rule'),
                 fix.get('confidence', 0.0),
                 datetime.now().isoformat(),
@@ -104,11 +156,159 @@ class FixRepository:
             ))
             await db.commit()
         
+        # Manter índice de similaridade atualizado incrementalmente
+        self.fix_index.add({**fix, 'id': fix_id})
+        
         logger.debug(f"Correção salva: {fix_id}")
         return fix_id
     
+    async def _store_snapshots(self, db: aiosqlite.Connection, snapshots: Dict[str, str]):
+        """Grava snapshots ainda inexistentes (deduplicados pelo hash)."""
+        created_at = datetime.now().isoformat()
+        placeholders = ', '.join('?' * len(snapshots))
+        async with db.execute(
+            f"SELECT hash FROM html_snapshots WHERE hash IN ({placeholders})",
+            list(snapshots)
+        ) as cursor:
+            existing = {row[0] for row in await cursor.fetchall()}
+        
+        rows = []
+        for digest, html in snapshots.items():
+            if digest in existing:
+                continue
+            codec, data = encode_snapshot(html)
+            rows.append((digest, codec, len(html), data, created_at))
+        
+        if rows:
+            await db.executemany(
+                "INSERT OR IGNORE INTO html_snapshots (hash, codec, size, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+    
+    async def _load_snapshots(self, hashes: List[str]) -> Dict[str, str]:
+        placeholders = ', '.join('?' * len(hashes))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"SELECT hash, codec, data FROM html_snapshots WHERE hash IN ({placeholders})",
+                hashes
+            ) as cursor:
+                rows = await cursor.fetchall()
+        
+        snapshots = {}
+        for digest, codec, data in rows:
+            try:
+                snapshots[digest] = decode_snapshot(codec, data)
+            except Exception as e:
+                logger.error(f"Erro ao ler snapshot {digest}: {e}")
+        return snapshots
+    
+    async def load_issue_html(self, issue: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Problema com o HTML referenciado carregado de volta.
+        
+        get_fix/list_fixes retornam o problema só com as referências. Nenhum
+        fluxo da aplicação usa o HTML gravado; serve para inspeção e testes.
+        """
+        refs = issue_html_refs(issue)
+        if not refs:
+            return issue
+        
+        snapshots = await self._load_snapshots(list(set(refs.values())))
+        ref_keys = {key + SNAPSHOT_REF_SUFFIX for key in refs}
+        loaded = {key: value for key, value in issue.items() if key not in ref_keys}
+        for key, digest in refs.items():
+            if digest in snapshots:
+                loaded[key] = snapshots[digest]
+            else:
+                logger.warning(f"Snapshot de HTML não encontrado: {digest}")
+        return loaded
+    
+    async def migrate_html_snapshots(self, batch_size: int = 500) -> int:
+        """
+        Move o HTML embutido em issue_data de correções antigas para html_snapshots.
+        
+        Returns:
+            Número de correções atualizadas
+        """
+        import json
+        
+        conditions = ' OR '.join(f"issue_data LIKE '%\"{key}\":%'" for key in HTML_ISSUE_KEYS)
+        migrated = 0
+        last_id = ''
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            while True:
+                async with db.execute(
+                    f"SELECT id, issue_data FROM fixes WHERE id > ? AND ({conditions}) "
+                    "ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ) as cursor:
+                    rows = list(await cursor.fetchall())
+                if not rows:
+                    break
+                
+                updates = []
+                for fix_id, raw_issue in rows:
+                    issue_data, snapshots = split_issue_html(json.loads(raw_issue))
+                    if snapshots:
+                        await self._store_snapshots(db, snapshots)
+                        updates.append((json.dumps(issue_data), fix_id))
+                
+                if updates:
+                    await db.executemany("UPDATE fixes SET issue_data = ? WHERE id = ?", updates)
+                await db.commit()
+                
+                migrated += len(updates)
+                last_id = rows[-1][0]
+        
+        logger.info(f"HTML de {migrated} correções movido para html_snapshots")
+        return migrated
+    
+    async def gc_html_snapshots(self) -> int:
+        """
+        Remove snapshots de HTML que nenhuma correção referencia mais.
+        
+        Leitura das referências e remoção ocorrem em uma única transação
+        com lock de escrita (BEGIN IMMEDIATE), serializada com save_fix.
+        
+        Returns:
+            Número de snapshots removidos
+        """
+        import json
+        
+        conditions = ' OR '.join(
+            f"issue_data LIKE '%\"{key}{SNAPSHOT_REF_SUFFIX}\":%'" for key in HTML_ISSUE_KEYS
+        )
+        referenced = set()
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute(f"SELECT issue_data FROM fixes WHERE {conditions}") as cursor:
+                async for (raw_issue,) in cursor:
+                    try:
+                        referenced.update(issue_html_refs(json.loads(raw_issue)).values())
+                    except (TypeError, ValueError):
+                        continue
+            
+            async with db.execute("SELECT hash FROM html_snapshots") as cursor:
+                unreferenced = [(row[0],) for row in await cursor.fetchall() if row[0] not in referenced]
+            
+            if unreferenced:
+                await db.executemany("DELETE FROM html_snapshots WHERE hash = ?", unreferenced)
+            await db.commit()
+        
+        if unreferenced:
+            logger.info(f"{len(unreferenced)} snapshots de HTML sem referência removidos")
+        return len(unreferenced)
+    
     async def get_fix(self, fix_id: str) -> Optional[Dict[str, Any]]:
-        """Obtém uma correção por ID."""
+        """
+        Obtém uma correção por ID.
+        
+        O problema vem só com as referências de HTML, que nenhum fluxo da
+        aplicação carrega de volta.
+        """
         import json
         
         async with aiosqlite.connect(self.db_path) as db:
@@ -185,6 +385,10 @@ class FixRepository:
                 
                 return fixes
     
+    def add_status_callback(self, callback: Callable[[str, str], Awaitable[None]]):
+        """Adiciona callback async chamado com (fix_id, status) após cada update_fix_status."""
+        self._status_callbacks.append(callback)
+    
     async def update_fix_status(self, fix_id: str, status: str):
         """Atualiza status de uma correção."""
         async with aiosqlite.connect(self.db_path) as db:
@@ -194,6 +398,61 @@ class FixRepository:
                 (status, applied_at, fix_id)
             )
             await db.commit()
+        
+        if status in INDEXED_STATUSES and fix_id not in self.fix_index:
+            # Correção passou a ser indexada: carregar os dados completos
+            fix = await self.get_fix(fix_id)
+            if fix:
+                self.fix_index.add(fix)
+        else:
+            self.fix_index.update_status(fix_id, status)
+        
+        for callback in self._status_callbacks:
+            try:
+                await callback(fix_id, status)
+            except Exception as e:
+                logger.error(f"Erro em callback de status da correção {fix_id}: {e}")
+    
+    async def load_fix_index(self, limit: int = 5000):
+        """
+        Carrega o índice de correções similares a partir do banco (uma única vez).
+        
+        Depois da carga inicial o índice é mantido por save_fix/update_fix_status.
+        """
+        if self._fix_index_loaded:
+            return
+        
+        import json
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT id, target_element, target_selector, changes, status, issue_type, "
+                "issue_data, generated_by, confidence FROM fixes "
+                f"WHERE status IN ({', '.join('?' * len(INDEXED_STATUSES))}) "
+                "ORDER BY created_at DESC LIMIT ?",
+                (*INDEXED_STATUSES, limit)
+            ) as cursor:
+                rows = list(await cursor.fetchall())
+        
+        # Inserir das mais antigas para as mais recentes (recentes sobrescrevem)
+        for row in reversed(rows):
+            if row['id'] in self.fix_index:
+                continue
+            self.fix_index.add({
+                'id': row['id'],
+                'target_element': row['target_element'],
+                'target_selector': row['target_selector'],
+                'changes': json.loads(row['changes']),
+                'status': row['status'],
+                'issue_type': row['issue_type'],
+                'issue': json.loads(row['issue_data']) if row['issue_data'] else {},
+                'generated_by': row['generated_by'],
+                'confidence': row['confidence']
+            })
+        
+        self._fix_index_loaded = True
+        logger.info(f"Índice de correções similares carregado: {len(self.fix_index)} correções")
     
     async def save_validation(
         self,
@@ -220,6 +479,60 @@ class FixRepository:
             ))
             await db.commit()
     
+    async def save_fix_patch(self, fix_id: str, file_path: str, hunks: List[Dict[str, Any]]) -> int:
+        """Registra o patch reverso de uma correção aplicada."""
+        import json
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("""
+                INSERT INTO fix_patches (fix_id, file_path, hunks, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (fix_id, file_path, json.dumps(hunks), datetime.now().isoformat()))
+            await db.commit()
+            return cursor.lastrowid or 0
+    
+    async def get_fix_patches(self, fix_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Patches reversos ainda não revertidos das correções, na ordem de
+        aplicação (uma correção reaplicada tem um patch por aplicação).
+        """
+        import json
+        
+        if not fix_ids:
+            return []
+        placeholders = ', '.join('?' * len(fix_ids))
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(f"""
+                SELECT * FROM fix_patches
+                WHERE fix_id IN ({placeholders}) AND reverted_at IS NULL
+                ORDER BY id
+            """, list(fix_ids)) as cursor:
+                rows = await cursor.fetchall()
+        
+        return [
+            {
+                'id': row['id'],
+                'fix_id': row['fix_id'],
+                'file_path': row['file_path'],
+                'hunks': json.loads(row['hunks']),
+                'created_at': row['created_at']
+            }
+            for row in rows
+        ]
+    
+    async def mark_fix_patches_reverted(self, patch_ids: List[int]):
+        """Marca patches reversos como já aplicados (correção desfeita)."""
+        if not patch_ids:
+            return
+        placeholders = ', '.join('?' * len(patch_ids))
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                f"UPDATE fix_patches SET reverted_at = ? WHERE id IN ({placeholders})",
+                [datetime.now().isoformat(), *patch_ids]
+            )
+            await db.commit()
+    
     async def save_metric(
         self,
         application_id: str,
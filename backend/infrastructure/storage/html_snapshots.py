@@ -0,0 +1,93 @@
+"""
+HTML Snapshots - Infrastructure Layer
+
+Armazenamento endereçado por conteúdo do HTML anexado aos problemas: o HTML
+é comprimido e guardado uma única vez (tabela html_snapshots), e o problema
+salvo com a correção passa a referenciá-lo pelo hash.
+"""
+
+import hashlib
+import logging
+import zlib
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Campos do problema com HTML bruto
+HTML_ISSUE_KEYS = ('html', 'element_html')
+
+# Sufixo do campo com a referência (ex: "html_ref")
+SNAPSHOT_REF_SUFFIX = '_ref'
+
+# HTML menor que isso continua no próprio problema
+MIN_SNAPSHOT_BYTES = 256
+
+
+def snapshot_hash(html: str) -> str:
+    """Hash do conteúdo (chave do snapshot)."""
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+def compress_bytes(raw: bytes) -> Tuple[str, bytes]:
+    """Comprime bytes com zstd (se instalado) ou zlib; retorna (codec, dados)."""
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+
+def decompress_bytes(codec: str, data: bytes) -> bytes:
+    """Descomprime dados gravados por compress_bytes."""
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Dados comprimidos com zstd, mas zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Codec desconhecido: {codec}")
+
+
+def encode_snapshot(html: str) -> Tuple[str, bytes]:
+    """Comprime o HTML; retorna (codec, dados)."""
+    return compress_bytes(html.encode('utf-8'))
+
+
+def decode_snapshot(codec: str, data: bytes) -> str:
+    """Descomprime um snapshot gravado por encode_snapshot."""
+    return decompress_bytes(codec, data).decode('utf-8')
+
+
+def split_issue_html(issue: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Separa o HTML grande do problema.
+    
+    Returns:
+        Tupla (problema com referências no lugar do HTML, {hash: html})
+    """
+    snapshots: Dict[str, str] = {}
+    stored = dict(issue)
+    
+    for key in HTML_ISSUE_KEYS:
+        html = stored.get(key)
+        if not isinstance(html, str) or len(html) < MIN_SNAPSHOT_BYTES:
+            continue
+        digest = snapshot_hash(html)
+        snapshots[digest] = html
+        del stored[key]
+        stored[key + SNAPSHOT_REF_SUFFIX] = digest
+    
+    return stored, snapshots
+
+
+def issue_html_refs(issue: Dict[str, Any]) -> Dict[str, str]:
+    """Referências de snapshot do problema: {campo de HTML: hash}."""
+    return {
+        key: issue[key + SNAPSHOT_REF_SUFFIX]
+        for key in HTML_ISSUE_KEYS
+        if isinstance(issue.get(key + SNAPSHOT_REF_SUFFIX), str)
+    }
@@ -21,6 +21,15 @@ async def main():
     
     await repository.initialize()
     
+    # Mover HTML embutido em correções antigas para html_snapshots
+    migrated = await repository.migrate_html_snapshots()
+    if migrated:
+        print(f"HTML de {migrated} correções movido para html_snapshots")
+    
+    removed = await repository.gc_html_snapshots()
+    if removed:
+        print(f"{removed} snapshots de HTML sem referência removidos")
+    
     print(f"✅ Banco de dados inicializado em: {db_path}")
 
 
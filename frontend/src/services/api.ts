@@ -56,22 +56,61 @@ export const api = {
     return response.data
   },
 
-  async applyFixToSource(fixId: string, createBackup: boolean = true) {
+  async applyFixToSource(fixId: string, createBackup: boolean = true, expectedHash?: string) {
+    // expectedHash: content_hash do preview (409 se o arquivo mudou desde então)
     const response = await apiClient.post(`/fixes/${fixId}/apply-source`, null, {
-      params: { create_backup: createBackup }
+      params: { create_backup: createBackup, expected_hash: expectedHash }
     })
     return response.data
   },
 
-  async rollbackFixSource(fixId: string, backupPath: string) {
-    const response = await apiClient.post(`/fixes/${fixId}/rollback-source`, {
-      backup_path: backupPath
+  async applyFixesToSource(
+    fixIds: string[],
+    createBackup: boolean = true,
+    expectedHashes: Record<string, string> = {}
+  ) {
+    const response = await apiClient.post('/fixes/apply-source/batch', {
+      fix_ids: fixIds,
+      create_backup: createBackup,
+      expected_hashes: expectedHashes
     })
     return response.data
   },
 
-  async listBackups() {
-    const response = await apiClient.get('/fixes/backups')
+  async rollbackFixSource(fixId: string, backupPath?: string) {
+    // Sem backupPath desfaz só a correção (patch reverso); com ele restaura o arquivo inteiro
+    const response = await apiClient.post(`/fixes/${fixId}/rollback-source`, null, {
+      params: { backup_path: backupPath }
+    })
+    return response.data
+  },
+
+  async rollbackFixesSource(fixIds: string[]) {
+    const response = await apiClient.post('/fixes/rollback-source/batch', {
+      fix_ids: fixIds
+    })
+    return response.data
+  },
+
+  async listBackups(filters: {
+    filePath?: string
+    fixId?: string
+    since?: string
+    until?: string
+    limit?: number
+    offset?: number
+  } = {}) {
+    // Paginado: { backups, total, limit, offset }
+    const response = await apiClient.get('/fixes/backups', {
+      params: {
+        file_path: filters.filePath,
+        fix_id: filters.fixId,
+        since: filters.since,
+        until: filters.until,
+        limit: filters.limit,
+        offset: filters.offset
+      }
+    })
     return response.data
   }
 }
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parser CSS
+Mede parse e localização de bloco em entradas adversariais de tamanho
+crescente e compara com a regex de blocos aninhados usada antes pelo
+CSSModifier (backtracking superlinear)
+
+Uso: python test/benchmark_css_parser.py [arquivo.css ...]
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backend.infrastructure.source.css_parser import CSSBudgetExceeded, parse_css
+from test_css_parser import ADVERSARIAL_INPUTS
+
+# Regex original de CSSModifier._modify_with_regex
+LEGACY_BLOCK_PATTERN = re.compile(
+    rf'({re.escape(".a")})\s*\{{([^}}]*(?:\{{[^}}]*\}}[^}}]*)*)\}}',
+    re.MULTILINE | re.DOTALL
+)
+
+# A regex antiga só é medida até aqui (acima disso leva minutos)
+LEGACY_MAX_SIZE = 8000
+
+
+def measure(function, repeat: int = 3) -> float:
+    """Melhor tempo de algumas execuções."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def parse(text: str):
+    try:
+        return parse_css(text).find_rules(".a")
+    except CSSBudgetExceeded:
+        return None
+
+
+def run(name: str, texts):
+    print(f"\n{name}")
+    for text in texts:
+        parser = measure(lambda: parse(text))
+        line = f"  {len(text) / 1024:8.0f}KB  parser={parser * 1000:8.1f}ms"
+        if len(text) <= LEGACY_MAX_SIZE:
+            legacy = measure(lambda: LEGACY_BLOCK_PATTERN.search(text), repeat=1)
+            line += f"  regex={legacy * 1000:10.1f}ms"
+        print(line)
+
+
+def main():
+    print("=" * 60)
+    print("Benchmark do parser CSS")
+    print("=" * 60)
+    
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            run(Path(path).name, [Path(path).read_text(encoding='utf-8')])
+        return
+    
+    for name, generate in sorted(ADVERSARIAL_INPUTS.items()):
+        run(name, [generate(size) for size in (250, 500, 1000, 2000, 16000, 128000)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark do HTMLAnalyzer
+Mede o custo de parse e de travessia da análise em páginas grandes, por backend
+
+Uso: python test/benchmark_html_analyzer.py [pagina.html ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bs4 import BeautifulSoup
+
+from backend.infrastructure.ai.html_analyzer import HTMLAnalyzer
+from backend.infrastructure.ai.html_backends import (
+    BS4Backend, HTMLParserBackend, LXMLBackend, LXML_AVAILABLE, CSSSELECT_AVAILABLE
+)
+from backend.infrastructure.ai.html_stream_analyzer import StreamingHTMLAnalyzer
+from test_html_analyzer import legacy_analyze
+
+
+def build_page(sections: int) -> str:
+    """Página sintética com navegação, formulários, cards e tabelas."""
+    parts = ['<html><head><title>Benchmark</title></head><body><nav>']
+    parts += [f'<a href="/p{i}" class="nav-link">Página {i}</a>' for i in range(50)]
+    parts.append('</nav><main>')
+    for i in range(sections):
+        parts.append(
+            f'<section id="s{i}" class="card"><h2>Seção {i}</h2>'
+            f'<p style="overflow: hidden">Texto <span>longo</span> da seção {i}.</p>'
+            f'<form><input type="text" name="q{i}" placeholder="Buscar">'
+            f'<select name="o{i}"><option>a</option><option>b</option></select>'
+            f'<button type="submit" style="width: 20px">Ir</button>'
+            f'<a href="#top" aria-label="Topo"></a></form>'
+            f'<table><tr><td>{i}</td><td><a href="/d{i}">Detalhe</a></td></tr></table>'
+            f'</section>'
+        )
+    parts.append('</main></body></html>')
+    return ''.join(parts)
+
+
+def measure(function, repeat: int = 5) -> float:
+    """Melhor tempo de algumas execuções."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(name: str, html_content: str):
+    print(f"\n{name} ({len(html_content) / 1024:.0f}KB)")
+    
+    analyzer = HTMLAnalyzer(backend=BS4Backend())
+    parse = measure(lambda: BeautifulSoup(html_content, 'html.parser'), repeat=3)
+    legacy = measure(lambda: legacy_analyze(analyzer, html_content)) - parse
+    print(f"  {'bs4 multi-pass':<18} parse={parse * 1000:8.1f}ms  travessia={legacy * 1000:8.1f}ms")
+    
+    backends: List[HTMLParserBackend] = [BS4Backend()]
+    if LXML_AVAILABLE and CSSSELECT_AVAILABLE:
+        backends.append(LXMLBackend())
+    
+    for backend in backends:
+        analyzer = HTMLAnalyzer(backend=backend)
+        root = backend.parse(html_content)
+        parse = measure(lambda: backend.parse(html_content), repeat=3)
+        walk = measure(lambda: analyzer._walk_document(root))
+        print(f"  {backend.name + ' single-pass':<18} parse={parse * 1000:8.1f}ms  travessia={walk * 1000:8.1f}ms")
+    
+    streaming = StreamingHTMLAnalyzer()
+    total = measure(lambda: streaming.analyze(html_content), repeat=3)
+    print(f"  {'streaming':<18} total={total * 1000:8.1f}ms")
+
+
+def main():
+    print("=" * 60)
+    print("Benchmark do HTMLAnalyzer")
+    print("=" * 60)
+    
+    pages = [(Path(path).name, Path(path).read_text(encoding='utf-8')) for path in sys.argv[1:]]
+    if not pages:
+        pages = [("test_page.html", (Path(__file__).parent / "test_page.html").read_text(encoding='utf-8'))]
+        pages += [(f"sintética ({sections} seções)", build_page(sections)) for sections in (200, 2000)]
+    
+    for name, html_content in pages:
+        run(name, html_content)
+
+
+if __name__ == "__main__":
+    main()
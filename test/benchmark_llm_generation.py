@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark Offline de Geração com IA
+Mede o FixGenerator contra o LLM simulado (latência, 429 e respostas malformadas)
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai.fix_generator import FixGenerator
+from backend.infrastructure.ai.html_analyzer import HTMLAnalyzer
+from backend.infrastructure.ai.llm_simulator import SimulatedLLMService
+from backend.infrastructure.ai.rate_limiter import LLMRateLimiter
+
+ISSUE_TYPES = [
+    "small_touch_target",
+    "accessibility_low_contrast",
+    "overflow",
+    "responsive_fixed_width",
+    "visual_z_index",
+]
+
+
+def build_issues(count: int):
+    """Gera problemas sintéticos."""
+    return [
+        {
+            "type": ISSUE_TYPES[i % len(ISSUE_TYPES)],
+            "message": "Problema sintético",
+            "element": f".component-{i % 17}",
+            "severity": ["high", "medium", "low"][i % 3],
+            "details": {"width": 20 + i % 30, "height": 20}
+        }
+        for i in range(count)
+    ]
+
+
+async def run_scenario(name: str, fix_generator: FixGenerator, issues, concurrency: int):
+    """Executa um cenário e imprime estatísticas."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def generate(issue):
+        async with semaphore:
+            started = time.perf_counter()
+            fix = await fix_generator.generate_fix(issue)
+            latencies.append(time.perf_counter() - started)
+            return fix
+    
+    started = time.perf_counter()
+    fixes = await asyncio.gather(*[generate(issue) for issue in issues])
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    valid = sum(1 for fix in fixes if fix)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<32} {elapsed:7.2f}s  válidas={valid}/{len(issues)}  "
+          f"p50={p50 * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms")
+
+
+async def main():
+    print("=" * 60)
+    print("Benchmark de Geração com LLM Simulado")
+    print("=" * 60)
+    
+    issues = build_issues(200)
+    html_analyzer = HTMLAnalyzer()
+    
+    simulator = SimulatedLLMService(seed=42, time_scale=0.05)
+    await run_scenario("sem falhas", FixGenerator(simulator, html_analyzer), issues, 16)
+    
+    simulator = SimulatedLLMService(seed=42, time_scale=0.05, malformed_probability=0.2)
+    await run_scenario("20% malformadas", FixGenerator(simulator, html_analyzer), issues, 16)
+    
+    # Provedor simulado com limite de requisições, com e sem rate limiter
+    simulator = SimulatedLLMService(seed=42, time_scale=0.05, requests_per_minute=120)
+    await run_scenario("limite do provedor, sem limiter", FixGenerator(simulator, html_analyzer), issues, 16)
+    
+    simulator = SimulatedLLMService(seed=42, time_scale=0.05, requests_per_minute=120)
+    limiter = LLMRateLimiter(requests_per_minute=int(120 / 0.05), max_concurrency=16)
+    await run_scenario(
+        "limite do provedor, com limiter",
+        FixGenerator(_LimitedSimulator(simulator, limiter), html_analyzer),
+        issues,
+        16
+    )
+
+
+class _LimitedSimulator(SimulatedLLMService):
+    """Simulador atrás do rate limiter compartilhado."""
+    
+    def __init__(self, simulator: SimulatedLLMService, limiter: LLMRateLimiter):
+        vars(self).update(vars(simulator))
+        self.limiter = limiter
+    
+    async def generate_streaming(self, prompt, context=None, priority=5):
+        permit = await self.limiter.acquire(500, priority)
+        started = time.monotonic()
+        try:
+            async for chunk in super().generate_streaming(prompt, context, priority):
+                yield chunk
+        except Exception as e:
+            self.limiter.release(
+                permit,
+                latency=time.monotonic() - started,
+                rate_limited=getattr(e, "status_code", None) == 429
+            )
+            raise
+        self.limiter.release(permit, latency=time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    # Falhas injetadas são esperadas; manter a saída limpa
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Testes do store de backups
+Verifica deduplicação por conteúdo, restauração byte a byte, a retenção
+por quantidade, idade e total de bytes e a listagem paginada pelo manifesto
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api.routes import fixes as fixes_routes
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source import backup_store as backup_store_module
+from backend.infrastructure.source.backup_store import BackupStore, get_backup_store
+from backend.infrastructure.source.patch_applier import PatchApplier
+from backend.infrastructure.storage.fix_repository import FixRepository
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BackupStore(tmp_path / "store")
+    data = b".a { color: red }\r\n" * 100
+    
+    first = store.save("a.css", data, ["fix-1"])
+    second = store.save("b.css", data, ["fix-2", "fix-3"])
+    
+    assert first[0]["blob_hash"] == second[0]["blob_hash"]
+    assert store.stats()["entries"] == 3 and store.stats()["blobs"] == 1
+    assert store.load(second[1]["id"]) == data
+
+
+def test_retention_by_count_age_and_bytes(tmp_path):
+    store = BackupStore(tmp_path / "store", max_per_file=2, max_age_days=1, max_bytes=None)
+    saved = [store.save("a.css", f".a {{ width: {version}px }}".encode())[0] for version in range(4)]
+    old = store.save("b.css", b".b { }")[0]
+    
+    with store._transaction() as conn:
+        conn.execute("UPDATE backups SET created_at = ? WHERE id = ?", (time.time() - 2 * 86400, old["id"]))
+    
+    result = store.gc()
+    assert result["removed_entries"] == 3
+    assert [entry["id"] for entry in store.list_entries()] == [saved[3]["id"], saved[2]["id"]]
+    assert store.load(old["id"]) is None
+    
+    store.max_bytes = 1
+    store.gc()
+    assert store.stats() == {"entries": 0, "blobs": 0, "size": 0, "stored_size": 0}
+    assert not any(path.is_file() for path in store.blobs_dir.rglob("*"))
+
+
+def test_failed_gc_keeps_blob_files(tmp_path):
+    store = BackupStore(tmp_path / "store", max_per_file=1, max_age_days=None, max_bytes=1)
+    saved = [store.save("a.css", f".a {{ width: {version}px }}".encode())[0] for version in range(3)]
+    drop_unreferenced = store._drop_unreferenced
+    calls = []
+    
+    def failing_drop(conn, dropped, digest=None):
+        calls.append(digest)
+        result = drop_unreferenced(conn, dropped, digest)
+        if digest is not None:
+            raise RuntimeError("falha no meio do GC")
+        return result
+    
+    store._drop_unreferenced = failing_drop
+    with pytest.raises(RuntimeError):
+        store.gc()
+    
+    # Blobs da primeira etapa já tinham saído do manifesto quando a transação falhou
+    assert len(calls) == 2
+    assert store.stats()["entries"] == 3
+    assert [store.load(entry["id"]) for entry in saved] == \
+        [f".a {{ width: {version}px }}".encode() for version in range(3)]
+
+
+def test_blob_saved_again_after_gc_commit_is_kept(tmp_path):
+    store = BackupStore(tmp_path / "store")
+    entry = store.save("a.css", b".a { }")[0]
+    
+    store._unlink_blobs([entry["blob_hash"]])
+    assert store.load(entry["id"]) == b".a { }"
+
+
+def test_rollback_restores_from_store(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    original = ".btn { color: red; }\n"
+    (root / "main.css").write_text(original)
+    
+    applier = PatchApplier(ProjectConfig("test-backups", str(root), ["*.css"], backup_dir=str(tmp_path / "backups")))
+    applier.backup_store.stop_gc()
+    fix = {"id": "fix-1", "target_selector": ".btn", "changes": [{"property": "color", "value": "blue"}]}
+    
+    result = applier.apply_fix(fix)
+    assert result["success"] and result["backup_path"].startswith("backup:")
+    assert "blue" in (root / "main.css").read_text()
+    
+    assert applier.rollback_fix(fix, result["backup_path"])["success"]
+    assert (root / "main.css").read_text() == original
+    assert applier.list_backups()["backups"][0]["fix_id"] == "fix-1"
+
+
+def test_listing_is_filtered_and_paginated_from_manifest(tmp_path):
+    legacy = tmp_path / "backups" / "2024-01-01-10-00-00" / "css"
+    legacy.mkdir(parents=True)
+    (legacy / "old.css").write_text(".old { }")
+    
+    store = BackupStore(tmp_path / "backups" / "store", max_per_file=None, max_age_days=None, max_bytes=None)
+    assert store.import_legacy(tmp_path / "backups") == 1
+    assert store.import_legacy(tmp_path / "backups") == 0
+    
+    for version in range(5):
+        store.save("a.css", f".a {{ width: {version}px }}".encode(), [f"fix-{version}"], created_at=1000.0 + version)
+    
+    page = store.list_entries(file_path="a.css", limit=2, offset=1)
+    assert [entry["fix_id"] for entry in page] == ["fix-3", "fix-2"]
+    assert store.count_entries(file_path="a.css") == 5
+    assert store.count_entries(since=1001.0, until=1003.0) == 2
+    assert store.list_entries(file_path="css/old.css")[0]["size"] == len(".old { }")
+
+
+def test_pinned_fixes_survive_retention(tmp_path):
+    store = BackupStore(tmp_path / "store", max_per_file=1, max_age_days=1, max_bytes=1)
+    pinned = store.save("a.css", b".a { width: 1px }", ["fix-1"], created_at=time.time() - 2 * 86400)[0]
+    loose = store.save("a.css", b".a { width: 2px }", [None], created_at=time.time() - 2 * 86400)[0]
+    store.save("a.css", b".a { width: 3px }", ["fix-3"])
+    store.pin_fixes(["fix-1", None])
+    
+    store.gc()
+    assert [entry["id"] for entry in store.list_entries()] == [pinned["id"]]
+    assert store.load(loose["id"]) is None
+    assert store.load(pinned["id"]) == b".a { width: 1px }"
+    
+    store.unpin_fixes(["fix-1"])
+    store.gc()
+    assert store.stats()["entries"] == 0
+
+
+def test_applied_fix_keeps_backup_until_rolled_back(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "main.css").write_text(".btn { color: red; }\n")
+    
+    applier = PatchApplier(ProjectConfig("test-backups-pin", str(root), ["*.css"], backup_dir=str(tmp_path / "backups")))
+    applier.backup_store.stop_gc()
+    fix = {"id": "fix-1", "target_selector": ".btn", "changes": [{"property": "color", "value": "blue"}]}
+    result = applier.apply_fix(fix)
+    
+    applier.backup_store.max_per_file = 0
+    applier.backup_store.gc()
+    assert applier.backup_store.count_entries(fix_id="fix-1") == 1
+    
+    assert applier.rollback_fix(fix, result["backup_path"])["success"]
+    applier.backup_store.gc()
+    missing = applier.rollback_fix(fix, result["backup_path"])
+    assert not missing["success"] and missing["backup_missing"]
+
+
+def test_store_factory_imports_legacy_backups_in_background(tmp_path, monkeypatch):
+    legacy = tmp_path / "backups" / "2024-01-01-10-00-00"
+    legacy.mkdir(parents=True)
+    (legacy / "old.css").write_text(".old { }")
+    release = threading.Event()
+    import_legacy = BackupStore.import_legacy
+    
+    def slow_import(store, backup_dir):
+        release.wait(2)
+        return import_legacy(store, backup_dir)
+    
+    monkeypatch.setattr(backup_store_module, "_stores", {})
+    monkeypatch.setattr(BackupStore, "import_legacy", slow_import)
+    monkeypatch.setenv("BACKUP_GC_INTERVAL", "0")
+    
+    # A factory retorna sem esperar a importação
+    store = get_backup_store(ProjectConfig("test-import", str(tmp_path), ["*.css"], backup_dir=str(tmp_path / "backups")))
+    assert store.count_entries() == 0
+    
+    release.set()
+    store.start_legacy_import(tmp_path / "backups").join()
+    assert store.count_entries(file_path="old.css") == 1
+
+
+def test_status_only_rollback_releases_pinned_backups(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "main.css").write_text(".btn { color: red; }\n")
+    project_id = f"test-release-{tmp_path.name}"
+    config = ProjectConfig(project_id, str(root), ["*.css"], backup_dir=str(tmp_path / "backups"))
+    monkeypatch.setattr(fixes_routes.project_manager, "projects", {project_id: config})
+    
+    repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+    repository.add_status_callback(fixes_routes.release_fix_backups)
+    monkeypatch.setattr(fixes_routes, "fix_repository", repository)
+    asyncio.run(repository.initialize())
+    asyncio.run(repository.save_fix({
+        "id": "fix-1",
+        "target_element": ".btn",
+        "target_selector": ".btn",
+        "changes": [{"property": "color", "value": "blue"}],
+    }))
+    
+    app = FastAPI()
+    app.include_router(fixes_routes.router)
+    client = TestClient(app)
+    assert client.post("/api/fixes/fix-1/apply-source", params={"project_id": project_id}).json()["success"]
+    
+    patch_applier = fixes_routes.get_patch_applier(project_id)
+    assert patch_applier is not None
+    store = patch_applier.backup_store
+    store.stop_gc()
+    store.max_per_file = 0
+    store.gc()
+    assert store.count_entries(fix_id="fix-1") == 1
+    
+    assert client.post("/api/fixes/fix-1/rollback").status_code == 200
+    store.gc()
+    assert store.count_entries(fix_id="fix-1") == 0
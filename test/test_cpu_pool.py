@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Testes do pool de processos para análises CPU-bound
+Verifica a execução direta de entradas pequenas e o encerramento do
+worker ocupado quando a tarefa estoura o tempo limite, com o pool
+recriado na tarefa seguinte
+"""
+
+import asyncio
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import cast
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.cpu_pool import CPUAnalysisPool, CPUTaskTimeout, _terminate_workers
+
+
+def wait_for_workers_to_exit(timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while multiprocessing.active_children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return multiprocessing.active_children()
+
+
+def test_small_inputs_run_without_pool():
+    pool = CPUAnalysisPool(max_workers=1, sync_threshold_bytes=1024)
+    
+    assert asyncio.run(pool.run(len, "abc", size=3)) == 3
+    assert pool.stats()["sync_tasks"] == 1 and not pool.stats()["running"]
+
+
+def test_timeout_terminates_worker_and_pool_recovers():
+    pool = CPUAnalysisPool(max_workers=1, task_timeout=30.0, sync_threshold_bytes=0)
+    try:
+        with pytest.raises(CPUTaskTimeout):
+            asyncio.run(pool.run(time.sleep, 60, size=1, timeout=1.0))
+        
+        stats = pool.stats()
+        assert stats["timeouts"] == 1 and stats["pool_restarts"] == 1
+        assert not stats["running"]
+        # O worker preso em time.sleep(60) foi encerrado, não abandonado
+        assert wait_for_workers_to_exit() == []
+        
+        assert asyncio.run(pool.run(sum, [1, 2, 3], size=1)) == 6
+        assert pool.stats()["running"] and pool.stats()["pool_tasks"] == 2
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 14), reason="3.14+ usa terminate_workers()")
+def test_missing_private_processes_is_logged(caplog):
+    class ExecutorWithoutProcesses:
+        shutdown_calls = []
+        
+        def shutdown(self, **kwargs):
+            self.shutdown_calls.append(kwargs)
+    
+    executor = ExecutorWithoutProcesses()
+    _terminate_workers(cast(ProcessPoolExecutor, executor))
+    
+    assert "_processes" in caplog.text
+    assert executor.shutdown_calls == [{"wait": False, "cancel_futures": True}]
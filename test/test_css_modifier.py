@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Testes do CSSModifier
+Verifica que as edições sobre o AST alteram apenas as declarações
+envolvidas (diff mínimo), inclusive em regras dentro de @media
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source.css_modifier import CSSModifier
+
+BUTTONS_CSS = """/* Botões */
+.btn-base {
+    display: inline-flex;
+    background-color: transparent;
+    color: var(--color-neutral-700); /* texto */
+    margin: 0;
+}
+
+@media (max-width: 600px) {
+  .btn-base { width: 100%; color: red }
+}
+"""
+
+
+@pytest.fixture
+def modifier(tmp_path):
+    return CSSModifier(ProjectConfig("test-modifier", str(tmp_path), ["*.css"]))
+
+
+def test_edits_touch_only_changed_declarations(modifier):
+    modified, applied, errors = modifier.modify_css_content(BUTTONS_CSS, ".btn-base", [
+        {"property": "color", "value": "blue"},
+        {"property": "margin", "action": "remove"},
+        {"property": "min-height", "value": "44px"},
+    ])
+    
+    assert errors == []
+    assert [change["action"] for change in applied] == ["modified", "removed", "added"]
+    assert applied[0]["old_value"] == "var(--color-neutral-700)"
+    assert modified == BUTTONS_CSS.replace(
+        "var(--color-neutral-700); /* texto */\n    margin: 0;\n",
+        "blue; /* texto */\n    min-height: 44px;\n"
+    )
+
+
+def test_rule_inside_media(modifier):
+    modified, applied, errors = modifier.modify_css_content(
+        BUTTONS_CSS, ".btn-base", [{"property": "color", "value": "blue"}], at_rule="@media (max-width: 600px)"
+    )
+    
+    assert errors == []
+    assert modified == BUTTONS_CSS.replace("width: 100%; color: red }", "width: 100%; color: blue }")
+
+
+def test_missing_selector_and_property(modifier):
+    modified, _, errors = modifier.modify_css_content(BUTTONS_CSS, ".inexistente", [{"property": "color", "value": "blue"}])
+    assert modified == BUTTONS_CSS
+    assert errors == ["Seletor não encontrado: .inexistente"]
+    
+    _, _, errors = modifier.modify_css_content(BUTTONS_CSS, ".btn-base", [{"property": "padding", "action": "remove"}])
+    assert errors == ["Propriedade não encontrada: padding"]
+
+
+def test_batch_merges_fixes_and_skips_failed_ones(modifier):
+    modified, results = modifier.modify_css_content_batch(BUTTONS_CSS, [
+        {"selector": ".btn-base", "changes": [{"property": "color", "value": "blue"}]},
+        {"selector": ".btn-base", "changes": [
+            {"property": "margin", "value": "4px"},
+            {"property": "padding", "action": "remove"},
+        ]},
+        {"selector": ".btn-base", "changes": [{"property": "color", "value": "green"}]},
+        {"selector": ".btn-base", "changes": [{"property": "width", "value": "50%"}], "at_rule": "@media (max-width: 600px)"},
+    ])
+
+    assert [bool(result["errors"]) for result in results] == [False, True, False, False]
+    assert results[2]["changes_applied"][0]["old_value"] == "blue"
+    assert modified == BUTTONS_CSS.replace("var(--color-neutral-700)", "green").replace("width: 100%", "width: 50%")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Testes do parser CSS
+Verifica regras, at-rules, declarações, offsets e linhas produzidos em
+passagem única, inclusive com comentários, strings e parênteses, e que
+entradas adversariais (fuzz) são processadas em tempo linear
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from backend.infrastructure.source.css_parser import CSSBudgetExceeded, CSSRule, MAX_NESTING_DEPTH, parse_css
+from backend.infrastructure.source.source_analyzer import analyze_css_content
+
+SAMPLE_CSS = """@charset "utf-8";
+@import url("base.css");
+:root { --main: #fff; --pad: 4px }
+/* .comentado { color: red; } */
+.a, .b > c { color: red; background: url(data:image/png;base64,AAA=) !important }
+.s::before { content: "}{;"; }
+@media (max-width: 600px) {
+  .btn-base { width: 100%; }
+}
+@keyframes spin { from { opacity: 0 } to { opacity: 1 } }
+"""
+
+
+def test_rules_and_lines():
+    stylesheet = parse_css(SAMPLE_CSS)
+    assert stylesheet.errors == []
+    
+    rules = list(stylesheet.rules())
+    assert [rule.selector for rule in rules] == [":root", ".a, .b > c", ".s::before", ".btn-base"]
+    assert [stylesheet.line_of(rule.start) for rule in rules] == [3, 5, 6, 8]
+    assert [at_rule.name for at_rule in rules[3].at_rules()] == ["media"]
+
+
+def test_declaration_offsets():
+    stylesheet = parse_css(SAMPLE_CSS)
+    rule = stylesheet.find_rules(".a,  .b > c")[0]
+    color, background = rule.declarations
+    
+    assert SAMPLE_CSS[color.start:color.end] == "color: red;"
+    assert background.value == "url(data:image/png;base64,AAA=)"
+    assert background.important
+    assert SAMPLE_CSS[background.value_start:background.value_end] == "url(data:image/png;base64,AAA=) !important"
+    assert SAMPLE_CSS[rule.block_start - 1] == "{" and SAMPLE_CSS[rule.block_end] == "}"
+    
+    content = stylesheet.find_rules(".s::before")[0].declarations[0]
+    assert content.value == '"}{;"'
+
+
+def test_structure_from_parser():
+    analysis = analyze_css_content(SAMPLE_CSS)
+    
+    assert analysis["imports"] == ["base.css"]
+    assert analysis["variables"] == ["--main", "--pad"]
+    assert analysis["selectors"][3]["properties"] == ["width"]
+    assert analysis["selectors"][3]["at_rules"] == ["@media (max-width: 600px)"]
+
+
+def test_errors_are_reported():
+    assert parse_css(".a { color: red").errors[0]["message"] == "Bloco não fechado"
+    assert parse_css(".a { } }").errors[0]["message"] == "Chave de fechamento sem abertura"
+    assert parse_css("/* aberto").errors[0]["message"] == "Comentário não fechado"
+
+
+# Entradas adversariais: chaves sem par, comentários e strings abertas,
+# espaços antes de !important, parênteses e seletores longos
+ADVERSARIAL_INPUTS = {
+    "blocos_abertos_repetidos": lambda n: ".a {" * n,
+    "declaracoes_sem_fechamento": lambda n: ".a { x " * n,
+    "fechamentos_sem_abertura": lambda n: "}" * n,
+    "comentario_aberto": lambda n: ".a { color: red } /*" + "x{" * n,
+    "strings_abertas": lambda n: ".a { content: \"{;\n" * n,
+    "espacos_antes_de_important": lambda n: ".a { color: red" + " " * n + "! important }",
+    "parenteses_abertos": lambda n: ".a { b: url(" + "(;" * n + " }",
+    "seletor_longo": lambda n: ".a " * n + "{ b: c }",
+    "regras_em_media": lambda n: "@media (x) { " + ".a { b: c } " * n + "}",
+}
+
+
+def _check_offsets(stylesheet):
+    length = len(stylesheet.text)
+    for node in stylesheet.walk():
+        if isinstance(node, CSSRule) or node.has_block:
+            assert 0 <= node.start < node.block_start <= node.block_end + 1 <= length + 1
+        for declaration in node.declarations:
+            assert node.block_start <= declaration.start <= declaration.value_start <= declaration.value_end <= length
+
+
+def test_fuzz_random_inputs_do_not_break_parser():
+    rng = random.Random(1234)
+    alphabet = ['{', '}', ';', ':', '(', ')', '"', "'", '\\', '/*', '*/', '@media ', '.a', ' b', '\n', '!important']
+    
+    for _ in range(500):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 300)))
+        try:
+            stylesheet = parse_css(text)
+        except CSSBudgetExceeded:
+            continue
+        _check_offsets(stylesheet)
+        assert len(stylesheet.errors) <= stylesheet.error_count
+
+
+@pytest.mark.parametrize("name", sorted(ADVERSARIAL_INPUTS))
+def test_adversarial_inputs_scale_linearly(name):
+    generate = ADVERSARIAL_INPUTS[name]
+    # Blocos abertos param no limite de aninhamento; o resto é medido por completo
+    small, large = generate(2000), generate(16000)
+    
+    def measure(text):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            try:
+                parse_css(text)
+            except CSSBudgetExceeded:
+                pass
+            best = min(best, time.perf_counter() - started)
+        return best
+    
+    # 8x a entrada: linear fica perto de 8x; quadrático seria ~64x
+    assert measure(large) < measure(small) * 24 + 0.05
+
+
+def test_budgets():
+    with pytest.raises(CSSBudgetExceeded, match="excede o limite"):
+        parse_css(".a { b: c }" * 100, max_size=100)
+    with pytest.raises(CSSBudgetExceeded, match="excedeu"):
+        parse_css(".a { b: c }" * 5000, time_budget=0)
+    with pytest.raises(CSSBudgetExceeded, match="aninhados"):
+        parse_css(".a {" * (MAX_NESTING_DEPTH + 1))
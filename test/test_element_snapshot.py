@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Testes do snapshot de elemento
+Verifica a rejeição de snapshots malformados, a normalização tolerante de
+campos opcionais inválidos e os limites de compactação (atributos, estilos,
+texto e ancestrais) aplicados antes de o problema ser armazenado
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai.element_snapshot import (
+    MAX_ANCESTORS,
+    MAX_ATTRIBUTE_LENGTH,
+    MAX_TEXT_PREVIEW,
+    compact_issue,
+    element_snapshot_from_issue,
+    parse_element_snapshot,
+)
+
+
+@pytest.mark.parametrize("data", [
+    None,
+    "<button>",
+    [],
+    {},
+    {"tag": ""},
+    {"tag": 3},
+    {"v": 2, "tag": "button"},
+    {"tag": "button", "text": {"length": "12"}},
+    {"tag": "button", "box": {"x": "esquerda"}},
+])
+def test_malformed_snapshots_are_rejected(data):
+    with pytest.raises(ValueError):
+        parse_element_snapshot(data)
+
+
+def test_invalid_optional_fields_are_dropped():
+    snapshot = parse_element_snapshot({
+        "tag": "BUTTON",
+        "attrs": ["id", "x"],
+        "text": 42,
+        "style": "color: red",
+        "ancestors": {"tag": "form"},
+        "siblings": True,
+    })
+    
+    assert snapshot == {
+        "v": 1,
+        "tag": "button",
+        "attrs": {},
+        "text": {"length": 0, "hash": snapshot["text"]["hash"], "preview": ""},
+        "ancestors": [],
+    }
+
+
+def test_compaction_limits():
+    snapshot = parse_element_snapshot({
+        "v": 1,
+        "tag": "a",
+        "attrs": {"class": ["btn", "primary"], "href": "/" + "x" * 1000, "onclick": "steal()"},
+        "text": "  Comprar   agora " + "muito " * 50,
+        "box": {"x": 1, "y": "2.5", "width": None, "height": 30},
+        "style": {"color": "red", "cursor": "pointer", "font-size": None},
+        "ancestors": [{"tag": "DIV", "attrs": {"class": "card", "style": "x"}}, "texto", {"tag": None}]
+        + [{"tag": "section", "id": f"s{index}"} for index in range(20)],
+        "siblings": 3,
+    })
+    
+    assert snapshot["attrs"] == {"class": "btn primary", "href": "/" + "x" * (MAX_ATTRIBUTE_LENGTH - 1)}
+    assert snapshot["text"]["preview"].startswith("Comprar agora muito")
+    assert len(snapshot["text"]["preview"]) == MAX_TEXT_PREVIEW
+    assert snapshot["text"]["length"] == len("Comprar agora " + "muito " * 49 + "muito")
+    assert snapshot["box"] == {"x": 1.0, "y": 2.5, "width": 0.0, "height": 30.0}
+    assert snapshot["style"] == {"color": "red"}
+    assert snapshot["ancestors"][0] == {"tag": "div", "class": "card"}
+    # Ancestrais inválidos contam no limite, mas não entram no snapshot
+    assert len(snapshot["ancestors"]) == MAX_ANCESTORS - 2
+    assert snapshot["siblings"] == 3
+
+
+def test_same_text_has_same_digest_regardless_of_whitespace():
+    first = parse_element_snapshot({"tag": "p", "text": "Olá   mundo\n"})
+    second = parse_element_snapshot({"tag": "p", "text": "Olá mundo"})
+    
+    assert first["text"] == second["text"]
+
+
+def test_compact_issue_replaces_raw_html_with_snapshot():
+    issue = {
+        "type": "small_touch_target",
+        "html": "<html>" + "<div></div>" * 100 + "</html>",
+        "element_html": "<button class='btn'>OK</button>",
+        "element_snapshot": {"tag": "button", "attrs": {"class": "btn"}, "text": "OK"},
+    }
+    
+    compacted = compact_issue(issue)
+    
+    assert set(compacted) == {"type", "element_snapshot"}
+    assert compacted["element_snapshot"]["text"]["preview"] == "OK"
+    assert "html" in issue
+
+
+def test_compact_issue_keeps_html_when_snapshot_is_invalid():
+    issue = {"type": "overflow", "html": "<div></div>", "element_snapshot": {"v": 9, "tag": "div"}}
+    
+    assert element_snapshot_from_issue(issue) is None
+    assert compact_issue(issue) is issue
+    assert compact_issue({"type": "overflow"}) == {"type": "overflow"}
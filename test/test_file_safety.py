@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Testes da escrita segura dos arquivos fonte
+Verifica a escrita atômica, o lock exclusivo por arquivo (entre threads e
+processos) e a pré-condição de hash das rotas de aplicação (409), inclusive
+sem bloquear o event loop enquanto o lock do arquivo está ocupado
+"""
+
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api.routes import fixes as fixes_routes
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source.file_safety import (
+    FCNTL_AVAILABLE,
+    atomic_write_text,
+    content_hash,
+    file_lock,
+)
+from backend.infrastructure.storage.fix_repository import FixRepository
+
+CSS = ".a {\n  color: red;\n}\n"
+
+
+def test_atomic_write_preserves_mode(tmp_path):
+    path = tmp_path / "a.css"
+    path.write_text(CSS)
+    os.chmod(path, 0o640)
+    
+    atomic_write_text(path, ".a { color: blue }\n")
+    
+    assert path.read_text() == ".a { color: blue }\n"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+    assert [entry.name for entry in tmp_path.iterdir()] == ["a.css"]
+
+
+def test_atomic_write_removes_temp_file_on_error(tmp_path, monkeypatch):
+    path = tmp_path / "a.css"
+    path.write_text(CSS)
+    
+    def failing_replace(source, target):
+        raise OSError("disco cheio")
+    
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        atomic_write_text(path, ".a { color: blue }\n")
+    
+    assert path.read_text() == CSS
+    assert [entry.name for entry in tmp_path.iterdir()] == ["a.css"]
+
+
+def test_file_lock_excludes_other_threads(tmp_path):
+    lock_path = tmp_path / "a.lock"
+    events = []
+    acquired = threading.Event()
+    
+    def holder():
+        with file_lock(lock_path):
+            events.append("holder")
+            acquired.set()
+            time.sleep(0.1)
+            events.append("holder released")
+    
+    def waiter():
+        acquired.wait()
+        with file_lock(lock_path):
+            events.append("waiter")
+    
+    threads = [threading.Thread(target=holder), threading.Thread(target=waiter)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert events == ["holder", "holder released", "waiter"]
+
+
+@pytest.mark.skipif(not FCNTL_AVAILABLE, reason="lock entre processos requer fcntl")
+def test_file_lock_excludes_other_processes(tmp_path):
+    lock_path = tmp_path / "a.lock"
+    probe = (
+        "import fcntl, sys\n"
+        "handle = open(sys.argv[1], 'a+b')\n"
+        "try:\n"
+        "    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+        "except BlockingIOError:\n"
+        "    sys.exit(1)\n"
+    )
+    
+    def try_lock():
+        return subprocess.run([sys.executable, "-c", probe, str(lock_path)]).returncode
+    
+    with file_lock(lock_path):
+        assert try_lock() == 1
+    assert try_lock() == 0
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """Projeto com um arquivo CSS e uma correção pendente para ele."""
+    root = tmp_path / "project"
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "a.css").write_text(CSS)
+    project_id = f"file-safety-{tmp_path.name}"
+    config = ProjectConfig(project_id, str(root), ["css/*.css"], backup_dir=str(tmp_path / "backups"))
+    monkeypatch.setitem(fixes_routes.project_manager.projects, project_id, config)
+    
+    repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+    monkeypatch.setattr(fixes_routes, "fix_repository", repository)
+    asyncio.run(repository.initialize())
+    asyncio.run(repository.save_fix({
+        "id": "fix-1",
+        "target_element": ".a",
+        "target_selector": ".a",
+        "changes": [{"property": "color", "value": "blue"}],
+    }))
+    
+    app = FastAPI()
+    app.include_router(fixes_routes.router)
+    return app, project_id, root / "css" / "a.css"
+
+
+def test_apply_source_rejects_stale_hash(project):
+    app, project_id, css_file = project
+    client = TestClient(app)
+    
+    response = client.post(
+        "/api/fixes/fix-1/apply-source",
+        params={"project_id": project_id, "expected_hash": content_hash(".a { color: green }\n")}
+    )
+    
+    assert response.status_code == 409
+    assert css_file.read_text() == CSS
+    fix = asyncio.run(fixes_routes.fix_repository.get_fix("fix-1"))
+    assert fix is not None and fix["status"] == "pending"
+    
+    response = client.post(
+        "/api/fixes/fix-1/apply-source",
+        params={"project_id": project_id, "expected_hash": content_hash(CSS)}
+    )
+    assert response.status_code == 200 and "blue" in css_file.read_text()
+
+
+def test_apply_source_waits_for_lock_without_blocking_event_loop(project, monkeypatch):
+    app, project_id, css_file = project
+    patch_applier = fixes_routes.get_patch_applier(project_id)
+    assert patch_applier is not None
+    locked = threading.Event()
+    release = threading.Event()
+    released = threading.Event()
+    entered = threading.Event()
+    apply_fix = patch_applier.apply_fix
+    
+    def tracked_apply_fix(*args, **kwargs):
+        entered.set()
+        return apply_fix(*args, **kwargs)
+    
+    monkeypatch.setattr(patch_applier, "apply_fix", tracked_apply_fix)
+    
+    def holder():
+        with patch_applier.lock_file("css/a.css"):
+            locked.set()
+            release.wait(2)
+        released.set()
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            apply = asyncio.create_task(
+                client.post("/api/fixes/fix-1/apply-source", params={"project_id": project_id})
+            )
+            while not entered.is_set():
+                await asyncio.sleep(0.01)
+            rules = await client.get("/api/fixes/rules")
+            # Respondida com o arquivo ainda travado e a aplicação esperando o lock
+            waiting = not released.is_set() and not apply.done()
+            release.set()
+            return rules, waiting, await apply
+    
+    thread = threading.Thread(target=holder)
+    thread.start()
+    locked.wait()
+    try:
+        rules, waiting, response = asyncio.run(scenario())
+    finally:
+        release.set()
+        thread.join()
+    
+    assert rules.status_code == 200 and waiting
+    assert response.status_code == 200 and response.json()["success"]
+    assert "blue" in css_file.read_text()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Testes do FixCostAnalyzer
+Verifica a pontuação (abrangência × impacto), a troca de seletores
+universais pelo elemento concreto e o orçamento nos modos flag e reject
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from backend.domain.fix_cost import (
+    CLASS_BREADTH,
+    LAYOUT_IMPACT,
+    PAINT_IMPACT,
+    UNIVERSAL_BREADTH,
+    FixCostAnalyzer,
+    is_universal_selector,
+)
+
+
+def test_score_multiplies_breadth_by_impact():
+    analyzer = FixCostAnalyzer(budget=10)
+    cost = analyzer.score({
+        "target_selector": ".btn",
+        "changes": [{"property": "width", "value": "1px"}, {"property": "color", "value": "red"}]
+    })
+    
+    assert cost["breadth"] == CLASS_BREADTH
+    assert cost["impact"] == LAYOUT_IMPACT + PAINT_IMPACT
+    assert cost["cost"] == CLASS_BREADTH * (LAYOUT_IMPACT + PAINT_IMPACT)
+    assert cost["over_budget"]
+
+
+def test_score_tolerates_missing_properties():
+    cost = FixCostAnalyzer().score({
+        "target_selector": "*",
+        "changes": [{"property": None}, {"value": "1px"}, "inválido"]
+    })
+    assert cost["breadth"] == UNIVERSAL_BREADTH
+    assert FixCostAnalyzer().score({"target_element": "button", "changes": None})["cost"] == 0
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("*", True),
+    (".card > *", True),
+    (".a, *", True),
+    (".btn-primary", False),
+    ("button", False),
+    ("*.btn", False),
+])
+def test_universal_selectors(selector, expected):
+    assert is_universal_selector(selector) == expected
+
+
+def test_rewrite_only_replaces_universal_selectors():
+    analyzer = FixCostAnalyzer()
+    issue = {"element": "#submit"}
+    
+    universal = analyzer.rewrite({"target_selector": "*", "target_element": "*"}, issue)
+    assert universal["target_selector"] == "#submit"
+    assert universal["rewritten_from"] == "*"
+    
+    # Classe existe na folha de estilo: não trocar por um seletor do DOM
+    specific = analyzer.rewrite({"target_selector": ".btn-primary", "target_element": "button"}, issue)
+    assert specific["target_selector"] == ".btn-primary"
+    assert "rewritten_from" not in specific
+
+
+def test_review_flags_or_rejects_over_budget():
+    fix = {"target_selector": "div", "changes": [{"property": "margin", "value": "0"}]}
+    
+    flagged = FixCostAnalyzer(budget=1, mode="flag").review(dict(fix))
+    assert flagged is not None and flagged["cost"]["over_budget"]
+    assert FixCostAnalyzer(budget=1, mode="reject").review(dict(fix)) is None
+    accepted = FixCostAnalyzer(budget=1000, mode="reject").review(dict(fix))
+    assert accepted is not None and accepted["cost"]["over_budget"] is False
+    
+    with pytest.raises(ValueError):
+        FixCostAnalyzer(mode="ignore")
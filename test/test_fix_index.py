@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de correções similares
+Verifica a busca top-k por similaridade e que apenas correções aplicadas
+ou validadas entram no índice (na carga inicial e nas mudanças de status)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.storage.fix_index import SimilarFixIndex
+from backend.infrastructure.storage.fix_repository import FixRepository
+
+
+def make_fix(fix_id, issue_type, selector, status='applied', **details):
+    return {
+        "id": fix_id,
+        "issue_type": issue_type,
+        "target_element": selector,
+        "target_selector": selector,
+        "changes": [{"property": "min-width", "value": "44px"}],
+        "status": status,
+        "issue": {"type": issue_type, "element": selector, "details": details},
+    }
+
+
+def test_search_returns_top_k_by_similarity():
+    index = SimilarFixIndex()
+    index.add(make_fix("touch-btn", "small_touch_target", "button.btn-primary", width=20))
+    index.add(make_fix("touch-link", "small_touch_target", "a.nav-link", width=20))
+    index.add(make_fix("overflow", "horizontal_overflow", "div.card", width=900))
+    for number in range(100):
+        index.add(make_fix(f"other-{number}", f"type-{number}", f"section.s{number}"))
+    
+    issue = {"type": "small_touch_target", "element": "form button.btn-primary", "details": {"width": 24}}
+    results = index.search(issue, k=2)
+    
+    assert [result["id"] for result in results] == ["touch-btn", "touch-link"]
+    assert results[0]["similarity"] > results[1]["similarity"] > 0
+    assert len(index.search(issue, k=500)) <= len(index) == 103
+    assert index.search(issue, k=0) == []
+    assert index.search(issue, k=5, min_score=0.99) == []
+
+
+def test_only_applied_or_validated_fixes_are_indexed():
+    index = SimilarFixIndex()
+    index.add(make_fix("pending", "small_touch_target", "button", status='pending'))
+    index.add(make_fix("applied", "small_touch_target", "button"))
+    index.add(make_fix("validated", "small_touch_target", "button", status='validated'))
+    assert "pending" not in index and len(index) == 2
+    
+    # Regravada com outro status: sai do índice
+    index.add(make_fix("validated", "small_touch_target", "button", status='pending'))
+    index.update_status("applied", 'validated')
+    assert [result["id"] for result in index.search({"type": "small_touch_target"})] == ["applied"]
+    assert index.search({"type": "small_touch_target"})[0]["status"] == 'validated'
+    
+    index.update_status("applied", 'rolled_back')
+    assert len(index) == 0
+
+
+def test_repository_keeps_index_in_sync_with_status(tmp_path):
+    async def scenario():
+        repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+        await repository.initialize()
+        await repository.save_fix(make_fix("old-applied", "small_touch_target", "button"))
+        await repository.save_fix(make_fix("old-pending", "small_touch_target", "button", status='pending'))
+        await repository.save_fix(make_fix("old-rolled", "small_touch_target", "button", status='rolled_back'))
+        
+        # Carga inicial a partir do banco
+        loaded = FixRepository(db_path=repository.db_path)
+        await loaded.load_fix_index()
+        assert len(loaded.fix_index) == 1 and "old-applied" in loaded.fix_index
+        
+        await loaded.update_fix_status("old-pending", 'applied')
+        assert "old-pending" in loaded.fix_index
+        assert loaded.fix_index.search({"type": "small_touch_target"}, k=5)[0]["changes"]
+        
+        await loaded.update_fix_status("old-applied", 'rolled_back')
+        assert len(loaded.fix_index) == 1 and "old-pending" in loaded.fix_index
+    
+    asyncio.run(scenario())
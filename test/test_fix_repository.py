@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Testes do repositório de correções
+Verifica a separação do HTML dos problemas em html_snapshots (gravação,
+carregamento sob demanda, migração de correções antigas e remoção de
+snapshots sem referência)
+"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.storage import fix_repository as fix_repository_module
+from backend.infrastructure.storage.fix_repository import FixRepository
+
+HTML = "<div class='card'>" + "<span>texto</span>" * 40 + "</div>"
+
+
+def make_fix(fix_id, issue):
+    return {
+        "id": fix_id,
+        "type": "css",
+        "target_element": "div",
+        "target_selector": ".card",
+        "changes": [{"property": "color", "value": "red"}],
+        "issue_type": "contrast",
+        "issue": issue,
+    }
+
+
+def make_repository(tmp_path):
+    repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+    asyncio.run(repository.initialize())
+    return repository
+
+
+def stored_issue(repository, fix_id):
+    """Problema da correção como gravado (HTML grande só referenciado)."""
+    fix = asyncio.run(repository.get_fix(fix_id))
+    assert fix is not None
+    return fix["issue"]
+
+
+def load_issue(repository, fix_id):
+    """Problema da correção com o HTML referenciado carregado."""
+    return asyncio.run(repository.load_issue_html(stored_issue(repository, fix_id)))
+
+
+def snapshot_count(repository):
+    with sqlite3.connect(repository.db_path) as db:
+        return db.execute("SELECT COUNT(*) FROM html_snapshots").fetchone()[0]
+
+
+def test_html_is_split_on_save_and_loaded_on_demand(tmp_path):
+    repository = make_repository(tmp_path)
+    asyncio.run(repository.save_fix(make_fix("fix-1", {"type": "contrast", "html": HTML})))
+    asyncio.run(repository.save_fix(make_fix("fix-2", {"type": "contrast", "element_html": HTML})))
+    
+    issue = stored_issue(repository, "fix-1")
+    assert "html" not in issue and isinstance(issue["html_ref"], str)
+    assert snapshot_count(repository) == 1
+    
+    assert load_issue(repository, "fix-2") == {"type": "contrast", "element_html": HTML}
+
+
+def test_small_html_stays_inline(tmp_path):
+    repository = make_repository(tmp_path)
+    asyncio.run(repository.save_fix(make_fix("fix-1", {"html": "<b>x</b>"})))
+    
+    assert stored_issue(repository, "fix-1") == {"html": "<b>x</b>"}
+    assert snapshot_count(repository) == 0
+
+
+def test_migration_moves_embedded_html(tmp_path):
+    repository = make_repository(tmp_path)
+    with sqlite3.connect(repository.db_path) as db:
+        db.executemany(
+            "INSERT INTO fixes (id, type, target_element, changes, issue_data, created_at) "
+            "VALUES (?, 'css', 'div', '[]', ?, '2026-01-01T00:00:00')",
+            [
+                ("fix-1", json.dumps({"type": "contrast", "html": HTML})),
+                ("fix-2", json.dumps({"type": "contrast"})),
+                ("fix-3", json.dumps({"element_html": HTML + "<p></p>"})),
+            ]
+        )
+    
+    assert asyncio.run(repository.migrate_html_snapshots(batch_size=1)) == 2
+    assert asyncio.run(repository.migrate_html_snapshots()) == 0
+    assert snapshot_count(repository) == 2
+    
+    assert "html" not in stored_issue(repository, "fix-1")
+    assert load_issue(repository, "fix-3") == {"element_html": HTML + "<p></p>"}
+
+
+def test_gc_removes_only_unreferenced_snapshots(tmp_path):
+    repository = make_repository(tmp_path)
+    asyncio.run(repository.save_fix(make_fix("fix-1", {"html": HTML})))
+    asyncio.run(repository.save_fix(make_fix("fix-2", {"html": HTML + "<hr>"})))
+    
+    # fix-2 regravada sem HTML: seu snapshot fica sem referência
+    asyncio.run(repository.save_fix(make_fix("fix-2", {"type": "contrast"})))
+    
+    assert asyncio.run(repository.gc_html_snapshots()) == 1
+    assert asyncio.run(repository.gc_html_snapshots()) == 0
+    assert load_issue(repository, "fix-1") == {"html": HTML}
+
+
+def test_fix_saved_during_gc_keeps_its_snapshot(tmp_path, monkeypatch):
+    repository = make_repository(tmp_path)
+    asyncio.run(repository.save_fix(make_fix("fix-1", {"html": HTML})))
+    asyncio.run(repository.save_fix(make_fix("fix-2", {"html": HTML + "<hr>"})))
+    # Snapshot de fix-1 sem referência, mas reutilizado pela correção salva durante o GC
+    asyncio.run(repository.save_fix(make_fix("fix-1", {"type": "contrast"})))
+    
+    saver = threading.Thread(
+        target=lambda: asyncio.run(repository.save_fix(make_fix("fix-3", {"html": HTML})))
+    )
+    issue_html_refs = fix_repository_module.issue_html_refs
+    
+    def refs_while_saving(issue):
+        # GC já lendo as referências: a correção é salva em paralelo
+        if saver.ident is None:
+            saver.start()
+            time.sleep(0.3)
+        return issue_html_refs(issue)
+    
+    monkeypatch.setattr(fix_repository_module, "issue_html_refs", refs_while_saving)
+    asyncio.run(repository.gc_html_snapshots())
+    saver.join()
+    
+    assert load_issue(repository, "fix-3") == {"html": HTML}
+
+
+def test_init_db_migrates_existing_database(tmp_path, monkeypatch):
+    import importlib.util
+    
+    repository = make_repository(tmp_path)
+    with sqlite3.connect(repository.db_path) as db:
+        db.execute(
+            "INSERT INTO fixes (id, type, target_element, changes, issue_data, created_at) "
+            "VALUES ('fix-1', 'css', 'div', '[]', ?, '2026-01-01T00:00:00')",
+            (json.dumps({"html": HTML}),)
+        )
+        db.execute(
+            "INSERT INTO html_snapshots (hash, codec, size, data, created_at) "
+            "VALUES ('orphan', 'none', 0, x'', '2026-01-01T00:00:00')"
+        )
+    
+    script = Path(__file__).parent.parent / "backend" / "scripts" / "init_db.py"
+    spec = importlib.util.spec_from_file_location("init_db", script)
+    assert spec is not None and spec.loader is not None
+    init_db = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(init_db)
+    monkeypatch.setenv("DATABASE_PATH", repository.db_path)
+    asyncio.run(init_db.main())
+    
+    with sqlite3.connect(repository.db_path) as db:
+        hashes = [row[0] for row in db.execute("SELECT hash FROM html_snapshots")]
+    assert "orphan" not in hashes and len(hashes) == 1
+    assert load_issue(repository, "fix-1") == {"html": HTML}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Testes do parser incremental de correções em streaming
+Verifica a emissão das changes entre pedaços do stream, a remoção da
+cerca de markdown e o aborto antecipado de respostas inválidas
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai.fix_stream_parser import FixStreamAborted, IncrementalFixParser
+
+RESPONSE = json.dumps({
+    "type": "css",
+    "target_element": "button",
+    "changes": [
+        {"property": "min-width", "value": "44px", "reason": "Área de toque {mínima}"},
+        {"property": "color", "value": "#000", "nested": {"a": [1, 2]}},
+        {"property": "padding"},
+    ],
+    "confidence": 0.8,
+})
+
+
+def feed_in_chunks(text, size):
+    """Alimenta o parser em pedaços de size caracteres; retorna (parser, emitidas por pedaço)."""
+    parser = IncrementalFixParser()
+    emitted = [parser.feed(text[start:start + size]) for start in range(0, len(text), size)]
+    return parser, emitted
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, len(RESPONSE)])
+def test_changes_emitted_across_chunk_boundaries(size):
+    parser, emitted = feed_in_chunks(RESPONSE, size)
+    
+    changes = [change for chunk in emitted for change in chunk]
+    assert changes == [
+        {"property": "min-width", "value": "44px", "reason": "Área de toque {mínima}"},
+        {"property": "color", "value": "#000", "reason": "Correção gerada por IA"},
+    ]
+    assert parser.changes == changes
+    assert json.loads(parser.finish())["confidence"] == 0.8
+
+
+def test_change_is_emitted_as_soon_as_its_object_closes():
+    parser = IncrementalFixParser()
+    first_end = RESPONSE.index('}"}') + 3
+    
+    assert parser.feed(RESPONSE[:first_end - 1]) == []
+    assert [change["property"] for change in parser.feed(RESPONSE[first_end - 1:first_end])] == ["min-width"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 5])
+def test_markdown_fence_is_stripped(size):
+    text = "\n```json\n" + RESPONSE + "\n```\n"
+    parser, emitted = feed_in_chunks(text, size)
+    
+    assert sum(len(chunk) for chunk in emitted) == 2
+    assert parser.finish() == text
+
+
+@pytest.mark.parametrize("text", [
+    "null",
+    "Aqui está a correção: {\"type\": \"css\"}",
+    "``json\n{}",
+    "[{\"property\": \"color\"}]",
+])
+def test_invalid_prefix_aborts(text):
+    parser = IncrementalFixParser()
+    with pytest.raises(FixStreamAborted):
+        for char in text:
+            parser.feed(char)
+
+
+@pytest.mark.parametrize("text", [
+    '{"type": "html", "changes": []}',
+    '{"type": null, "changes": []}',
+    '{"type": "css", "changes": null}',
+    '{"type": "css", "changes": [{"property": "color"}}, "confidence": 1}',
+])
+def test_invalid_fields_abort_before_the_end(text):
+    parser = IncrementalFixParser()
+    with pytest.raises(FixStreamAborted):
+        parser.feed(text[:-1])
+
+
+def test_finish_rejects_empty_and_truncated_responses():
+    with pytest.raises(FixStreamAborted):
+        IncrementalFixParser().finish()
+    
+    parser = IncrementalFixParser()
+    parser.feed(RESPONSE[:-1])
+    with pytest.raises(FixStreamAborted):
+        parser.finish()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Testes do HTMLAnalyzer
+Compara a extração em passagem única com a extração original por find_all
+e verifica a unicidade dos seletores gerados
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from bs4 import BeautifulSoup
+
+from backend.infrastructure.ai.fix_generator import FixGenerator
+from backend.infrastructure.ai.html_analyzer import HTMLAnalyzer
+from backend.infrastructure.ai.html_backends import BS4Backend, LXMLBackend, LXML_AVAILABLE, CSSSELECT_AVAILABLE, get_html_backend
+from backend.infrastructure.ai.html_stream_analyzer import StreamingHTMLAnalyzer
+from backend.infrastructure.ai.llm_simulator import SimulatedLLMService
+from backend.infrastructure.ai.selector_synthesizer import DocumentSelectorIndex, SelectorSynthesizer
+
+TEST_PAGE = Path(__file__).parent / "test_page.html"
+
+SAMPLE_HTML = """
+<html><body>
+  <nav>
+    <a href="/home">Início</a>
+    <a href="/vazio"></a>
+    <a aria-label="Fechar"></a>
+    <a type="button" href="#menu" style="width: 20px; height: 20px">☰</a>
+  </nav>
+  <form id="login">
+    <input type="text" name="user" placeholder="Usuário">
+    <input type="submit" value="Entrar" style="width: 20px">
+    <input type="reset" class="btn secondary">
+    <input type="checkbox" name="remember">
+    <textarea name="bio"></textarea>
+    <select name="lang"><option>pt</option></select>
+    <button type="button" style="height: 20px"></button>
+    <button class="icon-only" style="overflow: hidden"></button>
+  </form>
+  <div style="overflow-x: auto"><p style="OVERFLOW: hidden">texto</p></div>
+  <div style=""><span style="overflow:scroll">x</span></div>
+</body></html>
+"""
+
+
+def legacy_analyze(analyzer: HTMLAnalyzer, html_content: str):
+    """
+    Implementação original (uma travessia por categoria), usada como referência.
+    
+    O filtro type=[..., None] é expresso como função: a partir do
+    beautifulsoup4 4.13, None dentro de uma lista deixou de casar com
+    atributo ausente.
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    elements = []
+    
+    for button in soup.find_all(['button', 'a', 'input'], type=lambda t: t in ('submit', 'button', 'reset', None)):
+        elements.append(analyzer._extract_element_info(button, "button"))
+    for input_field in soup.find_all(['input', 'textarea', 'select']):
+        elements.append(analyzer._extract_element_info(input_field, "input"))
+    for link in soup.find_all('a', href=True):
+        elements.append(analyzer._extract_element_info(link, "link"))
+    
+    def problem(problem_type, element):
+        return {
+            "type": problem_type,
+            "element": str(element),
+            "tag": element.name,
+            "selector": analyzer._generate_selector(element)
+        }
+    
+    problematic = []
+    for element in soup.find_all(['button', 'a']):
+        if not element.get_text(strip=True) and not element.get('aria-label'):
+            problematic.append(problem("missing_label", element))
+    for button in soup.find_all(['button', 'a', 'input'], type=['submit', 'button']):
+        style = str(button.get('style') or '')
+        if 'width' in style or 'height' in style:
+            if 'width: 20px' in style or 'height: 20px' in style:
+                problematic.append(problem("small_touch_target", button))
+    for element in soup.find_all(style=lambda x: x is not None and 'overflow' in x):
+        problematic.append(problem("overflow_issue", element))
+    
+    return {"elements": elements, "problematic_elements": problematic}
+
+
+def test_single_pass_matches_legacy_sample():
+    analyzer = HTMLAnalyzer(backend=BS4Backend())
+    assert _without_markup(analyzer.analyze_html(SAMPLE_HTML), "selector") == \
+        _without_markup(legacy_analyze(analyzer, SAMPLE_HTML), "selector")
+
+
+def test_single_pass_matches_legacy_test_page():
+    html_content = TEST_PAGE.read_text(encoding='utf-8')
+    analyzer = HTMLAnalyzer(backend=BS4Backend())
+    assert _without_markup(analyzer.analyze_html(html_content), "selector") == \
+        _without_markup(legacy_analyze(analyzer, html_content), "selector")
+
+
+def test_anchor_is_extracted_as_button_and_link():
+    result = HTMLAnalyzer().analyze_html('<a href="/x" class="cta">Comprar</a>')
+    types = [element["type"] for element in result["elements"]]
+    assert types == ["button", "link"]
+    assert result["elements"][0]["href"] == result["elements"][1]["href"] == "/x"
+
+
+def test_problem_categories_keep_order():
+    result = HTMLAnalyzer().analyze_html(SAMPLE_HTML)
+    types = [problem["type"] for problem in result["problematic_elements"]]
+    assert types == sorted(types, key=["missing_label", "small_touch_target", "overflow_issue"].index)
+
+
+def test_analysis_is_cached_by_content():
+    analyzer = HTMLAnalyzer()
+    first = analyzer.analyze_html(SAMPLE_HTML)
+    assert analyzer.analyze_html(SAMPLE_HTML) == first
+    context = analyzer.get_element_context(SAMPLE_HTML, "#login")
+    assert context is not None and context["element"]["tag"] == "form"
+    assert analyzer.cache_stats()["misses"] == 1
+
+
+def test_cache_counts_hits_and_misses():
+    analyzer = HTMLAnalyzer()
+    analyzer.analyze_html(SAMPLE_HTML)
+    analyzer.analyze_html(SAMPLE_HTML)
+    analyzer.analyze_html(SAMPLE_HTML.replace("Início", "Home"))
+    
+    stats = analyzer.cache_stats()
+    assert (stats["hits"], stats["misses"], stats["documents"]) == (1, 2, 2)
+
+
+def test_cache_evicts_least_recently_used_document():
+    pages = [f"<html><body><button id='b{index}'>Botão {index}</button></body></html>" for index in range(3)]
+    size = len(pages[0].encode())
+    analyzer = HTMLAnalyzer(cache_max_bytes=2 * size)
+    
+    analyzer.analyze_html(pages[0])
+    analyzer.analyze_html(pages[1])
+    analyzer.analyze_html(pages[0])  # pages[1] passa a ser o menos recente
+    analyzer.analyze_html(pages[2])
+    assert analyzer.cache_stats()["documents"] == 2
+    assert analyzer.cache_stats()["bytes"] == 2 * size
+    
+    analyzer.analyze_html(pages[0])
+    analyzer.analyze_html(pages[1])
+    stats = analyzer.cache_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+
+
+def test_cached_results_cannot_be_modified_by_callers():
+    expected_analysis = HTMLAnalyzer().analyze_html(SAMPLE_HTML)
+    expected_context = HTMLAnalyzer().get_element_context(SAMPLE_HTML, "#login")
+    
+    analyzer = HTMLAnalyzer()
+    analysis = analyzer.analyze_html(SAMPLE_HTML)
+    analysis["elements"][0]["tag"] = "alterado"
+    analysis["problematic_elements"].clear()
+    context = analyzer.get_element_context(SAMPLE_HTML, "#login")
+    assert context is not None
+    context["element"]["tag"] = "alterado"
+    
+    async_analysis, async_context = asyncio.run(analyzer.analyze_async(SAMPLE_HTML, "#login"))
+    assert (async_analysis, async_context) == (expected_analysis, expected_context)
+    async_analysis["elements"].append({})
+    assert async_context is not None
+    async_context["parent"] = None
+    
+    assert analyzer.analyze_html(SAMPLE_HTML) == expected_analysis
+    assert analyzer.get_element_context(SAMPLE_HTML, "#login") == expected_context
+
+
+def _without_markup(result, *extra_keys):
+    """Resultado sem o markup serializado (que varia entre backends) e sem extra_keys."""
+    dropped = ("element",) + extra_keys
+    return {
+        "elements": result["elements"],
+        "problematic_elements": [
+            {key: value for key, value in problem.items() if key not in dropped}
+            for problem in result["problematic_elements"]
+        ]
+    }
+
+
+WELL_FORMED = {"sample": SAMPLE_HTML, "test_page": TEST_PAGE.read_text(encoding='utf-8')}
+
+# Markup em que as árvores dos backends divergem (ver BS4Backend)
+MALFORMED = {
+    "top_level": (
+        '<div>a</div><div style="overflow: hidden">b</div>'
+        '<button></button><p>x</p><a href="/x"></a>'
+    ),
+    "head_elements": (
+        '<title>t</title><!-- c --><style>p {}</style>'
+        '<div style="overflow: auto">a</div><span>s</span>'
+    ),
+    "script_then_button": '<script>x</script><button></button><a href="/z">z</a>',
+    "unclosed_li": '<ul><li><a></a><li><a></a><li><a href="/y">y</a></ul>',
+    "unclosed_p": '<div><p>a<button style="overflow: scroll"></button><p><a></a></div>',
+    "html_without_body": '<html><div>a</div><select></select></html>',
+}
+CONTEXT_SELECTORS = [
+    "#login", ".btn", "button", "select", "nav a", "div", "p", "a", "span", "title", "style"
+]
+lxml_required = pytest.mark.skipif(
+    not (LXML_AVAILABLE and CSSSELECT_AVAILABLE), reason="lxml/cssselect não instalados"
+)
+
+
+def _contexts(analyzer, html_content):
+    contexts = {}
+    for selector in CONTEXT_SELECTORS:
+        context = analyzer.get_element_context(html_content, selector)
+        if context is not None:
+            context.pop("html_snippet")
+        contexts[selector] = context
+    return contexts
+
+
+@lxml_required
+@pytest.mark.parametrize("html_content", list(WELL_FORMED.values()), ids=list(WELL_FORMED))
+def test_lxml_backend_matches_bs4(html_content):
+    bs4_analyzer = HTMLAnalyzer(backend=BS4Backend())
+    lxml_analyzer = HTMLAnalyzer(backend=get_html_backend("lxml"))
+    
+    # Além do markup serializado, só os seletores variam: no bs4 não há caminhos
+    assert _without_markup(lxml_analyzer.analyze_html(html_content), "selector") == \
+        _without_markup(bs4_analyzer.analyze_html(html_content), "selector")
+    assert _contexts(lxml_analyzer, html_content) == _contexts(bs4_analyzer, html_content)
+
+
+@lxml_required
+@pytest.mark.parametrize("html_content", list(MALFORMED.values()), ids=list(MALFORMED))
+def test_lxml_backend_matches_bs4_on_malformed_markup(html_content):
+    bs4_analyzer = HTMLAnalyzer(backend=BS4Backend())
+    lxml_analyzer = HTMLAnalyzer(backend=get_html_backend("lxml"))
+    
+    # Elementos e problemas coincidem; seletores e contexto dependem da árvore
+    assert _without_markup(lxml_analyzer.analyze_html(html_content), "selector") == \
+        _without_markup(bs4_analyzer.analyze_html(html_content), "selector")
+    
+    bs4_contexts = _contexts(bs4_analyzer, html_content)
+    lxml_contexts = _contexts(lxml_analyzer, html_content)
+    for selector, bs4_context in bs4_contexts.items():
+        lxml_context = lxml_contexts[selector]
+        assert (lxml_context is None) == (bs4_context is None)
+        if bs4_context is not None:
+            assert lxml_context["element"]["tag"] == bs4_context["element"]["tag"]
+
+
+@lxml_required
+def test_known_backend_tree_differences():
+    bs4_analyzer = HTMLAnalyzer(backend=BS4Backend())
+    lxml_analyzer = HTMLAnalyzer(backend=get_html_backend("lxml"))
+    
+    def context(analyzer, html_content, selector):
+        element_context = analyzer.get_element_context(html_content, selector)
+        assert element_context is not None
+        return element_context
+    
+    def parent_tag(analyzer, html_content, selector):
+        return context(analyzer, html_content, selector)["parent"]["tag"]
+    
+    top_level = MALFORMED["top_level"]
+    assert parent_tag(bs4_analyzer, top_level, "div") == "[document]"
+    assert parent_tag(lxml_analyzer, top_level, "div") == "body"
+    
+    script_then_button = MALFORMED["script_then_button"]
+    assert parent_tag(bs4_analyzer, script_then_button, "button") == "[document]"
+    assert parent_tag(lxml_analyzer, script_then_button, "button") == "head"
+    
+    unclosed_li = MALFORMED["unclosed_li"]
+    assert parent_tag(bs4_analyzer, unclosed_li, "li li") == "li"
+    assert lxml_analyzer.get_element_context(unclosed_li, "li li") is None
+    assert context(bs4_analyzer, unclosed_li, "li")["siblings_count"] == 0
+    assert context(lxml_analyzer, unclosed_li, "li")["siblings_count"] == 2
+
+
+@lxml_required
+def test_lxml_selector_cache_is_lru_bounded():
+    backend = LXMLBackend(max_selectors=2)
+    document = backend.parse(SAMPLE_HTML)
+    
+    for selector in ["#login", ".btn", "#login", "button"]:
+        backend.select_one(document, selector)
+    
+    # ".btn" era o menos usado recentemente
+    assert list(backend._xpaths) == ["#login", "button"]
+    assert backend.select_one(document, ".btn") is not None
+    assert len(backend._xpaths) == 2
+
+
+
+@pytest.mark.parametrize("html_content", [SAMPLE_HTML, TEST_PAGE.read_text(encoding='utf-8')], ids=["sample", "test_page"])
+def test_streaming_matches_tree_analysis(html_content):
+    # Pedaços pequenos para exercitar nós de texto divididos entre chamadas de feed
+    streaming = StreamingHTMLAnalyzer(chunk_size=7)
+    analyzer = HTMLAnalyzer(backend=BS4Backend())
+    
+    # O streaming não tem o índice do documento: seletores são os simples
+    assert _without_markup(streaming.analyze(html_content), "selector") == \
+        _without_markup(analyzer.analyze_html(html_content), "selector")
+    
+    for selector in ["#login", "form#login", ".btn", "button", "select", "a", "#small-btn", "p"]:
+        tree_context = analyzer.get_element_context(html_content, selector)
+        stream_context = streaming.element_context(html_content, selector)
+        if tree_context is None:
+            assert stream_context is None
+            continue
+        assert stream_context is not None
+        for key in ("element", "parent", "siblings_count"):
+            assert stream_context[key] == tree_context[key]
+
+
+def test_streaming_problem_markup():
+    problems = StreamingHTMLAnalyzer().analyze(SAMPLE_HTML)["problematic_elements"]
+    assert problems[0]["element"] == '<a href="/vazio"></a>'
+    assert problems[-1]["element"] == '<span style="overflow:scroll">x</span>'
+
+
+def test_analyzer_streams_large_documents():
+    analyzer = HTMLAnalyzer(backend=BS4Backend(), stream_threshold_bytes=1024)
+    large_html = SAMPLE_HTML + "<div><p>conteúdo</p></div>" * 200
+    
+    result = analyzer.analyze_html(large_html)
+    assert _without_markup(result, "selector") == \
+        _without_markup(HTMLAnalyzer(backend=BS4Backend()).analyze_html(large_html), "selector")
+    context = analyzer.get_element_context(large_html, "#login")
+    assert context is not None and context["element"]["tag"] == "form"
+    assert analyzer._get_document(large_html).root is None
+
+
+def test_streaming_reports_elements_beyond_max_depth():
+    deep_html = "<div>" * 5 + '<button style="overflow: hidden"></button><br>' + "</div>" * 5
+    
+    result = StreamingHTMLAnalyzer(max_depth=3).analyze(deep_html)
+    assert result["skipped_elements"] == 4  # div, div, button e br
+    assert result["problematic_elements"] == []
+    assert "skipped_elements" not in StreamingHTMLAnalyzer().analyze(deep_html)
+
+# Componentes repetidos: classes e tags não bastam para identificar os elementos
+REPEATED_HTML = "<html><body><main>" + "".join(
+    f'<section class="card"><p style="overflow: hidden">Seção {i}</p>'
+    f'<form><button type="submit" class="btn" style="width: 20px">Ir</button><a class="btn"></a></form></section>'
+    for i in range(3)
+) + '<ul id="menu"><li><a></a></li><li><a></a></li></ul></main></body></html>'
+
+
+@lxml_required
+@pytest.mark.parametrize("html_content", [SAMPLE_HTML, REPEATED_HTML], ids=["sample", "repeated"])
+def test_problem_selectors_are_unique(html_content):
+    backend = get_html_backend("lxml")
+    document = backend.parse(html_content)
+    problems = HTMLAnalyzer(backend=backend).analyze_html(html_content)["problematic_elements"]
+    assert problems
+    
+    for problem in problems:
+        matches = document.cssselect(problem["selector"])
+        assert len(matches) == 1, problem["selector"]
+        assert backend.to_html(matches[0]) == problem["element"]
+
+
+def _synthesizer(backend, html_content):
+    document = backend.parse(html_content)
+    index = DocumentSelectorIndex(backend)
+    for element in backend.iter_elements(document):
+        index.add(element)
+    return document, SelectorSynthesizer(index)
+
+
+@lxml_required
+def test_selector_prefers_shortest_unique_token():
+    html_content = """<body>
+    <div class="card"><button class="btn primary" data-testid="buy">Comprar</button></div>
+    <div class="card"><button class="btn">Voltar</button></div>
+    <ul id="menu"><li><a></a></li><li><a></a></li></ul>
+    </body>"""
+    document, synthesizer = _synthesizer(get_html_backend("lxml"), html_content)
+    
+    buttons = document.findall('.//button')
+    assert synthesizer.selector_for(buttons[0]) == ".primary"
+    assert synthesizer.selector_for(buttons[1]) == "body > div:nth-of-type(2) > button"
+    assert [synthesizer.selector_for(link) for link in document.findall('.//a')] == \
+        ["ul > li:nth-of-type(1) > a", "ul > li:nth-of-type(2) > a"]
+
+
+@lxml_required
+def test_selector_paths_do_not_cross_head():
+    # O libxml2 deixa o button no head; no navegador ele fica no body
+    html_content = '<script>x</script><button></button><button class="b"></button>'
+    document, synthesizer = _synthesizer(get_html_backend("lxml"), html_content)
+    
+    assert synthesizer.selector_for(document.findall('.//button')[0]) == "button"
+
+
+def test_bs4_selectors_have_no_structural_paths():
+    # O html.parser aninha os li não fechados: um caminho seria "ul > li > li > a"
+    html_content = '<ul><li><a></a><li><a></a></ul><p class="x"></p><p class="x" id="y"></p>'
+    document, synthesizer = _synthesizer(BS4Backend(), html_content)
+    
+    assert [synthesizer.selector_for(link) for link in document.find_all('a')] == ["a", "a"]
+    assert [synthesizer.selector_for(p) for p in document.find_all('p')] == ["p", "#y"]
+
+
+def test_problem_selectors_reach_the_fix_prompt():
+    generator = FixGenerator(SimulatedLLMService(model="sim", time_scale=0), HTMLAnalyzer())
+    context = {"html_analysis": HTMLAnalyzer(backend=BS4Backend()).analyze_html(SAMPLE_HTML)}
+    prompt = generator._generate_prompt({"type": "missing_label"}, context)
+    
+    assert "- missing_label <a>: [href=\"/vazio\"]" in prompt
+    assert "target_selector" in prompt
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Testes do LLM simulado
+Verifica a reprodutibilidade por semente (conteúdo, latência e falhas,
+inclusive sob concorrência), o limite de prompts contados, os erros
+injetados com a mesma forma dos do provedor real e as respostas malformadas
+chegando ao parser incremental
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai import fix_generator as fix_generator_module
+from backend.infrastructure.ai.fix_generator import FixGenerator
+from backend.infrastructure.ai.fix_stream_parser import FixStreamAborted, IncrementalFixParser
+from backend.infrastructure.ai.html_analyzer import HTMLAnalyzer
+from backend.infrastructure.ai.llm_simulator import SimulatedLLMService
+from backend.infrastructure.ai.rate_limiter import get_retry_after, is_rate_limit_error
+from backend.infrastructure.ai.telemetry import LLMTelemetry
+
+CONTEXTS = [
+    {"issue_type": "small_touch_target", "element": f".button-{index}"}
+    for index in range(8)
+]
+
+
+class RecordingSimulator(SimulatedLLMService):
+    """Simulador instantâneo que registra as esperas sorteadas."""
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sleeps = []
+    
+    async def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+async def outcome(service, context):
+    """(resposta ou tipo do erro, esperas sorteadas) de uma chamada."""
+    start = len(service.sleeps)
+    try:
+        result = await service.generate(f"Corrija {context['element']}", context)
+    except Exception as e:
+        result = type(e).__name__
+    return result, service.sleeps[start:]
+
+
+def run_sequential(service, contexts):
+    async def scenario():
+        return [await outcome(service, context) for context in contexts]
+    
+    return asyncio.run(scenario())
+
+
+def test_same_seed_reproduces_output_and_latency():
+    first = run_sequential(RecordingSimulator(seed=7), CONTEXTS)
+    second = run_sequential(RecordingSimulator(seed=7), CONTEXTS)
+    other = run_sequential(RecordingSimulator(seed=8), CONTEXTS)
+    
+    assert first == second
+    assert [sleeps for _, sleeps in first] != [sleeps for _, sleeps in other]
+
+
+def test_faults_do_not_depend_on_call_order():
+    options = {"seed": 3, "rate_limit_probability": 0.3, "timeout_probability": 0.2, "malformed_probability": 0.3}
+    expected = run_sequential(RecordingSimulator(**options), CONTEXTS)
+    
+    # Outra ordem e chamadas concorrentes: cada requisição sorteia o mesmo
+    service = RecordingSimulator(**options)
+    reversed_results = run_sequential(service, list(reversed(CONTEXTS)))
+    assert list(reversed(reversed_results)) == expected
+    
+    async def concurrent():
+        service = SimulatedLLMService(**options, time_scale=0)
+        return await asyncio.gather(
+            *[service.generate(f"Corrija {context['element']}", context) for context in CONTEXTS],
+            return_exceptions=True
+        )
+    
+    results = [
+        type(result).__name__ if isinstance(result, Exception) else result
+        for result in asyncio.run(concurrent())
+    ]
+    assert results == [result for result, _ in expected]
+    assert len({result for result, _ in expected}) > 2
+
+
+def test_repeated_prompt_draws_again():
+    service = RecordingSimulator(seed=1, rate_limit_probability=0.5)
+    results = run_sequential(service, [CONTEXTS[0]] * 12)
+    
+    # Uma nova tentativa do mesmo prompt não repete a falha obrigatoriamente
+    assert {result == "SimulatedProviderError" for result, _ in results} == {True, False}
+
+
+def test_prompt_repetitions_are_lru_bounded():
+    service = SimulatedLLMService(time_scale=0, max_tracked_prompts=2)
+    for context in CONTEXTS[:3] + [CONTEXTS[1]]:
+        asyncio.run(service.generate("prompt", context))
+    
+    # Só os prompts mais recentes continuam contados; o primeiro foi descartado
+    assert len(service._prompt_calls) == 2
+    assert sorted(service._prompt_calls.values()) == [1, 2]
+
+
+def test_injected_rate_limit_looks_like_provider_429():
+    service = SimulatedLLMService(rate_limit_probability=1.0, time_scale=0)
+    
+    with pytest.raises(Exception) as raised:
+        asyncio.run(service.generate("prompt", CONTEXTS[0]))
+    
+    assert is_rate_limit_error(raised.value)
+    assert get_retry_after(raised.value) == 1.0
+
+
+@pytest.mark.parametrize("options, error", [
+    ({"rate_limit_probability": 1.0}, "SimulatedProviderError"),
+    ({"timeout_probability": 1.0}, "TimeoutError"),
+])
+def test_injected_failures_reach_generator_like_real_errors(monkeypatch, options, error):
+    telemetry = LLMTelemetry()
+    monkeypatch.setattr(fix_generator_module, "llm_telemetry", telemetry)
+    generator = FixGenerator(SimulatedLLMService(model="sim", time_scale=0, **options), HTMLAnalyzer())
+    
+    fix = asyncio.run(generator.generate_fix({"type": "small_touch_target", "element": ".button-0"}))
+    
+    assert fix is None
+    stats = telemetry.snapshot()["models"]["sim"]["small_touch_target"]
+    assert stats["errors"] == 1
+    assert stats["rate_limited"] == (1 if error == "SimulatedProviderError" else 0)
+
+
+def test_malformed_responses_abort_the_incremental_parser():
+    service = SimulatedLLMService(seed=5, malformed_probability=1.0, time_scale=0)
+    
+    async def parse(context):
+        parser = IncrementalFixParser()
+        async for chunk in service.generate_streaming("prompt", context):
+            parser.feed(chunk)
+        return parser.finish()
+    
+    for context in CONTEXTS:
+        with pytest.raises(FixStreamAborted):
+            asyncio.run(parse(context))
+
+
+def test_malformed_responses_are_counted_as_aborted(monkeypatch):
+    telemetry = LLMTelemetry()
+    monkeypatch.setattr(fix_generator_module, "llm_telemetry", telemetry)
+    generator = FixGenerator(SimulatedLLMService(model="sim", malformed_probability=1.0, time_scale=0), HTMLAnalyzer())
+    
+    for index in range(4):
+        assert asyncio.run(generator.generate_fix({"type": "overflow", "element": f".box-{index}"})) is None
+    
+    stats = telemetry.snapshot()["models"]["sim"]["overflow"]
+    assert stats["aborted"] == 4 and stats["errors"] == 0
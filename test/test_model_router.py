@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Testes do roteador de modelos
+Verifica o escalonamento por limiar de confiança e por tipo de problema,
+o tratamento de respostas inválidas e os contadores por nível
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai.llm_service import MockLLMService
+from backend.infrastructure.ai.model_router import ModelRouter, ModelTier
+
+
+class MarkerService(MockLLMService):
+    """Serviço marcador: a tentativa decide a resposta pelo nome."""
+    
+    def __init__(self, name):
+        self.name = name
+
+
+def make_router(**kwargs):
+    tiers = [ModelTier("fast", MarkerService("fast")), ModelTier("strong", MarkerService("strong"))]
+    return ModelRouter(tiers, **kwargs)
+
+
+def scripted(responses):
+    """Tentativa que responde por nível e registra os níveis chamados."""
+    calls = []
+    
+    async def attempt(llm_service):
+        calls.append(llm_service.name)
+        response = responses[llm_service.name]
+        if isinstance(response, Exception):
+            raise response
+        return dict(response) if isinstance(response, dict) else response
+    
+    return attempt, calls
+
+
+def test_accepts_fast_tier_above_threshold():
+    router = make_router(confidence_threshold=0.6)
+    attempt, calls = scripted({"fast": {"confidence": 0.8}, "strong": {"confidence": 0.9}})
+    
+    fix = asyncio.run(router.run("contrast", attempt))
+    
+    assert calls == ["fast"]
+    assert fix == {"confidence": 0.8, "model_tier": "fast"}
+
+
+def test_escalates_below_threshold_and_keeps_best_fallback():
+    router = make_router(confidence_threshold=0.6)
+    attempt, calls = scripted({"fast": {"confidence": 0.5}, "strong": {"confidence": 0.3}})
+    
+    fix = asyncio.run(router.run("contrast", attempt))
+    
+    assert calls == ["fast", "strong"]
+    assert fix == {"confidence": 0.5, "model_tier": "fast"}
+
+
+def test_escalate_issue_types_go_straight_to_last_tier():
+    router = make_router(escalate_issue_types=["layout"])
+    attempt, calls = scripted({"fast": {"confidence": 1.0}, "strong": {"confidence": 0.9}})
+    
+    fix = asyncio.run(router.run("layout", attempt))
+    
+    assert calls == ["strong"]
+    assert fix is not None and fix["model_tier"] == "strong"
+
+
+def test_unparseable_confidence_counts_as_invalid():
+    router = make_router(confidence_threshold=0.6)
+    attempt, calls = scripted({"fast": {"confidence": "alta"}, "strong": {"confidence": "0.7"}})
+    
+    fix = asyncio.run(router.run("contrast", attempt))
+    
+    assert calls == ["fast", "strong"]
+    assert fix == {"confidence": 0.7, "model_tier": "strong"}
+    assert router.stats()["fast"]["invalid"] == 1
+
+
+def test_missing_or_null_confidence_is_zero():
+    router = make_router(confidence_threshold=0.6)
+    attempt, _ = scripted({"fast": {"confidence": None}, "strong": {}})
+    
+    fix = asyncio.run(router.run("contrast", attempt))
+    
+    assert fix == {"confidence": 0.0, "model_tier": "fast"}
+    assert router.stats()["strong"]["low_confidence"] == 1
+
+
+def test_stats_counters():
+    router = make_router(confidence_threshold=0.6)
+    attempt, _ = scripted({"fast": RuntimeError("timeout"), "strong": {"confidence": 0.9}})
+    asyncio.run(router.run("contrast", attempt))
+    attempt, _ = scripted({"fast": None, "strong": {"confidence": 0.1}})
+    asyncio.run(router.run("contrast", attempt))
+    
+    stats = router.stats()
+    assert {key: stats["fast"][key] for key in ("calls", "accepted", "errors", "invalid")} == {
+        "calls": 2, "accepted": 0, "errors": 1, "invalid": 1
+    }
+    assert {key: stats["strong"][key] for key in ("calls", "accepted", "low_confidence")} == {
+        "calls": 2, "accepted": 1, "low_confidence": 1
+    }
+    assert stats["strong"]["success_rate"] == 0.5
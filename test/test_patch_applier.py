@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Testes da aplicação de correções em lote
+Verifica uma leitura, um backup e uma escrita por arquivo, a correção com
+erro deixada de fora sem impedir as demais, a rota /apply-source/batch e o
+rollback por backup, que só marca como revertidos os patches do arquivo restaurado
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api.routes import fixes as fixes_routes
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source import patch_applier as patch_applier_module
+from backend.infrastructure.source.patch_applier import PatchApplier
+from backend.infrastructure.storage.fix_repository import FixRepository
+
+CSS = ".a { color: red; }\n.b { margin: 0; }\n"
+
+FIXES = [
+    {"id": "fix-a", "target_selector": ".a", "changes": [{"property": "color", "value": "blue"}]},
+    {"id": "fix-b", "target_selector": ".b", "changes": [{"property": "margin", "value": "4px"}]},
+    # Propriedade inexistente: falha sozinha
+    {"id": "fix-c", "target_selector": ".b", "changes": [{"property": "padding", "action": "remove"}]},
+]
+
+
+def test_batch_reads_backs_up_and_writes_each_file_once(tmp_path, monkeypatch):
+    css_file = tmp_path / "main.css"
+    css_file.write_text(CSS)
+    applier = PatchApplier(ProjectConfig("test-batch", str(tmp_path), ["*.css"], backup_dir=str(tmp_path / "backups")))
+    applier.backup_store.stop_gc()
+    
+    calls = {"read": 0, "save": 0, "write": 0}
+    read_text = Path.read_text
+    save = applier.backup_store.save
+    atomic_write_text = patch_applier_module.atomic_write_text
+    
+    def counting_read_text(path, *args, **kwargs):
+        if path == css_file:
+            calls["read"] += 1
+        return read_text(path, *args, **kwargs)
+    
+    def counting_save(*args, **kwargs):
+        calls["save"] += 1
+        return save(*args, **kwargs)
+    
+    def counting_write(*args, **kwargs):
+        calls["write"] += 1
+        return atomic_write_text(*args, **kwargs)
+    
+    monkeypatch.setattr(Path, "read_text", counting_read_text)
+    monkeypatch.setattr(applier.backup_store, "save", counting_save)
+    monkeypatch.setattr(patch_applier_module, "atomic_write_text", counting_write)
+    
+    file_info = {"relative_path": "main.css"}
+    result = applier.apply_fixes(FIXES, file_infos=[file_info] * len(FIXES))
+    
+    assert calls == {"read": 1, "save": 1, "write": 1}
+    assert [item["success"] for item in result["results"]] == [True, True, False]
+    assert result["results"][2]["errors"] == ["Propriedade não encontrada: padding"]
+    assert css_file.read_text() == ".a { color: blue; }\n.b { margin: 4px; }\n"
+    
+    # Um blob com o conteúdo original e uma entrada por correção aplicada
+    files = result["files"]
+    assert len(files) == 1 and files[0]["fix_ids"] == ["fix-a", "fix-b"]
+    entries = applier.backup_store.list_entries(file_path="main.css")
+    assert sorted(entry["fix_id"] for entry in entries) == ["fix-a", "fix-b"]
+    assert len({entry["blob_hash"] for entry in entries}) == 1
+    assert applier.backup_store.stats()["blobs"] == 1
+    assert applier.backup_store.load(entries[0]["id"]) == CSS.encode()
+    assert {item["backup_path"] for item in result["results"][:2]} == {entry["backup_path"] for entry in entries}
+
+
+def test_apply_source_batch_route(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    (root / "css").mkdir(parents=True)
+    css_file = root / "css" / "main.css"
+    css_file.write_text(CSS)
+    project_id = f"test-batch-route-{tmp_path.name}"
+    config = ProjectConfig(project_id, str(root), ["css/*.css"], backup_dir=str(tmp_path / "backups"))
+    monkeypatch.setitem(fixes_routes.project_manager.projects, project_id, config)
+    
+    repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+    monkeypatch.setattr(fixes_routes, "fix_repository", repository)
+    asyncio.run(repository.initialize())
+    for fix in FIXES:
+        asyncio.run(repository.save_fix({**fix, "target_element": fix["target_selector"]}))
+    
+    app = FastAPI()
+    app.include_router(fixes_routes.router)
+    response = TestClient(app).post(
+        "/api/fixes/apply-source/batch",
+        params={"project_id": project_id},
+        json={"fix_ids": ["fix-a", "fix-b", "fix-c", "fix-a", "missing"]}
+    )
+    
+    payload = response.json()
+    assert response.status_code == 200 and not payload["success"]
+    assert [(item["fix_id"], item["success"]) for item in payload["results"]] == [
+        ("fix-a", True), ("fix-b", True), ("fix-c", False), ("missing", False)
+    ]
+    assert len(payload["files"]) == 1 and payload["files"][0]["fix_ids"] == ["fix-a", "fix-b"]
+    assert css_file.read_text() == ".a { color: blue; }\n.b { margin: 4px; }\n"
+    
+    stored = {fix_id: asyncio.run(repository.get_fix(fix_id)) for fix_id in ("fix-a", "fix-b", "fix-c")}
+    statuses = {fix_id: fix["status"] for fix_id, fix in stored.items() if fix is not None}
+    assert statuses == {"fix-a": "applied", "fix-b": "applied", "fix-c": "pending"}
+    patches = asyncio.run(repository.get_fix_patches(["fix-a", "fix-b", "fix-c"]))
+    assert sorted(patch["fix_id"] for patch in patches) == ["fix-a", "fix-b"]
+
+
+def test_rollback_with_backup_keeps_patches_of_other_files(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    (root / "css").mkdir(parents=True)
+    css_file = root / "css" / "main.css"
+    css_file.write_text(CSS)
+    project_id = f"test-rollback-route-{tmp_path.name}"
+    config = ProjectConfig(
+        project_id, str(root), ["css/*.css"], backup_dir=str(tmp_path / "backups")
+    )
+    monkeypatch.setitem(fixes_routes.project_manager.projects, project_id, config)
+    
+    repository = FixRepository(db_path=str(tmp_path / "fixes.db"))
+    monkeypatch.setattr(fixes_routes, "fix_repository", repository)
+    asyncio.run(repository.initialize())
+    fix = FIXES[0]
+    asyncio.run(repository.save_fix({**fix, "target_element": fix["target_selector"]}))
+    
+    app = FastAPI()
+    app.include_router(fixes_routes.router)
+    client = TestClient(app)
+    applied = client.post(
+        f"/api/fixes/{fix['id']}/apply-source", params={"project_id": project_id}
+    ).json()
+    assert applied["success"] and applied["file_path"] == "css/main.css"
+    # Patch da mesma correção em outro arquivo: não é desfeito pelo backup de main.css
+    asyncio.run(repository.save_fix_patch(fix["id"], "css/other.css", []))
+    
+    response = client.post(
+        f"/api/fixes/{fix['id']}/rollback-source",
+        params={"project_id": project_id, "backup_path": applied["backup_path"]}
+    )
+    
+    assert response.status_code == 200 and response.json()["success"]
+    assert css_file.read_text() == CSS
+    patches = asyncio.run(repository.get_fix_patches([fix["id"]]))
+    assert [patch["file_path"] for patch in patches] == ["css/other.css"]
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Testes do limitador de taxa do LLM
+Usa um relógio falso (time.monotonic do módulo) e reavalia a fila
+manualmente, sem esperas reais: ordem por prioridade e chegada, recuo
+após 429 (Retry-After e redução da concorrência) e devolução da
+permissão quando a chamada é cancelada
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.infrastructure.ai import rate_limiter as rate_limiter_module
+from backend.infrastructure.ai.rate_limiter import LLMRateLimiter
+
+
+class FakeClock:
+    """Substitui o módulo time do limitador: o tempo só anda com advance()."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter_module, "time", fake)
+    return fake
+
+
+def make_limiter(**kwargs):
+    options = {"max_concurrency": 1, "initial_concurrency": 1}
+    options.update(kwargs)
+    return LLMRateLimiter(**options)
+
+
+async def settle():
+    """Deixa as tarefas pendentes rodarem até o próximo await."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def acquire_after(limiter, clock, seconds):
+    """Permissão concedida só depois de o relógio andar seconds."""
+    waiter = asyncio.create_task(limiter.acquire(10))
+    await settle()
+    assert not waiter.done()
+    clock.advance(seconds)
+    limiter._wake()
+    await settle()
+    return waiter.result()
+
+
+def test_waiters_are_served_by_priority_then_arrival(clock):
+    async def scenario():
+        limiter = make_limiter()
+        permits = {"first": await limiter.acquire(10)}
+        order = []
+        
+        async def call(name, priority):
+            permits[name] = await limiter.acquire(10, priority=priority)
+            order.append(name)
+        
+        for name, priority in [("low", 1), ("high-1", 9), ("high-2", 9)]:
+            asyncio.create_task(call(name, priority))
+        await settle()
+        assert order == [] and limiter.stats()["queued"] == 3
+        
+        holder = "first"
+        for _ in range(3):
+            limiter.release(permits[holder], latency=0.1)
+            await settle()
+            holder = order[-1]
+        return order
+    
+    assert asyncio.run(scenario()) == ["high-1", "high-2", "low"]
+
+
+def test_request_bucket_delays_until_refill(clock):
+    async def scenario():
+        limiter = make_limiter(requests_per_minute=60, max_concurrency=4, initial_concurrency=4)
+        limiter.request_bucket.tokens = 1
+        await limiter.acquire(1)
+        
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await settle()
+        assert not waiter.done() and limiter._wake_handle is not None
+        
+        clock.advance(0.5)
+        limiter._wake()
+        await settle()
+        assert not waiter.done()
+        
+        clock.advance(0.5)
+        limiter._wake()
+        await settle()
+        assert waiter.done()
+        assert waiter.result().queue_wait == pytest.approx(1.0)
+    
+    asyncio.run(scenario())
+
+
+def test_rate_limited_release_backs_off(clock):
+    async def scenario():
+        limiter = make_limiter(max_concurrency=8, initial_concurrency=4)
+        permit = await limiter.acquire(10)
+        
+        limiter.release(permit, latency=0.2, rate_limited=True, retry_after=5.0)
+        assert limiter.concurrency_limit == 2.0
+        assert limiter.stats()["rate_limited"] == 1
+        
+        waiter = asyncio.create_task(limiter.acquire(10))
+        await settle()
+        assert not waiter.done()
+        
+        clock.advance(4.9)
+        limiter._wake()
+        await settle()
+        assert not waiter.done()
+        
+        clock.advance(0.2)
+        limiter._wake()
+        await settle()
+        assert waiter.done()
+        
+        # Sem Retry-After o recuo padrão é de 1s; a concorrência não cai abaixo do mínimo
+        limiter.release(waiter.result(), latency=0.2, rate_limited=True)
+        limiter.release(await acquire_after(limiter, clock, 1.0), latency=0.2, rate_limited=True)
+        assert limiter.concurrency_limit == 1.0
+    
+    asyncio.run(scenario())
+
+
+def test_successful_releases_increase_concurrency(clock):
+    async def scenario():
+        limiter = make_limiter(max_concurrency=3, initial_concurrency=1)
+        for _ in range(10):
+            limiter.release(await limiter.acquire(10), latency=0.1)
+        assert limiter.concurrency_limit == 3.0
+        
+        limiter.release(await limiter.acquire(10), latency=60.0)
+        assert limiter.concurrency_limit == 1.5
+        assert limiter.stats()["slow_responses"] == 1
+    
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue(clock):
+    async def scenario():
+        limiter = make_limiter()
+        first = await limiter.acquire(10)
+        cancelled = asyncio.create_task(limiter.acquire(10, priority=9))
+        waiter = asyncio.create_task(limiter.acquire(10, priority=1))
+        await settle()
+        
+        cancelled.cancel()
+        await settle()
+        assert limiter.stats()["queued"] == 1
+        
+        limiter.release(first, latency=0.1)
+        await settle()
+        assert waiter.done() and limiter.stats()["in_flight"] == 1
+    
+    asyncio.run(scenario())
+
+
+def test_permit_granted_while_cancelling_is_released(clock):
+    async def scenario():
+        limiter = make_limiter()
+        first = await limiter.acquire(10)
+        waiter = asyncio.create_task(limiter.acquire(10))
+        await settle()
+        
+        # Concedida e cancelada antes de a tarefa voltar a rodar
+        limiter.release(first, latency=0.1)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        
+        stats = limiter.stats()
+        assert stats["granted"] == 2
+        assert stats["in_flight"] == 0 and stats["queued"] == 0
+    
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Testes dos patches reversos
+Verifica que correções aplicadas em lote podem ser desfeitas em qualquer
+ordem, preservando edições posteriores, e que um trecho alterado depois
+da correção é reportado em vez de sobrescrito
+"""
+
+import itertools
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source.css_modifier import CSSModifier
+from backend.infrastructure.source.patch_applier import PatchApplier
+from backend.infrastructure.source.reverse_patch import revert_hunks
+
+ORIGINAL_CSS = """.a {
+  color: red;
+  margin: 0;
+}
+.b { color: red }
+"""
+
+EDITS = [
+    {"selector": ".a", "changes": [{"property": "color", "value": "blue"}, {"property": "padding", "value": "2px", "action": "add"}]},
+    {"selector": ".b", "changes": [{"property": "color", "value": "green"}, {"property": "top", "value": "0", "action": "add"}]},
+    {"selector": ".a", "changes": [{"property": "margin", "action": "remove"}, {"property": "gap", "value": "1px", "action": "add"}]},
+]
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(range(len(EDITS)))))
+def test_reverse_patches_undo_in_any_order(tmp_path, order):
+    modifier = CSSModifier(ProjectConfig("test-reverse", str(tmp_path), ["*.css"]))
+    content, results = modifier.modify_css_content_batch(ORIGINAL_CSS, EDITS, reverse_patches=True)
+    
+    for index in order:
+        content, errors = revert_hunks(content, results[index]["reverse_patch"])
+        assert errors == []
+    assert content == ORIGINAL_CSS
+
+
+def test_revert_keeps_later_edits_and_reports_conflicts(tmp_path):
+    (tmp_path / "main.css").write_text(ORIGINAL_CSS)
+    applier = PatchApplier(ProjectConfig("test-reverse", str(tmp_path), ["*.css"], backup_dir=str(tmp_path / "backups")))
+    applier.backup_store.stop_gc()
+    fixes = [
+        {"id": "fix-a", "target_selector": ".a", "changes": [{"property": "color", "value": "blue"}]},
+        {"id": "fix-b", "target_selector": ".b", "changes": [{"property": "color", "value": "green"}]},
+    ]
+    applied = applier.apply_fixes(fixes, create_backup=False)["results"]
+    patches = [{"fix_id": result["fix_id"], "file_path": result["file_path"], "hunks": result["reverse_patch"]} for result in applied]
+    
+    # Edição manual depois das correções: mantida; a cor de .b editada à mão: conflito
+    path = tmp_path / "main.css"
+    path.write_text("/* topo */\n" + path.read_text().replace("green", "purple"))
+    
+    result = applier.revert_fixes(patches)
+    assert [item["success"] for item in result["results"]] == [True, False]
+    assert "não encontrado" in result["results"][1]["errors"][0]
+    assert path.read_text() == "/* topo */\n" + ORIGINAL_CSS.replace(".b { color: red }", ".b { color: purple }")
+
+
+def test_changed_declaration_is_not_reverted_in_another_rule(tmp_path):
+    modifier = CSSModifier(ProjectConfig("test-reverse", str(tmp_path), ["*.css"]))
+    content, results = modifier.modify_css_content_batch(
+        ".a{color:red}\n.b{color:blue}\n",
+        [{"selector": ".a", "changes": [{"property": "color", "value": "blue"}]}],
+        reverse_patches=True
+    )
+    assert content == ".a{color:blue}\n.b{color:blue}\n"
+    
+    # Edição posterior na mesma declaração: .b tem o mesmo texto, mas é outra regra
+    edited = content.replace(".a{color:blue}", ".a{color:green}")
+    reverted, errors = revert_hunks(edited, results[0]["reverse_patch"])
+    assert reverted == edited
+    assert "não encontrado" in errors[0]
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de seletores CSS
+Compara a busca pelo índice invertido de tokens com a varredura completa
+(mesma semântica de _selector_matches: exato, parcial e classe em comum)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from backend.config.project_config import ProjectConfig
+from backend.infrastructure.source.source_analyzer import SourceAnalyzer
+from backend.infrastructure.source.selector_index import CSSSelectorIndex
+from backend.infrastructure.source.selector_tokens import SelectorTokenIndex
+
+BUTTONS_CSS = """
+.btn-base { color: red; }
+.btn-base:hover { color: blue; }
+.btn-base.btn-primary, .card .btn-primary { padding: 4px; }
+button.btn-secondary[type="submit"] { margin: 0; }
+#header > nav a { display: block; }
+"""
+
+LAYOUT_CSS = """
+.card { border: 1px solid; }
+.card-title { font-size: 2rem; }
+div.card.featured .card-title { color: gold; }
+@media (max-width: 600px) {
+  .btn-base { width: 100%; }
+}
+"""
+
+TARGETS = [
+    ".btn-base",
+    "btn-base",
+    ".btn-primary",
+    ".card",
+    ".card .btn-primary",
+    "button.btn-secondary",
+    ".btn-secondary:focus",
+    "#header",
+    "nav a",
+    "a",
+    ".c",
+    "  .card-title  ",
+    ".featured.card",
+    ".inexistente",
+    "div.card.featured .card-title",
+]
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    css_dir = tmp_path / "css"
+    css_dir.mkdir()
+    (css_dir / "buttons.css").write_text(BUTTONS_CSS, encoding="utf-8")
+    (css_dir / "layout.css").write_text(LAYOUT_CSS, encoding="utf-8")
+    config = ProjectConfig("test-index", str(tmp_path), ["css/*.css"], backup_dir=str(tmp_path / "backups"))
+    
+    source_analyzer = SourceAnalyzer(config)
+    source_analyzer.selector_index = CSSSelectorIndex(config, refresh_interval=0)
+    return source_analyzer
+
+
+def scan(source_analyzer: SourceAnalyzer, selector: str):
+    """Busca original: todos os seletores de todos os arquivos."""
+    return source_analyzer._find_selector_in_structure(source_analyzer.analyze_css_structure(), selector)
+
+
+@pytest.mark.parametrize("target", TARGETS)
+def test_indexed_lookup_matches_scan(analyzer, target):
+    assert analyzer.find_selector_in_files(target) == scan(analyzer, target)
+
+
+def test_index_follows_file_changes(analyzer):
+    assert analyzer.find_selector_in_files(".novo") == []
+    
+    layout = Path(analyzer.project_config.root_path) / "css" / "layout.css"
+    layout.write_text(LAYOUT_CSS.replace("@media", ".novo .card { color: green; }\n@media"), encoding="utf-8")
+    analyzer.selector_index.invalidate("css/layout.css")
+    
+    matches = analyzer.find_selector_in_files(".novo")
+    assert [match["selector"] for match in matches] == [".novo .card"]
+    assert analyzer.find_selector_in_files(".card") == scan(analyzer, ".card")
+    
+    layout.unlink()
+    assert analyzer.find_selector_in_files(".card-title") == []
+    assert analyzer.selector_index.candidates(".card-title") == {}
+
+
+def test_token_postings():
+    index = SelectorTokenIndex()
+    index.add_file("a.css", [{"selector": "div.card > a[href]"}, {"selector": "#main .card"}])
+    
+    assert index.lookup("class:card") == {"a.css": [0, 1]}
+    assert index.lookup("exact:#main .card") == {"a.css": [1]}
+    assert index.lookup("tri:mai") == {"a.css": [1]}
+    # Ids, tags e atributos não são usados na busca e não são indexados
+    assert index.lookup("id:main") == {} and index.lookup("tag:div") == {}
+    # Alvos curtos não têm trigramas: busca completa
+    assert index.candidates(".c") is None
+    
+    index.remove_file("a.css")
+    assert len(index) == 0
+
+
+def test_refresh_uses_stat_then_hash(tmp_path):
+    css_file = tmp_path / "a.css"
+    css_file.write_text(".a { color: red; }\n", encoding="utf-8")
+    config = ProjectConfig("test-refresh", str(tmp_path), ["*.css"], backup_dir=str(tmp_path / "bk"))
+    index = CSSSelectorIndex(config, refresh_interval=0)
+    
+    index.structure()
+    assert index.stats()["parsed"] == 1
+    
+    # Stat igual: nem relido
+    index.structure()
+    assert index.stats()["unchanged"] == 1 and index.stats()["parsed"] == 1
+    
+    # Só o mtime mudou: relido, mas a análise (mesmo hash) é mantida
+    stat = css_file.stat()
+    os.utime(css_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index.structure()
+    assert index.stats()["rehashed"] == 1 and index.stats()["parsed"] == 1
+    
+    # Conteúdo novo: reparseado
+    css_file.write_text(".a { color: red; }\n.b { margin: 0; }\n", encoding="utf-8")
+    structure = index.structure()
+    assert index.stats()["parsed"] == 2
+    assert [rule["selector"] for rule in structure["a.css"]["selectors"]] == [".a", ".b"]
+
+
+def test_invalidate_catches_changes_hidden_from_stat(tmp_path):
+    css_file = tmp_path / "a.css"
+    css_file.write_text(".alpha { color: red; }\n", encoding="utf-8")
+    config = ProjectConfig("test-invalidate", str(tmp_path), ["*.css"], backup_dir=str(tmp_path / "bk"))
+    index = CSSSelectorIndex(config, refresh_interval=3600)
+    index.structure()
+    
+    # Mesmo tamanho e mtime restaurado (ex: cópia preservando o stat)
+    stat = css_file.stat()
+    css_file.write_text(".bravo { color: red; }\n", encoding="utf-8")
+    os.utime(css_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    
+    # Dentro do refresh_interval o estado atual é reutilizado
+    assert index.candidates(".bravo") == {}
+    index.invalidate()
+    assert index.stats()["parsed"] == 1
+    
+    index.structure()
+    assert index.stats()["parsed"] == 2
+    assert index.candidates(".bravo") == {"a.css": {0}}
+    
+    # invalidate de um arquivo só força a releitura dele
+    index.invalidate("a.css")
+    index.invalidate("inexistente.css")
+    index.structure()
+    assert index.stats()["parsed"] == 2 and index.stats()["rehashed"] == 1
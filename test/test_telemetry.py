@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Testes da telemetria das chamadas ao LLM
+Verifica os buckets e quantis dos histogramas, o isolamento do registro
+da chamada (ContextVar) entre requisições concorrentes e o payload da
+rota /api/fixes/telemetry/llm
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api.routes import fixes as fixes_routes
+from backend.infrastructure.ai.llm_service import MockLLMService
+from backend.infrastructure.ai.model_router import ModelRouter, ModelTier
+from backend.infrastructure.ai.rate_limiter import LLMRateLimiter
+from backend.infrastructure.ai.telemetry import Histogram, LLMTelemetry
+
+
+def test_histogram_buckets_include_upper_bound():
+    histogram = Histogram([1.0, 5.0])
+    for value in [0.5, 1.0, 1.01, 5.0, 7.0]:
+        histogram.observe(value)
+    
+    data = histogram.to_dict()
+    assert data["buckets"] == {"le_1.0": 2, "le_5.0": 2, "inf": 1}
+    assert data["count"] == 5 and data["min"] == 0.5 and data["max"] == 7.0
+    assert data["sum"] == 14.51 and data["avg"] == 2.902
+
+
+def test_histogram_quantiles_use_bucket_upper_bounds():
+    histogram = Histogram([1.0, 5.0])
+    for value in [0.2] * 10 + [3.0] * 9 + [9.0]:
+        histogram.observe(value)
+    
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.95) == 5.0
+    # Acima do último limite: o máximo observado
+    assert histogram.quantile(1.0) == 9.0
+    assert Histogram([1.0]).to_dict()["p50"] is None
+
+
+def test_call_records_are_isolated_between_concurrent_requests():
+    telemetry = LLMTelemetry()
+    
+    async def request(model, delay):
+        record = telemetry.start_call(model, "contrast")
+        await asyncio.sleep(delay)
+        # Outra requisição iniciou e terminou a sua chamada neste intervalo
+        assert telemetry.current_record() is record
+        record.latency = delay
+        telemetry.finish_call(record)
+        assert telemetry.current_record() is None
+        return record.model
+    
+    async def scenario():
+        results = await asyncio.gather(request("gpt-4", 0.02), request("gpt-4o-mini", 0.01))
+        # As tarefas rodam em cópias do contexto: o contexto externo não é afetado
+        assert telemetry.current_record() is None
+        return results
+    
+    assert asyncio.run(scenario()) == ["gpt-4", "gpt-4o-mini"]
+    models = telemetry.snapshot()["models"]
+    assert models["gpt-4"]["contrast"]["calls"] == 1
+    assert models["gpt-4o-mini"]["contrast"]["histograms"]["latency"]["count"] == 1
+
+
+def test_telemetry_route_payload(monkeypatch):
+    telemetry = LLMTelemetry()
+    record = telemetry.start_call("gpt-4o-mini", "contrast")
+    record.queue_wait = 0.01
+    record.latency = 0.8
+    record.prompt_tokens = 1000
+    record.completion_tokens = 200
+    record.parse_success = True
+    telemetry.finish_call(record)
+    record = telemetry.start_call("gpt-4o-mini", "contrast")
+    record.parse_success = False
+    record.rate_limited = True
+    telemetry.finish_call(record)
+    telemetry.record_fallback("contrast")
+    
+    model_router = ModelRouter([
+        ModelTier("fast", MockLLMService()), ModelTier("strong", MockLLMService())
+    ])
+    monkeypatch.setattr(fixes_routes, "llm_telemetry", telemetry)
+    monkeypatch.setattr(fixes_routes, "llm_service", SimpleNamespace(rate_limiter=LLMRateLimiter()))
+    monkeypatch.setattr(fixes_routes, "fix_generator", SimpleNamespace(model_router=model_router))
+    
+    app = FastAPI()
+    app.include_router(fixes_routes.router)
+    payload = TestClient(app).get("/api/fixes/telemetry/llm").json()
+    
+    stats = payload["models"]["gpt-4o-mini"]["contrast"]
+    assert {key: stats[key] for key in ("calls", "parse_success", "parse_failures", "rate_limited")} == {
+        "calls": 2, "parse_success": 1, "parse_failures": 1, "rate_limited": 1
+    }
+    assert stats["cost_usd"] == 0.00027
+    assert stats["prompt_tokens"] == 1000 and stats["completion_tokens"] == 200
+    assert stats["histograms"]["latency"]["buckets"]["le_1.0"] == 1
+    assert stats["histograms"]["completion_tokens"]["buckets"]["le_250"] == 1
+    assert stats["histograms"]["time_to_first_token"]["count"] == 0
+    assert payload["fallback_to_rule"] == {"contrast": 1}
+    assert payload["rate_limiter"]["in_flight"] == 0
+    assert set(payload["model_tiers"]) == {"fast", "strong"}